@@ -1,8 +1,28 @@
 import re
+import io
 import os
+import sys
+import json
+import time
+import inspect
+import marshal
+import hashlib
+import sqlite3
+import heapq
+import zipfile
+import fnmatch
+import signal
+import asyncio
+import argparse
+import threading
 import pdfplumber
 import pandas as pd
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack, redirect_stdout
 from datetime import datetime
+from functools import partial
+from itertools import accumulate
 from typing import Optional
 
 # -----------------------------
@@ -117,6 +137,104 @@ def normalize_text(s: str) -> str:
         header_data["Scan Status"] = "⚠️ Warning"
     return header_data
 
+# -----------------------------
+# Header patterns (compiled once)
+# -----------------------------
+DATE = r"[A-Za-z]+\.\s+\d{1,2},\s+\d{4}"
+
+# All header labels in one alternation, run once over the lowercased text (which the status flags
+# need anyway). CPython's re has no multi-literal prefix scan, so a case-sensitive alternation over
+# lowered text is much cheaper than re.IGNORECASE searches or an IGNORECASE alternation.
+HEADER_LABELS_RE = re.compile(r"patient id|scan (?:id|date|comments)|upload date|report date")
+HEADER_LABELS_ANYCASE_RE = re.compile(HEADER_LABELS_RE.pattern, re.IGNORECASE)
+
+# Label -> (field, labeled pattern); the pattern is matched where the label was found
+HEADER_FIELDS = {
+    "patient id": ("Patient ID", re.compile(r"Patient ID\s+([\w_.-]+)", re.IGNORECASE)),  # keep the original (fast path)
+    "scan id": ("Scan ID", re.compile(r"Scan ID\s+([\d.]+)", re.IGNORECASE)),
+    "upload date": ("Upload Date", re.compile(rf"Upload Date\s+({DATE})", re.IGNORECASE)),
+    "report date": ("Report Date", re.compile(rf"Report Date\s+({DATE})", re.IGNORECASE)),
+    # "(?:CT\s)?Scan Date": an optional CT prefix does not change which value is found
+    "scan date": ("CT Scan Date", re.compile(rf"Scan Date\s+({DATE})", re.IGNORECASE)),
+    # Scan Comments runs until the next section label (or the end of the text)
+    "scan comments": ("Scan Comments", re.compile(
+        r"Scan Comments\s*([\s\S]*?)(?=SUMMARY|RESULTS|KEY|Fissure Completeness|$)", re.IGNORECASE)),
+}
+
+PATIENT_ID_VARIANT_RE = re.compile(
+    r"(?:Patient\s*ID|PatientID|Patient\s*Identifier)\s*:?\s*([A-Za-z0-9._/\-+]+)", re.IGNORECASE)
+PATIENT_LABEL_LINE_RE = re.compile(r"(?:Patient\s*ID|PatientID|Patient\s*Identifier)\b", re.IGNORECASE)
+PATIENT_WORD_LINE_RE = re.compile(r"Patient\s*", re.IGNORECASE)
+ID_WORD_LINE_RE = re.compile(r"(?:ID|Identifier)\b", re.IGNORECASE)
+HYPHEN_WRAP_RE = re.compile(r"-\s*\n\s*")
+LINE_BREAK_RE = re.compile(r"\s*\n\s*")
+ID_TOKEN_RE = re.compile(r"([A-Za-z0-9._/\-+]{2,})")
+FILENAME_SPLIT_RE = re.compile(r"[_\s]+")
+FILENAME_ID_RE = re.compile(r"\d{2,}")
+DATE_RE = re.compile(DATE)
+FIRST_NUMBER_RE = re.compile(r"\b(\d+(?:\.\d+)?)\b")
+
+def find_header_labels(text, lower=None):
+    """
+    Single pass over `text` for the labeled header fields (`lower` is text.lower(), if already computed).
+    Returns {field: (raw value, end offset)} for the first labeled match of each field,
+    i.e. what a separate re.search per field would find.
+    """
+    if lower is None:
+        lower = text.lower()
+    # Offsets in the lowered text only line up if lowercasing kept the length
+    hits = HEADER_LABELS_RE.finditer(lower) if len(lower) == len(text) else HEADER_LABELS_ANYCASE_RE.finditer(text)
+
+    found = {}
+    for hit in hits:
+        key, pattern = HEADER_FIELDS[hit.group().lower()]
+        if key in found:
+            continue
+        m = pattern.match(text, hit.start())
+        if m:
+            found[key] = (m.group(1), m.end(1))
+            if len(found) == len(HEADER_FIELDS):
+                break
+    return found
+
+def header_is_labeled(text):
+    """
+    True if every header field is found by its labeled pattern and Scan Comments ends at a
+    section label. More text appended to `text` can then no longer change the header.
+    """
+    text = normalize_text(text)
+    found = find_header_labels(text)
+    if len(found) < len(HEADER_FIELDS):
+        return False
+    # Stopped at a label rather than at the end of the text ('$' also matches before a final newline)
+    end = found["Scan Comments"][1]
+    return end < len(text) and text[end] != "\n"
+
+def patient_id_from_file_name(file_name):
+    """
+    First >=2-digit token of the file name (StratX_582_635694_0027.pdf -> 582), or None.
+    """
+    name_only = os.path.splitext(file_name)[0]
+    for tok in FILENAME_SPLIT_RE.split(name_only):
+        if tok.lower() in {"stratx", "lungq", "report"}:
+            continue
+        if FILENAME_ID_RE.fullmatch(tok):
+            return tok
+    return None
+
+# Lowercased phrases that set Scan Status, most severe first
+STATUS_MARKERS = (
+    ("the following patient order has been rejected", "⚠️ Not Usable"),
+    ("not usable", "⚠️ Not Usable"),
+    ("attention", "⚠️ Warning"),
+)
+
+def scan_status(lower):
+    """
+    Scan Status from the lowercased document text.
+    """
+    return next((status for marker, status in STATUS_MARKERS if marker in lower), "✅ No Warnings")
+
 def extract_header_info(text, file_name):
     """
     Extract header metadata from StratX/Thirona/LungQ PDFs.
@@ -126,6 +244,7 @@ def extract_header_info(text, file_name):
       - IDs containing . _ - / (+ optional)
       - Unlabeled dates (grabs first three StratX-style dates)
       - Missing labeled Scan ID (grabs first numeric token near top)
+    All patterns are compiled at import; labeled fields are found in one pass (find_header_labels).
     """
     text = normalize_text(text)
 
@@ -140,37 +259,21 @@ def extract_header_info(text, file_name):
         "Scan Status": "✅ No Warnings",
     }
 
+    lower = text.lower()
+
     # -----------------------------
     # Primary (labeled) patterns
     # -----------------------------
-    patterns = {
-        "Patient ID": r"Patient ID\s+([\w_.-]+)",  # keep the original (fast path)
-        "Scan ID": r"Scan ID\s+([\d.]+)",
-        "Upload Date": r"Upload Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
-        "Report Date": r"Report Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
-        "CT Scan Date": r"(?:CT\s)?Scan Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
-        "Scan Comments": r"Scan Comments\s*([\s\S]*?)(?=SUMMARY|RESULTS|KEY|Fissure Completeness|$)",
-    }
-    for key, pattern in patterns.items():
-        m = re.search(pattern, text, re.IGNORECASE)
-        if m:
-            value = " ".join(m.group(1).strip().replace("\n", " ").split())
-            header_data[key] = value if value else "None"
+    for key, (raw, _) in find_header_labels(text, lower).items():
+        value = " ".join(raw.split())
+        header_data[key] = value if value else "None"
 
     # -----------------------------
     # Patient ID: robust fallbacks
     # -----------------------------
-    # 1) Accept common label variants, optional colon, and broader charset (adds '/' and '+')
-        # -----------------------------
-    # Patient ID: robust fallbacks
-    # -----------------------------
     if not header_data["Patient ID"]:
         # 0) Single-line fast path with common variants and optional colon
-        m_pid = re.search(
-            r"(?:Patient\s*ID|PatientID|Patient\s*Identifier)\s*:?\s*([A-Za-z0-9._/\-+]+)",
-            text,
-            re.IGNORECASE,
-        )
+        m_pid = PATIENT_ID_VARIANT_RE.search(text)
         if m_pid:
             header_data["Patient ID"] = m_pid.group(1)
 
@@ -180,32 +283,25 @@ def extract_header_info(text, file_name):
         # 1) Find the label line, allowing the label to be broken across lines (e.g., "Patient" / "ID")
         label_idxs = []
         for i, ln in enumerate(lines):
-            if re.search(r"^(?:Patient\s*ID|PatientID|Patient\s*Identifier)\b", ln, re.IGNORECASE):
+            if PATIENT_LABEL_LINE_RE.match(ln):
+                label_idxs.append(i)
+            # handle "Patient" on one line and "ID" (or "Identifier") at the start of the next
+            elif PATIENT_WORD_LINE_RE.fullmatch(ln) and i + 1 < len(lines) and ID_WORD_LINE_RE.match(lines[i + 1]):
                 label_idxs.append(i)
-            else:
-                # handle "Patient" on one line and "ID" (or "Identifier") at the start of the next
-                if re.fullmatch(r"Patient\s*$", ln, re.IGNORECASE) and i + 1 < len(lines):
-                    if re.match(r"^(?:ID|Identifier)\b", lines[i + 1], re.IGNORECASE):
-                        label_idxs.append(i)
 
         # 2) From each label index, stitch the next few lines into a candidate string
         def assemble_candidate_value(start_idx: int) -> Optional[str]:
             # Collect up to 3 subsequent non-empty lines
-            chunk = []
-            for j in range(start_idx + 1, min(start_idx + 5, len(lines))):
-                if lines[j]:
-                    chunk.append(lines[j])
-
+            chunk = [ln for ln in lines[start_idx + 1:start_idx + 5] if ln]
             if not chunk:
                 return None
 
             # Repair common hyphenated wraps across line breaks: "ABC-" + "\n" + "123" -> "ABC-123"
-            stitched = "\n".join(chunk)
-            stitched = re.sub(r"-\s*\n\s*", "-", stitched)  # join hyphen-wrapped splits
-            stitched = re.sub(r"\s*\n\s*", " ", stitched)   # collapse remaining newlines to spaces
+            stitched = HYPHEN_WRAP_RE.sub("-", "\n".join(chunk))
+            stitched = LINE_BREAK_RE.sub(" ", stitched)  # collapse remaining newlines to spaces
 
             # Now extract the first token that looks like an ID (allow . _ - / +)
-            m_val = re.search(r"([A-Za-z0-9._/\-+]{2,})", stitched)
+            m_val = ID_TOKEN_RE.search(stitched)
             return m_val.group(1) if m_val else None
 
         for idx in label_idxs:
@@ -216,27 +312,13 @@ def extract_header_info(text, file_name):
 
     # 3) Filename fallback (e.g., StratX_582_635694_0027.pdf -> 582) if still missing
     if not header_data["Patient ID"]:
-        name_only = os.path.splitext(file_name)[0]
-        tokens = re.split(r"[_\s]+", name_only)
-        for tok in tokens:
-            if tok.lower() in {"stratx", "lungq", "report"}:
-                continue
-            if re.fullmatch(r"\d{2,}", tok):  # take first >=2-digit token
-                header_data["Patient ID"] = tok
-                break
-
-    # Optional last-resort: use the file stem if you prefer a non-empty Patient ID
-    # if not header_data["Patient ID"]:
-    #     header_data["Patient ID"] = os.path.splitext(file_name)[0]
+        header_data["Patient ID"] = patient_id_from_file_name(file_name)
 
     # -----------------------------
     # Unlabeled date fallback
     # -----------------------------
-    def find_all_dates(t):
-        return re.findall(r"[A-Za-z]+\.\s+\d{1,2},\s+\d{4}", t)
-
     if not header_data["Upload Date"] or not header_data["CT Scan Date"] or not header_data["Report Date"]:
-        dates = find_all_dates(text)
+        dates = DATE_RE.findall(text)
         # Heuristic ordering commonly seen: Upload, CT, Report
         if len(dates) >= 3:
             header_data["Upload Date"] = header_data["Upload Date"] or dates[0]
@@ -247,35 +329,121 @@ def extract_header_info(text, file_name):
     # Scan ID fallback (unlabeled)
     # -----------------------------
     if not header_data["Scan ID"]:
-        head = text[:500]  # search near top
-        m_scan = re.search(r"\b(\d+(?:\.\d+)?)\b", head)  # e.g., 5706.1
+        m_scan = FIRST_NUMBER_RE.search(text, 0, 500)  # search near top, e.g., 5706.1
         if m_scan:
             header_data["Scan ID"] = m_scan.group(1)
 
     # -----------------------------
     # Status flags
     # -----------------------------
-    lower = text.lower()
-    if "the following patient order has been rejected" in lower or "not usable" in lower:
-        header_data["Scan Status"] = "⚠️ Not Usable"
-    elif "attention" in lower:
-        header_data["Scan Status"] = "⚠️ Warning"
+    header_data["Scan Status"] = scan_status(lower)
 
     return header_data
 # -----------------------------
 # Helpers & universal parser
 # -----------------------------
+RESULTS_RE = re.compile(r"RESULTS", re.IGNORECASE)
+NUMBER_TOKEN_RE = re.compile(r"-?\d+(?:\.\d+)?")
+INTEGER_TOKEN_RE = re.compile(r"\d+")
+# Section labels, searched over the whole lowercased text; [^\S\n] keeps a match on one line.
+# Each pattern starts with a literal, so re can scan for it quickly (an alternation cannot).
+RESULTS_LABEL_PATTERNS = {
+    "fissure": r"%[^\S\n]*fissure",
+    "voxel": r"%[^\S\n]*voxel[^\S\n]*density",
+    "inspiratory": r"inspiratory",
+}
+RESULTS_LABEL_RES = {name: re.compile(p) for name, p in RESULTS_LABEL_PATTERNS.items()}
+RESULTS_LABEL_ANYCASE_RES = {name: re.compile(p, re.IGNORECASE) for name, p in RESULTS_LABEL_PATTERNS.items()}
+
+class IndexedLines:
+    """
+    Non-empty stripped lines of a document with the lines carrying each RESULTS label, and
+    their numeric tokens. Tokens are extracted on first use and shared (via `memo`) between
+    the labeled and unlabeled views, so no line is tokenized twice.
+    """
+
+    def __init__(self, lines, labels, memo):
+        self.lines = lines
+        self.labels = labels  # {"fissure" | "voxel" | "inspiratory": [line index, ...]}
+        self.memo = memo  # (numbers by line, integers by line)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def numbers(self, i):
+        """Signed/decimal numeric tokens of line i."""
+        ln = self.lines[i]
+        toks = self.memo[0].get(ln)
+        if toks is None:
+            toks = self.memo[0][ln] = NUMBER_TOKEN_RE.findall(ln)
+        return toks
+
+    def integers(self, i):
+        """Unsigned digit runs of line i ("65.0" -> "65", "0")."""
+        ln = self.lines[i]
+        toks = self.memo[1].get(ln)
+        if toks is None:
+            toks = self.memo[1][ln] = INTEGER_TOKEN_RE.findall(ln)
+        return toks
+
+    def first(self, label):
+        idxs = self.labels[label]
+        return idxs[0] if idxs else None
+
+def index_results_text(text):
+    """
+    Index normalized text once for both RESULTS parsers.
+    Returns (all_lines, labeled_lines): IndexedLines for the whole document, and for the lines after
+    'RESULTS' (starting with the rest of the RESULTS line) with their section labels, or None
+    without a RESULTS block.
+    """
+    stripped = [raw.strip() for raw in text.split('\n')]
+    lines = [ln for ln in stripped if ln]
+    memo = ({}, {})
+    all_lines = IndexedLines(lines, {}, memo)
+
+    m = RESULTS_RE.search(text)
+    if not m:
+        return all_lines, None
+
+    # Labeled block: the rest of the RESULTS line, then every following line
+    eol = text.find('\n', m.end())
+    eol = len(text) if eol == -1 else eol
+    rest = text[m.end():eol].strip()
+    results_raw = text.count('\n', 0, m.start())
+    # line_index[r]: index in `lines` of raw line r (or of the next non-empty line)
+    line_index = list(accumulate(map(bool, stripped), initial=0))
+    first = line_index[results_raw] + 1  # the RESULTS line itself is never empty
+    offset = (1 if rest else 0) - first
+
+    # Label positions after RESULTS, each mapped back to its line in the labeled block
+    lower = text.lower()
+    if len(lower) == len(text):
+        label_res, haystack = RESULTS_LABEL_RES, lower
+    else:
+        label_res, haystack = RESULTS_LABEL_ANYCASE_RES, text
+    labels = {}
+    for name, pattern in label_res.items():
+        idxs = labels[name] = []
+        for hit in pattern.finditer(haystack, m.end()):
+            i = 0 if hit.start() < eol else line_index[results_raw + text.count('\n', m.start(), hit.start())] + offset
+            if not idxs or idxs[-1] != i:
+                idxs.append(i)
+
+    return all_lines, IndexedLines(([rest] if rest else []) + lines[first:], labels, memo)
+
 def find_numbers_after(lines, idx, min_count=6, lookahead=8):
     """
-    From lines[idx+1 : idx+lookahead], return the first line containing at least `min_count` integers.
+    From IndexedLines lines[idx+1 : idx+lookahead], return the first line containing at least `min_count` integers.
     Returns a list of strings (6 numbers) or None.
     """
     for i in range(idx + 1, min(idx + 1 + lookahead, len(lines))):
-        nums = re.findall(r'\d+', lines[i])
+        nums = lines.integers(i)
         if len(nums) >= min_count:
-            return [n for n in nums[:6]]
+            return nums[:6]
     return None
 
+
 # def parse_results_universal(text):
 #     """
 #     Version-agnostic RESULTS parser for both StratX (Voiant) and Thirona/LungQ layouts.
@@ -340,171 +508,829 @@ def find_numbers_after(lines, idx, min_count=6, lookahead=8):
 #         pass
 
 #     return data
-def parse_results_universal(text):
+def parse_labeled_lines(lines):
+    """
+    Labeled RESULTS parsing over IndexedLines: the first 6-number row after '% Fissure',
+    after each of the first two '% Voxel Density' labels (DISTINCT rows) and after 'Inspiratory'.
+    """
+    out = {}
+
+    # 1) Fissure Completeness (original)
+    fiss_idx = lines.first("fissure")
+    if fiss_idx is not None:
+        fiss_vals = find_numbers_after(lines, fiss_idx)
+        if fiss_vals:
+            out["Fissure Completeness"] = fiss_vals
+
+    # 2) Voxel Density (two sections) — ensure DISTINCT rows
+    vox_indices = lines.labels["voxel"][:2]
+    rows = []
+    last_row = None
+    for vi in vox_indices:
+        arr = find_numbers_after(lines, vi)
+        # If we got a row and it equals the previous one, keep scanning forward
+        if arr and last_row and arr == last_row:
+            # walk forward from vi+1 to find the next distinct integer row
+            for j in range(vi + 1, min(vi + 10, len(lines))):
+                toks = lines.numbers(j)
+                if len(toks) >= 6 and all("." not in t for t in toks[:6]):
+                    candidate = [int(t) for t in toks[:6]]
+                    if candidate != list(map(int, last_row)):
+                        arr = list(map(str, candidate))
+                        break
+        if arr:
+            rows.append(list(map(int, arr)))
+            last_row = arr
+
+    if len(rows) == 2:
+        # Larger-sum = -910; other = -950
+        a, b = rows[0], rows[1]
+        if sum(a) >= sum(b):
+            vox910, vox950 = a, b
+        else:
+            vox910, vox950 = b, a
+        out["Voxel Density -910 HU"] = [str(v) for v in vox910]
+        out["Voxel Density -950 HU"] = [str(v) for v in vox950]
+
+    # 3) Inspiratory Volume (original)
+    vol_idx = lines.first("inspiratory")
+    if vol_idx is not None:
+        vol_vals = find_numbers_after(lines, vol_idx)
+        if vol_vals:
+            out["Inspiratory Volume (ml)"] = vol_vals
+
+    return out
+
+def parse_unlabeled_lines(lines):
+    """
+    Unlabeled fallback (minimal PDFs): classify the six-number rows of the whole document by shape.
+    """
+    data = {}
+
+    # Collect all six-number rows from the whole doc, split into decimal and integer rows
+    six_rows = [nums[:6] for nums in map(lines.numbers, range(len(lines))) if len(nums) >= 6]
+    int_rows = [[int(t) for t in row] for row in six_rows if all("." not in t for t in row)]
+
+    # Fissure: first decimal row that looks like percentages
+    for row in six_rows:
+        if any("." in t for t in row) and all(0.0 <= float(x) <= 100.0 for x in row):
+            data["Fissure Completeness"] = row
+            break
+
+    # Voxel density: two DISTINCT integer rows with all values <= 100
+    vox_rows = []
+    seen = set()
+    for ints in int_rows:
+        if all(0 <= v <= 100 for v in ints):
+            tpl = tuple(ints)
+            if tpl not in seen:
+                seen.add(tpl)
+                vox_rows.append(ints)
+
+    if len(vox_rows) >= 2:
+        vox_rows.sort(key=sum, reverse=True)
+        data["Voxel Density -910 HU"] = [str(v) for v in vox_rows[0]]
+        data["Voxel Density -950 HU"] = [str(v) for v in vox_rows[1]]
+
+    # Inspiratory Volume: first plausible volume-like row
+    for ints in int_rows:
+        if all(100 <= v <= 20000 for v in ints):  # 3–5 digits typical
+            data["Inspiratory Volume (ml)"] = [str(v) for v in ints]
+            break
+
+    return data
+
+def parse_results_labeled(text, index=None):
+    """
+    Labeled parsing after 'RESULTS' (the original logic), with -910/-950 taken from DISTINCT rows.
+    Returns a possibly partial dict, or {} if nothing labeled was found.
+    `index` is index_results_text() of the normalized text, if already computed.
+    """
+    _, labeled_lines = index or index_results_text(normalize_text(text))
+    return parse_labeled_lines(labeled_lines) if labeled_lines is not None else {}
+
+def parse_results_universal(text, index=None):
     """
     Version-agnostic parser:
       1) Prefer labeled parsing after 'RESULTS' (your original logic),
          with a fix to ensure -910/-950 come from DISTINCT rows.
       2) If 'RESULTS' absent or labeled parse is incomplete, use an unlabeled fallback
          that classifies six-number rows by shape.
+    The text is tokenized once (index_results_text) and both paths read that index.
     """
-    text = normalize_text(text)
+    all_lines, labeled_lines = index or index_results_text(normalize_text(text))
 
-    # -----------------------------
-    # Labeled path (original)
-    # -----------------------------
-    m = re.search(r"RESULTS", text, re.IGNORECASE)
-    data = {}
+    labeled = parse_labeled_lines(labeled_lines) if labeled_lines is not None else {}
+    # If labeled found anything at all, prefer it and return (keeps your prior success rate)
+    if labeled:
+        return labeled
 
-    def try_labeled():
-        if not m:
-            return {}
+    return parse_unlabeled_lines(all_lines) or None
 
-        lines = [ln.strip() for ln in text[m.end():].split('\n') if ln.strip()]
-        out = {}
+# -----------------------------
+# RESULTS grid (word positions)
+# -----------------------------
+# Words are (text, x0, x1, top, bottom) tuples with top-down coordinates, in reading order.
+RESULT_KEYS = ("Fissure Completeness", "Voxel Density -910 HU", "Voxel Density -950 HU", "Inspiratory Volume (ml)")
+LOBES = ("RUL", "RUL+RML", "RML", "RLL", "LUL", "LLL")
+# A number row belongs to the key whose label words appear in the label lines beside it
+# ('% Fissure' / 'Completeness', '% Voxel Density' / 'Less Than -910 HU', ...)
+GRID_ROW_LABELS = {
+    "Fissure Completeness": ("fissure", "completeness"),
+    "Voxel Density -910 HU": ("-910",),
+    "Voxel Density -950 HU": ("-950",),
+    "Inspiratory Volume (ml)": ("inspiratory", "volume"),
+}
+
+def words_from_results(words):
+    """
+    The words from the first 'RESULTS' on (the RESULTS word included), or [] if there is none.
+    """
+    for i, w in enumerate(words):
+        if RESULTS_RE.search(w[0]):
+            return words[i:]
+    return []
 
-        # 1) Fissure Completeness (original)
-        try:
-            fiss_idx = next(i for i, ln in enumerate(lines) if re.search(r'%\s*Fissure', ln, re.IGNORECASE))
-            fiss_vals = find_numbers_after(lines, fiss_idx)
-            if fiss_vals:
-                out["Fissure Completeness"] = fiss_vals
-        except StopIteration:
-            pass
-
-        # 2) Voxel Density (two sections) — ensure DISTINCT rows
-        vox_indices = [i for i, ln in enumerate(lines) if re.search(r'%\s*Voxel\s*Density', ln, re.IGNORECASE)]
-        rows = []
-        last_row = None
-        for vi in vox_indices[:2]:
-            arr = find_numbers_after(lines, vi)
-            # If we got a row and it equals the previous one, keep scanning forward
-            if arr and last_row and arr == last_row:
-                # walk forward from vi+1 to find the next distinct integer row
-                for j in range(vi + 1, min(vi + 10, len(lines))):
-                    toks = re.findall(r"-?\d+(?:\.\d+)?", lines[j])
-                    if len(toks) >= 6 and all("." not in t for t in toks[:6]):
-                        candidate = [int(t) for t in toks[:6]]
-                        if candidate != list(map(int, last_row)):
-                            arr = list(map(str, candidate))
-                            break
-            if arr:
-                rows.append(list(map(int, arr)))
-                last_row = arr
-
-        if len(rows) == 2:
-            # Larger-sum = -910; other = -950
-            a, b = rows[0], rows[1]
-            if sum(a) >= sum(b):
-                vox910, vox950 = a, b
+def group_rows(words):
+    """
+    Cluster words into rows by their top (within Y_TOLERANCE of the previous word's top).
+    """
+    rows, last_top = [], None
+    for w in sorted(words, key=lambda w: w[3]):
+        if last_top is None or w[3] > last_top + Y_TOLERANCE:
+            rows.append([])
+        rows[-1].append(w)
+        last_top = w[3]
+    return rows
+
+def lobe_columns(row):
+    """
+    Merge a row's words into lobe names ('RUL', '+', 'RML' -> 'RUL+RML') and return their
+    (x0, x1) spans in LOBES order, or None if the row is not the lobe header.
+    """
+    cells = []
+    for text, x0, x1, _, _ in sorted(row, key=lambda w: w[1]):
+        if cells and (text.startswith("+") or cells[-1][0].endswith("+")):
+            cells[-1] = (cells[-1][0] + text, cells[-1][1], x1)
+        else:
+            cells.append((text, x0, x1))
+    if tuple(c[0].upper() for c in cells) != LOBES:
+        return None
+    return [(x0, x1) for _, x0, x1 in cells]
+
+def parse_results_grid(words):
+    """
+    Read the RESULTS table from word boxes (the words after 'RESULTS', see words_from_results).
+    Columns come from the lobe header, each number goes to the nearest lobe column, and each
+    number row is named by the label lines it overlaps vertically, so -910/-950 HU are read
+    from the labels rather than guessed from row sums.
+    Returns {result key: six values in LOBES order} for the rows found (possibly {}).
+    """
+    rows = group_rows(words)
+    for i, row in enumerate(rows):
+        columns_x = lobe_columns(row)
+        if columns_x:
+            break
+    else:
+        return {}
+
+    # Labels sit left of the first lobe column, values under the columns
+    left = columns_x[0][0]
+    centers = [(x0 + x1) / 2 for x0, x1 in columns_x]
+    label_lines, number_rows = [], []
+    for row in rows[i + 1:]:
+        labels = [w for w in row if w[2] < left]
+        if labels:
+            label_lines.append((min(w[3] for w in labels), max(w[4] for w in labels),
+                                normalize_text(" ".join(w[0] for w in labels)).lower()))
+        cells = [w for w in row if (w[1] + w[2]) / 2 > left and NUMBER_TOKEN_RE.fullmatch(w[0])]
+        if len(cells) == len(LOBES):
+            number_rows.append(cells)
+
+    out = {}
+    for row in number_rows:
+        top, bottom = min(w[3] for w in row), max(w[4] for w in row)
+        label = " ".join(text for t, b, text in label_lines if t < bottom and b > top)
+        keys = [k for k, label_words in GRID_ROW_LABELS.items() if any(lw in label for lw in label_words)]
+        if len(keys) != 1 or keys[0] in out:
+            continue
+        values = [None] * len(LOBES)
+        for text, x0, x1, _, _ in row:
+            col = min(range(len(centers)), key=lambda j: abs(centers[j] - (x0 + x1) / 2))
+            values[col] = text
+        if None not in values:
+            out[keys[0]] = values
+    return out
+
+# -----------------------------
+# Report templates (layout fingerprint)
+# -----------------------------
+# Lowercased first-page phrases that tell the known layouts apart
+FINGERPRINT_LABELS = ("patient id", "results", "% fissure", "voiant", "medqia", "thirona", "lungq")
+
+def layout_fingerprint(first_page_text, metadata, page_count):
+    """
+    Cheap layout fingerprint: which FINGERPRINT_LABELS the first page has, the PDF producer
+    and the page count.
+    """
+    lower = normalize_text(first_page_text).lower()
+    return {
+        "labels": frozenset(label for label in FINGERPRINT_LABELS if label in lower),
+        "producer": (metadata or {}).get("Producer") or "",
+        "pages": page_count,
+    }
+
+class ReportTemplate:
+    """
+    Generic layout: the full header cascade and the universal RESULTS parser.
+    Subclasses read one known layout directly and defer to these methods when a document
+    does not look the way they expect. A document matches a template when its fingerprint has
+    every label in `labels`, a producer starting with one of `producers` (if any) and a page
+    count in `pages` (if set).
+    """
+    name = "generic"
+    labels = frozenset()
+    producers = ()
+    pages = None
+
+    def matches(self, fingerprint):
+        return (
+            self.labels <= fingerprint["labels"]
+            and (not self.producers or fingerprint["producer"].startswith(self.producers))
+            and (self.pages is None or fingerprint["pages"] in self.pages)
+        )
+
+    def parse_header(self, text, file_name):
+        return extract_header_info(text, file_name)
+
+    def parse_results(self, text, index):
+        """
+        `index` is index_results_text() of the normalized text.
+        """
+        return parse_results_universal(text, index)
+
+class LabeledTemplate(ReportTemplate):
+    """
+    Layouts with every header label and a labeled RESULTS block: no fallback cascades.
+    """
+    def parse_header(self, text, file_name):
+        text = normalize_text(text)
+        lower = text.lower()
+        found = find_header_labels(text, lower)
+        if len(found) < len(HEADER_FIELDS):
+            return super().parse_header(text, file_name)
+        header_data = {"File Name": file_name}
+        for key in ("Patient ID", "Upload Date", "Scan ID", "Report Date", "CT Scan Date", "Scan Comments"):
+            value = " ".join(found[key][0].split())
+            header_data[key] = value if value else "None"
+        header_data["Scan Status"] = scan_status(lower)
+        return header_data
+
+    def parse_results(self, text, index):
+        _, labeled_lines = index
+        labeled = parse_labeled_lines(labeled_lines) if labeled_lines is not None else {}
+        if len(labeled) == len(RESULT_KEYS):
+            return labeled
+        return super().parse_results(text, index)
+
+class UnlabeledTemplate(ReportTemplate):
+    """
+    Minimal layouts with no header labels and no RESULTS heading: dates, Scan ID and the six-number
+    rows are read by position, Patient ID comes from the file name.
+    """
+    def parse_header(self, text, file_name):
+        text = normalize_text(text)
+        if find_header_labels(text) or PATIENT_LABEL_LINE_RE.search(text):
+            return super().parse_header(text, file_name)
+        header_data = {
+            "File Name": file_name,
+            "Patient ID": patient_id_from_file_name(file_name),
+            "Upload Date": None,
+            "Scan ID": None,
+            "Report Date": None,
+            "CT Scan Date": None,
+            "Scan Comments": "None",
+            "Scan Status": scan_status(text.lower()),
+        }
+        # Dates in the usual order: Upload, CT, Report
+        dates = DATE_RE.findall(text)
+        if len(dates) >= 3:
+            header_data["Upload Date"], header_data["CT Scan Date"], header_data["Report Date"] = dates[:3]
+        m_scan = FIRST_NUMBER_RE.search(text, 0, 500)
+        if m_scan:
+            header_data["Scan ID"] = m_scan.group(1)
+        return header_data
+
+    def parse_results(self, text, index):
+        all_lines, labeled_lines = index
+        if labeled_lines is not None:
+            return super().parse_results(text, index)
+        return parse_unlabeled_lines(all_lines) or None
+
+REPORT_TEMPLATES = []  # checked in order, the first match wins
+GENERIC_TEMPLATE = ReportTemplate()
+
+def register_template(cls):
+    """
+    Class decorator adding a ReportTemplate subclass to the registry. A new vendor layout or
+    version only needs a subclass here; the generic path stays as it is.
+    """
+    REPORT_TEMPLATES.append(cls())
+    return cls
+
+def match_template(fingerprint):
+    return next((t for t in REPORT_TEMPLATES if t.matches(fingerprint)), GENERIC_TEMPLATE)
+
+def template_named(name):
+    return next((t for t in REPORT_TEMPLATES if t.name == name), GENERIC_TEMPLATE)
+
+@register_template
+class StratXVoiantTemplate(LabeledTemplate):
+    name = "stratx-voiant"
+    labels = frozenset({"patient id", "results", "% fissure", "voiant"})
+    producers = ("Qt ",)  # wkhtmltopdf
+
+@register_template
+class StratXMedQIATemplate(LabeledTemplate):
+    name = "stratx-medqia"
+    labels = frozenset({"patient id", "results", "% fissure", "medqia"})
+    producers = ("Qt ",)
+
+@register_template
+class LungQLabeledTemplate(LabeledTemplate):
+    name = "lungq-labeled"
+    labels = frozenset({"patient id", "results", "% fissure", "thirona"})
+    producers = ("WeasyPrint",)
+
+@register_template
+class LungQUnlabeledTemplate(UnlabeledTemplate):
+    name = "lungq-unlabeled"
+    labels = frozenset({"thirona"})
+    producers = ("WeasyPrint",)
+# -----------------------------
+# Zip archives (read as virtual directories)
+# -----------------------------
+# A PDF inside an archive is addressed as <archive.zip>/<member path>, nesting as needed
+# (e.g. Chicago.zip/StratX_0027-2/inner.zip/report.pdf), so basenames and folder structure
+# look the same as if the archive had been extracted in place.
+
+def is_zip_name(name):
+    return name.lower().endswith(".zip")
+
+def find_zip_pdfs(zf, prefix):
+    """
+    Yield virtual paths of PDFs inside an open ZipFile, descending into nested zips.
+    """
+    for info in zf.infolist():
+        name = info.filename
+        # Skip folders and the macOS resource-fork copies (__MACOSX/, ._report.pdf)
+        if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("._"):
+            continue
+        virtual_path = os.path.join(prefix, *name.split("/"))
+        if name.lower().endswith(".pdf"):
+            yield virtual_path
+        elif is_zip_name(name):
+            try:
+                with zipfile.ZipFile(io.BytesIO(zf.read(name))) as nested:
+                    yield from find_zip_pdfs(nested, virtual_path)
+            except zipfile.BadZipFile as e:
+                print(f"❌ Skipping unreadable archive: {virtual_path} — {e}")
+
+def split_archive_path(path):
+    """
+    Split a virtual path into (archive file on disk, [member path parts]).
+    """
+    head, parts = path, []
+    while not os.path.isfile(head):
+        head, tail = os.path.split(head)
+        if not tail:
+            raise FileNotFoundError(path)
+        parts.insert(0, tail)
+    return head, parts
+
+@contextmanager
+def open_member_archive(pdf_path):
+    """
+    Open the innermost archive holding `pdf_path` and yield (ZipFile, member name).
+    Nested archives are opened from memory, never extracted to disk.
+    """
+    archive, parts = split_archive_path(pdf_path)
+    with ExitStack() as stack:
+        zf = stack.enter_context(zipfile.ZipFile(archive))
+        k = 1
+        while k < len(parts):
+            name = "/".join(parts[:k])
+            if is_zip_name(name) and name in zf.NameToInfo:
+                zf = stack.enter_context(zipfile.ZipFile(io.BytesIO(zf.read(name))))
+                parts, k = parts[k:], 1
             else:
-                vox910, vox950 = b, a
-            out["Voxel Density -910 HU"] = [str(v) for v in vox910]
-            out["Voxel Density -950 HU"] = [str(v) for v in vox950]
+                k += 1
+        yield zf, "/".join(parts)
+
+def read_archived_pdf(pdf_path):
+    with open_member_archive(pdf_path) as (zf, name):
+        return zf.read(name)
+
+def open_pdf_source(pdf_path):
+    """
+    Return something pdfplumber.open accepts: the path itself, or the archived bytes in memory.
+    """
+    if os.path.isfile(pdf_path):
+        return pdf_path
+    return io.BytesIO(read_archived_pdf(pdf_path))
+
+def read_pdf_bytes(pdf_path):
+    if os.path.isfile(pdf_path):
+        with open(pdf_path, "rb") as f:
+            return f.read()
+    return read_archived_pdf(pdf_path)
+
+def source_stat(pdf_path):
+    """
+    (size, mtime_ns) of a PDF; archived PDFs report the member size and the archive's mtime.
+    """
+    if os.path.isfile(pdf_path):
+        st = os.stat(pdf_path)
+        return st.st_size, st.st_mtime_ns
+    with open_member_archive(pdf_path) as (zf, name):
+        size = zf.getinfo(name).file_size
+    return size, os.stat(split_archive_path(pdf_path)[0]).st_mtime_ns
+
+# -----------------------------
+# Stage timing (opt-in)
+# -----------------------------
+# Per-stage [wall, cpu] seconds of the document being processed; None when timing is off,
+# in which case timed_stage is a plain call
+_stage_times = None
+
+def timed_stage(stage, func, *args):
+    if _stage_times is None:
+        return func(*args)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        return func(*args)
+    finally:
+        totals = _stage_times.setdefault(stage, [0.0, 0.0])
+        totals[0] += time.perf_counter() - wall
+        totals[1] += time.process_time() - cpu
+
+# -----------------------------
+# Text extraction backends
+# -----------------------------
+# A backend is a context manager over a PDF source (path or file object) yielding
+# (pages, metadata): one page object per page, with text() and results_words() (word boxes from
+# 'RESULTS' on, for parse_results_grid) and close() (drop what the page cached once it is read),
+# and the document info dict (Producer, Creator, ...).
+# pdfplumber is the reference; faster backends are only trusted where their text parses fully
+# (see backend_text_usable), otherwise pdfplumber re-reads.
+DEFAULT_BACKEND = "pdfplumber"
+
+# pdfplumber's extract_text defaults: chars more than X_TOLERANCE apart start a new word,
+# words whose tops are within Y_TOLERANCE share a line
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+WORD_RE = re.compile(r"\S+")
+
+class PdfplumberPage:
+    def __init__(self, page):
+        self.page = page
+
+    def text(self):
+        return self.page.extract_text()
+
+    def results_words(self):
+        """
+        Word boxes after 'RESULTS', read off the text map extract_text already built (and cached).
+        """
+        textmap = self.page.get_textmap()
+        m = RESULTS_RE.search(textmap.as_string)
+        if not m:
+            return []
+        # as_string is one character per text map tuple, so a word's span gives its first and last char
+        chars = textmap.tuples
+        words = []
+        for w in WORD_RE.finditer(textmap.as_string, m.start()):
+            first, last = chars[w.start()][1], chars[w.end() - 1][1]
+            words.append((w.group(), first["x0"], last["x1"], first["top"], first["bottom"]))
+        return words
+
+    def close(self):
+        # pdfplumber keeps each page's chars, layout objects and text map until the document closes
+        self.page.close()
+
+@contextmanager
+def pdfplumber_pages(source):
+    with timed_stage("open", pdfplumber.open, source) as pdf:
+        yield [PdfplumberPage(p) for p in pdf.pages], pdf.metadata
+
+def import_pypdfium2():
+    try:
+        import pypdfium2
+    except ImportError:
+        raise RuntimeError("The pdfium backend needs pypdfium2 (pip install pypdfium2)") from None
+    return pypdfium2
 
-        # 3) Inspiratory Volume (original)
+class PdfiumPage:
+    """
+    A pypdfium2 page laid out like pdfplumber's extract_text: characters are grouped into words
+    by the same gap rules, words into lines by their top, each line read left to right.
+    PDFium's text order follows the content stream, which for StratX layouts is not reading order.
+    """
+    def __init__(self, pdf, index):
+        self.pdf = pdf
+        self.index = index
+        self._lines = None
+
+    def lines(self):
+        """
+        Lines of words (text, x0, x1, top, bottom), each left to right, computed once.
+        """
+        if self._lines is not None:
+            return self._lines
+        page = self.pdf[self.index]
+        height = page.get_height()
+        textpage = page.get_textpage()
         try:
-            vol_idx = next(i for i, ln in enumerate(lines) if re.search(r'Inspiratory', ln, re.IGNORECASE))
-            vol_vals = find_numbers_after(lines, vol_idx)
-            if vol_vals:
-                out["Inspiratory Volume (ml)"] = vol_vals
-        except StopIteration:
-            pass
+            text = textpage.get_text_range(0, textpage.count_chars())
+            words, prev = [], None  # prev: (x0, x1, top) of the last character
+            for i, ch in enumerate(text):
+                if ch.isspace():
+                    prev = None
+                    continue
+                x0, bottom, x1, top = textpage.get_charbox(i, loose=True)
+                top, bottom = height - top, height - bottom  # PDF y grows upwards
+                if prev and not (x0 < prev[0] or x0 > prev[1] + X_TOLERANCE or abs(top - prev[2]) > Y_TOLERANCE):
+                    words[-1][0] += ch
+                    words[-1][2] = x1
+                else:
+                    words.append([ch, x0, x1, top, bottom])
+                prev = (x0, x1, top)
+        finally:
+            textpage.close()
+            page.close()
+        # PDFium marks soft hyphens at line ends with U+FFFE
+        words = [(w[0].replace("\ufffe", "-"), *w[1:]) for w in words]
+        self._lines = [sorted(line, key=lambda w: w[1]) for line in group_rows(words)]
+        return self._lines
+
+    def text(self):
+        return "\n".join(" ".join(w[0] for w in line) for line in self.lines())
+
+    def results_words(self):
+        return words_from_results([w for line in self.lines() for w in line])
+
+    def close(self):
+        self._lines = None
+
+@contextmanager
+def pdfium_pages(source):
+    pypdfium2 = import_pypdfium2()
+    pdf = timed_stage("open", pypdfium2.PdfDocument, source)
+    try:
+        yield [PdfiumPage(pdf, i) for i in range(len(pdf))], pdf.get_metadata_dict()
+    finally:
+        pdf.close()
 
-        return out
+EXTRACTION_BACKENDS = {"pdfplumber": pdfplumber_pages, "pdfium": pdfium_pages}
 
-    labeled = try_labeled()
-    # If labeled found anything at all, prefer it and return (keeps your prior success rate)
-    if labeled:
-        return labeled
+def check_backend(backend):
+    """
+    Fail early (RuntimeError) when a backend's library is not installed.
+    """
+    if backend == "pdfium":
+        import_pypdfium2()
 
-    # -----------------------------
-    # Unlabeled fallback (minimal PDFs)
-    # -----------------------------
-    lines_all = [ln.strip() for ln in text.split('\n') if ln.strip()]
+def backend_text_usable(row_data):
+    """
+    True if a row parsed from a fast backend's text can be kept: every RESULTS column was
+    parsed, or the order was rejected (no RESULTS block, whichever backend reads it).
+    """
+    return None not in row_data[8:] or row_data[7] == "⚠️ Not Usable"
 
-    # Collect all six-number rows from the whole doc
-    six_rows = []
-    for ln in lines_all:
-        toks = re.findall(r"-?\d+(?:\.\d+)?", ln)
-        if len(toks) >= 6:
-            six_rows.append(toks[:6])
+def early_reject(text):
+    """
+    True if `text` is a rejected / not usable order without a RESULTS section (no heading, no
+    fissure, voxel density or inspiratory labels). Such a report has no measurements, so its row
+    is the header alone: parse_text skips the RESULTS parsers and lazy extraction stops there.
+    """
+    text = normalize_text(text)
+    lower = text.lower()
+    return (scan_status(lower) == "⚠️ Not Usable" and not RESULTS_RE.search(text)
+            and not any(label_re.search(lower) for label_re in RESULTS_LABEL_RES.values()))
 
-    # Fissure: first decimal row that looks like percentages
-    fiss = None
-    for row in six_rows:
-        if any("." in t for t in row):
-            try:
-                vals = [float(x) for x in row]
-                if all(0.0 <= v <= 100.0 for v in vals):
-                    fiss = row
-                    break
-            except Exception:
-                continue
-    if fiss:
-        data["Fissure Completeness"] = fiss
+# -----------------------------
+# Per-document resource limits
+# -----------------------------
+# StratX reports run 1-15 pages of a few thousand characters each; a document far past these
+# limits is not a report worth waiting for (0 or None turns a limit off)
+MAX_DOCUMENT_PAGES = 500
+MAX_DOCUMENT_CHARS = 2_000_000
+MAX_DOCUMENT_SECONDS = 300
 
-    # Voxel density: two DISTINCT integer rows with all values <= 100
-    int_rows = []
-    seen = set()
-    for row in six_rows:
-        if all("." not in t for t in row):
-            try:
-                ints = [int(t) for t in row]
-            except ValueError:
-                continue
-            if all(0 <= v <= 100 for v in ints):
-                tpl = tuple(ints)
-                if tpl not in seen:
-                    seen.add(tpl)
-                    int_rows.append(ints)
+class ResourceLimitExceeded(Exception):
+    pass
 
-    if len(int_rows) >= 2:
-        int_rows.sort(key=sum, reverse=True)
-        data["Voxel Density -910 HU"] = [str(v) for v in int_rows[0]]
-        data["Voxel Density -950 HU"] = [str(v) for v in int_rows[1]]
+class ResourceLimits:
+    """
+    Per-document limits on the pages read, the characters of text extracted and the wall
+    seconds spent. A document over one is not parsed: its row gets the "⚠️ Resource Limit"
+    status, with the limit in Scan Comments. Lazy extraction only counts the pages it reads.
+    """
+    def __init__(self, pages=MAX_DOCUMENT_PAGES, chars=MAX_DOCUMENT_CHARS, seconds=MAX_DOCUMENT_SECONDS):
+        self.pages = pages
+        self.chars = chars
+        self.seconds = seconds
+
+    def check(self, pages_read, chars_read, deadline=None):
+        """
+        Raise ResourceLimitExceeded if a document that read this much is over a limit.
+        """
+        if self.pages and pages_read > self.pages:
+            raise ResourceLimitExceeded(f"more than {self.pages} pages")
+        if self.chars and chars_read > self.chars:
+            raise ResourceLimitExceeded(f"more than {self.chars} characters of text")
+        if deadline and time.perf_counter() > deadline:
+            raise ResourceLimitExceeded(f"more than {self.seconds:g}s")
+
+DEFAULT_LIMITS = ResourceLimits()
+
+def resource_limit_cause(e):
+    """
+    The ResourceLimitExceeded behind `e`, also when a library re-raised it wrapped in its own
+    error (pdfplumber does for errors while reading pages), else None.
+    """
+    while e is not None:
+        if isinstance(e, ResourceLimitExceeded):
+            return e
+        e = e.__cause__ or e.__context__
+    return None
 
-    # Inspiratory Volume: first plausible volume-like row
-    vol = None
-    for row in six_rows:
-        if all("." not in t for t in row):
-            try:
-                ints = [int(t) for t in row]
-            except ValueError:
-                continue
-            if all(100 <= v <= 20000 for v in ints):  # 3–5 digits typical
-                vol = [str(v) for v in ints]
-                break
-    if vol:
-        data["Inspiratory Volume (ml)"] = vol
+@contextmanager
+def document_deadline(limits):
+    """
+    Yield the perf_counter deadline of a document's wall-time limit (None without one).
+    extract_pages checks it between pages; in a main thread (serial runs, worker processes) a
+    SIGALRM timer also raises ResourceLimitExceeded in the middle of a page that never ends.
+    """
+    if not limits or not limits.seconds:
+        yield None
+        return
+    deadline = time.perf_counter() + limits.seconds
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield deadline
+        return
+
+    def expire(signum, frame):
+        raise ResourceLimitExceeded(f"more than {limits.seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, limits.seconds)
+    try:
+        yield deadline
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
 
-    return data if data else None
 # -----------------------------
 # PDF processing
 # -----------------------------
-def process_pdf(pdf_path):
-    file_name = os.path.basename(pdf_path)
+# Header and RESULTS normally sit on the first page or two; only these pages are checked for an
+# early stop, so documents that never complete (e.g. unlabeled layouts) are not re-parsed per page
+LAZY_CHECK_PAGES = 3
+
+def extract_pages(pdf_path, file_name=None, backend=DEFAULT_BACKEND, grid=False, data=None, limits=None,
+                  deadline=None):
+    """
+    Return (non-empty text of each page read, number of pages skipped, RESULTS grid words,
+    report template name), read with `backend`. The template is matched on the layout
+    fingerprint of the first page with text.
+    With `file_name`, pages are parsed as they are read and extraction stops once the row is
+    complete (see parse_text); without it every page is extracted.
+    With `grid`, the word boxes after 'RESULTS' on the first page that has them are kept for
+    parse_results_grid; otherwise (or without a RESULTS block) the grid words are None.
+    `data` is the PDF's bytes when they were already read (see run_pipeline).
+    With `limits` (ResourceLimits), ResourceLimitExceeded is raised once the pages or text read,
+    or the time past `deadline`, go over them. Each page's caches are dropped once it is read.
+    """
+    source = io.BytesIO(data) if data is not None else open_pdf_source(pdf_path)
+    with EXTRACTION_BACKENDS[backend](source) as (pages, metadata):
+        extracted_pages = []
+        grid_words = None
+        template = None
+        chars = 0
+        for i, page in enumerate(pages):
+            if limits:
+                limits.check(i + 1, chars, deadline)
+            t = timed_stage("extract_text", page.text)
+            if grid and not grid_words and t and RESULTS_RE.search(t):
+                grid_words = timed_stage("extract_text", page.results_words) or None
+            page.close()
+            if t:
+                chars += len(t)
+                if limits:
+                    limits.check(i + 1, chars)
+                extracted_pages.append(t)
+                if template is None:
+                    template = match_template(layout_fingerprint(t, metadata, len(pages)))
+                if file_name and i < LAZY_CHECK_PAGES:
+                    _, row_data, complete = parse_text("\n".join(extracted_pages), file_name, grid_words, template)
+                    if complete:
+                        if i + 1 == len(pages) or not later_status_marker(pdf_path, data, i + 1, row_data[7]):
+                            return extracted_pages, len(pages) - i - 1, grid_words, template.name
+                        # A later page changes Scan Status: read the rest, as --all-pages would
+                        file_name = None
+    return extracted_pages, 0, grid_words, template and template.name
+
+_pdfium_missing_warned = False
+
+def later_status_marker(pdf_path, data, start, status):
+    """
+    True if a page from `start` on has a STATUS_MARKERS phrase for a more severe status than
+    `status`, so lazy extraction must not stop before it. Reads PDFium's plain text (no layout, a
+    few ms a page) with whitespace removed: it may flag a page whose full text has no marker (that
+    only costs reading every page), not the reverse. True if PDFium cannot read the document, or
+    is not installed (warned once: lazy extraction then reads every page of longer documents).
+    """
+    global _pdfium_missing_warned
+    severity = ["⚠️ Not Usable", "⚠️ Warning", "✅ No Warnings"]
+    rank = severity.index(status) if status in severity else len(severity)
+    markers = [marker.replace(" ", "") for marker, marker_status in STATUS_MARKERS
+               if severity.index(marker_status) < rank]
+    if not markers:
+        return False
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            extracted_pages = []
-            for p in pdf.pages:
-                t = p.extract_text()
-                if t:
-                    extracted_pages.append(t)
-            full_text = "\n".join(extracted_pages)
-            if not full_text:
-                raise ValueError("PDF text could not be extracted.")
-    except Exception as e:
-        print(f"❌ Failed to read or extract text from PDF: {file_name} — {e}")
-        return file_name, [file_name] + [None]*7 + ["⚠️ Failed to Read"] + [None]*24
+        pypdfium2 = import_pypdfium2()
+    except RuntimeError as e:
+        if not _pdfium_missing_warned:
+            _pdfium_missing_warned = True
+            print(f"⚠️ {e}: lazy extraction reads every page to check Scan Status markers", file=sys.stderr)
+        return True
+    try:
+        pdf = pypdfium2.PdfDocument(io.BytesIO(data) if data is not None else open_pdf_source(pdf_path))
+    except pypdfium2.PdfiumError:
+        return True
+    try:
+        for i in range(start, len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                text = "".join(textpage.get_text_range().lower().split())
+            finally:
+                textpage.close()
+                page.close()
+            if any(marker in text for marker in markers):
+                return True
+        return False
+    except pypdfium2.PdfiumError:
+        return True
+    finally:
+        pdf.close()
 
-    header_info = extract_header_info(full_text, file_name)
+def unparsed_row(file_name, status, comment=None):
+    """
+    (unique_id, row_data) of a document that was not parsed: only File Name, Scan Comments and
+    Scan Status are set, and the file name is its unique_id.
+    """
+    return file_name, [file_name] + [None]*5 + [comment, status] + [None]*24
+
+def failed_read_row(file_name):
+    return unparsed_row(file_name, "⚠️ Failed to Read")
 
-    # Use a single universal parser for all layouts
-    results_data = parse_results_universal(full_text)
+def resource_limit_row(file_name, reason):
+    return unparsed_row(file_name, "⚠️ Resource Limit", f"Resource limit: {reason}")
+
+def parse_pages(extracted_pages, file_name, grid_words=None, template=None):
+    """
+    Parse already-extracted page text into (unique_id, row_data).
+    """
+    return parse_text("\n".join(extracted_pages), file_name, grid_words, template)[:2]
+
+def parse_text(full_text, file_name, grid_words=None, template=None):
+    """
+    Parse document text into (unique_id, row_data, complete).
+    `template` (a ReportTemplate, or its name) reads the header and RESULTS the way its layout
+    needs; without one the generic parsers run.
+    With `grid_words` (see extract_pages), a complete RESULTS grid is read from word positions
+    and the text parsers are skipped; an incomplete one falls back to them.
+    `complete` means every column was filled from labeled header fields and a labeled RESULTS
+    block (or a complete grid), so text from further pages cannot change the row. A rejected
+    order (early_reject) is complete as soon as it is detected: its measurements stay empty.
+    """
+    if not isinstance(template, ReportTemplate):
+        template = template_named(template)
+    header_info = timed_stage("header", template.parse_header, full_text, file_name)
+
+    data_keys = RESULT_KEYS
+    rejected = header_info["Scan Status"] == "⚠️ Not Usable" and early_reject(full_text)
+    results_data = timed_stage("results", parse_results_grid, grid_words) if grid_words and not rejected else None
+    if rejected or (results_data and len(results_data) == len(data_keys)):
+        results_index = None
+    else:
+        # The template's RESULTS parser (the universal one for unknown layouts)
+        results_index = timed_stage("results", index_results_text, timed_stage("normalize", normalize_text, full_text))
+        results_data = timed_stage("results", template.parse_results, full_text, results_index)
 
     # Ensure all keys exist; if missing, mark parsing failed (unless already Warning/Not Usable)
-    data_keys = ["Fissure Completeness", "Voxel Density -910 HU", "Voxel Density -950 HU", "Inspiratory Volume (ml)"]
     if not results_data or any(k not in results_data for k in data_keys):
         if header_info["Scan Status"] == "✅ No Warnings":
             header_info["Scan Status"] = "⚠️ Parsing Failed"
@@ -525,73 +1351,2143 @@ def process_pdf(pdf_path):
     for key in data_keys:
         row_data.extend(results_data.get(key, [None] * 6))
 
+    complete = rejected or (
+        all(v is not None for v in row_data)
+        and header_is_labeled(full_text)
+        and (results_index is None or parse_results_labeled(full_text, results_index) == results_data)
+    )
+    return unique_id, row_data, complete
+
+def early_reject_saved(extracted_pages, pages_skipped, row_data, seconds):
+    """
+    Estimated seconds the early-reject fast path saved on a document (None if it did not apply):
+    its skipped pages at the document's own time per page read (`seconds` for open + extraction),
+    so page-heavy rejected reports count most.
+    """
+    if row_data[7] != "⚠️ Not Usable" or not early_reject("\n".join(extracted_pages)):
+        return None
+    return pages_skipped * seconds / len(extracted_pages)
+
+def process_pdf_with_pages(pdf_path, lazy=True, backend=DEFAULT_BACKEND, grid=False, data=None,
+                           limits=DEFAULT_LIMITS):
+    """
+    Like process_pdf, but also returns the extracted page text (None if the PDF could not be read
+    or went over `limits`) so callers can cache it, how many pages were skipped by lazy
+    extraction, whether `backend` fell back to pdfplumber (its text failed, or did not parse
+    fully), the RESULTS grid words, the name of the report template the document was parsed with
+    and, for rejected orders, the seconds the early-reject fast path saved (early_reject_saved;
+    None otherwise). `limits` (ResourceLimits, None for none) bound the whole document, fallback
+    included.
+    """
+    file_name = os.path.basename(pdf_path)
+    try:
+        with document_deadline(limits) as deadline:
+            return read_and_parse(pdf_path, file_name, lazy, backend, grid, data, limits, deadline)
+    except ResourceLimitExceeded as e:
+        print(f"⛔ Resource limit: {file_name} — {e}", file=sys.stderr)
+        return (*resource_limit_row(file_name, str(e)), None, 0, backend != DEFAULT_BACKEND, None, None, None)
+
+def read_and_parse(pdf_path, file_name, lazy, backend, grid, data, limits, deadline):
+    fell_back = backend != DEFAULT_BACKEND
+    if fell_back:
+        start = time.perf_counter()
+        try:
+            extracted_pages, pages_skipped, grid_words, template = extract_pages(
+                pdf_path, file_name if lazy else None, backend, grid, data, limits, deadline)
+        except Exception as e:
+            if resource_limit_cause(e):
+                raise resource_limit_cause(e) from None
+            extracted_pages = None
+        if extracted_pages:
+            seconds = time.perf_counter() - start
+            unique_id, row_data = parse_pages(extracted_pages, file_name, grid_words, template)
+            if backend_text_usable(row_data):
+                return (unique_id, row_data, extracted_pages, pages_skipped, False, grid_words, template,
+                        early_reject_saved(extracted_pages, pages_skipped, row_data, seconds))
+
+    start = time.perf_counter()
+    try:
+        extracted_pages, pages_skipped, grid_words, template = extract_pages(
+            pdf_path, file_name if lazy else None, grid=grid, data=data, limits=limits, deadline=deadline)
+        if not extracted_pages:
+            raise ValueError("PDF text could not be extracted.")
+    except Exception as e:
+        if resource_limit_cause(e):
+            raise resource_limit_cause(e) from None
+        print(f"❌ Failed to read or extract text from PDF: {file_name} — {e}", file=sys.stderr)
+        return (*failed_read_row(file_name), None, 0, fell_back, None, None, None)
+    seconds = time.perf_counter() - start
+
+    unique_id, row_data = parse_pages(extracted_pages, file_name, grid_words, template)
+    return (unique_id, row_data, extracted_pages, pages_skipped, fell_back, grid_words, template,
+            early_reject_saved(extracted_pages, pages_skipped, row_data, seconds))
+
+def process_pdf(pdf_path, backend=DEFAULT_BACKEND, grid=False, limits=DEFAULT_LIMITS):
+    unique_id, row_data, *_ = process_pdf_with_pages(pdf_path, backend=backend, grid=grid, limits=limits)
     return unique_id, row_data
 
+def process_pdf_timed(pdf_path, lazy=True, backend=DEFAULT_BACKEND, grid=False, data=None, limits=DEFAULT_LIMITS):
+    """
+    process_pdf_with_pages plus a metrics record for the document: page count, text size and
+    [wall, cpu] seconds per stage (open, extract_text, header, normalize, results) and in total.
+    Stages add up over the lazy page-by-page checks (and over both reads when a fast backend
+    falls back); header includes its own normalization.
+    """
+    global _stage_times
+    _stage_times = {}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        processed = process_pdf_with_pages(pdf_path, lazy, backend, grid, data, limits)
+    finally:
+        stage_times, _stage_times = _stage_times, None
+    extracted_pages = processed[2] or []
+    record = {
+        "file": os.path.basename(pdf_path),
+        "pages": len(extracted_pages),
+        "pages_skipped": processed[3],
+        "text_chars": sum(map(len, extracted_pages)),
+        "fell_back": processed[4],
+        "template": processed[6],
+        "early_reject": processed[7] is not None,
+        "stages": stage_times,
+        "total": [time.perf_counter() - wall, time.process_time() - cpu],
+    }
+    return processed, record
+
+# -----------------------------
+# Result cache (content hash + parser version)
+# -----------------------------
+# Bump to force a re-parse of everything even if the parser source is unchanged
+CACHE_FORMAT_VERSION = 1
+
+# Anything that can change a row for the same page text belongs here
+PARSER_FUNCTIONS = (normalize_text, find_header_labels, extract_header_info, IndexedLines, index_results_text,
+                    find_numbers_after, parse_labeled_lines, parse_unlabeled_lines, parse_results_labeled,
+                    parse_results_universal, group_rows, lobe_columns, parse_results_grid, patient_id_from_file_name,
+                    scan_status, early_reject, layout_fingerprint, ReportTemplate, *(type(t) for t in REPORT_TEMPLATES),
+                    parse_text)
+# Module constants the parser functions read, by name (looked up when the version is computed)
+PARSER_CONSTANTS = ("columns", "STATUS_MARKERS", "DATE", "HEADER_LABELS_RE", "HEADER_LABELS_ANYCASE_RE", "HEADER_FIELDS",
+                    "PATIENT_ID_VARIANT_RE", "PATIENT_LABEL_LINE_RE", "PATIENT_WORD_LINE_RE", "ID_WORD_LINE_RE",
+                    "HYPHEN_WRAP_RE", "LINE_BREAK_RE", "ID_TOKEN_RE", "FILENAME_SPLIT_RE", "FILENAME_ID_RE",
+                    "DATE_RE", "FIRST_NUMBER_RE", "RESULTS_RE", "NUMBER_TOKEN_RE", "INTEGER_TOKEN_RE",
+                    "RESULTS_LABEL_PATTERNS", "RESULTS_LABEL_RES", "RESULTS_LABEL_ANYCASE_RES",
+                    "RESULT_KEYS", "LOBES", "GRID_ROW_LABELS", "X_TOLERANCE", "Y_TOLERANCE",
+                    "FINGERPRINT_LABELS")
+
+def constant_source(value):
+    """
+    Stable text of a parser constant. Compiled patterns are spelled out with their flags (their
+    repr() cuts long patterns short); dicts, lists and tuples item by item.
+    """
+    if isinstance(value, re.Pattern):
+        return f"re.compile({value.pattern!r}, {int(value.flags)})"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{constant_source(k)}: {constant_source(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(constant_source(v) for v in value) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(constant_source(v) for v in value)) + "}"
+    return repr(value)
+
+def parser_version():
+    """
+    Fingerprint of the parsing code. Editing any function in PARSER_FUNCTIONS, or the value of any
+    constant in PARSER_CONSTANTS, invalidates cached rows (extracted page text stays valid, it only
+    depends on the PDF bytes).
+    """
+    h = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+    for fn in PARSER_FUNCTIONS:
+        try:
+            h.update(inspect.getsource(fn).encode("utf-8"))
+        except (OSError, TypeError):
+            h.update(marshal.dumps(fn.__code__))
+    for name in PARSER_CONSTANTS:
+        h.update(f"{name} = {constant_source(globals()[name])}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def routing_version():
+    """
+    Fingerprint of how documents are matched to a report template: FINGERPRINT_LABELS, the
+    layout fingerprint and each registered template's match rules. The template stored with cached
+    page text is only reused while this is unchanged.
+    """
+    h = hashlib.sha256(constant_source(FINGERPRINT_LABELS).encode("utf-8"))
+    for fn in (layout_fingerprint, ReportTemplate.matches, match_template):
+        h.update(inspect.getsource(fn).encode("utf-8"))
+    for t in REPORT_TEMPLATES:
+        h.update(constant_source((t.name, t.labels, t.producers, t.pages)).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def file_digest(path, chunk_size=1 << 20):
+    if not os.path.isfile(path):
+        return hashlib.sha256(read_archived_pdf(path)).hexdigest()
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ResultCache:
+    """
+    On-disk SQLite cache of extracted page text (keyed by PDF content hash) and parsed rows
+    (keyed by content hash + file name + parser version), with LRU eviction past `max_bytes`.
+    Text read by a non-default `backend`, or with RESULTS `grid` words, is kept under its own key,
+    e.g. "<hash>:pdfium+grid". The report template of each cached document is stored with its
+    text; `templates` counts them for the documents looked up. Text stored before the template
+    routing changed (routing_version) is a miss, so the document is re-extracted and re-matched.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, backend=DEFAULT_BACKEND, grid=False):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "stratx_cache.sqlite")
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.grid = grid
+        self.parser_version = parser_version()
+        self.routing_version = routing_version()
+        self.hits = self.reparsed = self.misses = 0
+        self.templates = Counter()
+        # Writes are committed as they happen, so concurrent runs (e.g. shards) can share the cache.
+        # One thread at a time may use it, not necessarily the one that opened it (run_pipeline).
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                digest TEXT PRIMARY KEY,
+                pages TEXT NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+            CREATE TABLE IF NOT EXISTS rows (
+                digest TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                parser_version TEXT NOT NULL,
+                unique_id TEXT,
+                row TEXT NOT NULL,
+                PRIMARY KEY (digest, file_name)
+            );
+        """)
+
+    def lookup(self, digest, file_name, counted=True):
+        """
+        Return (unique_id, row_data) for a cached PDF, or None on a miss.
+        If only the parser changed, the cached page text is re-parsed (no PDF extraction).
+        `counted=False` leaves the lookup out of the hit/miss and template counters (content
+        duplicates, see ContentIndex).
+        """
+        digest = self._key(digest)
+        hit = self.conn.execute("SELECT pages FROM pages WHERE digest = ?", (digest,)).fetchone()
+        cached_pages = json.loads(hit[0]) if hit else None
+        if isinstance(cached_pages, list):
+            cached_pages = {"pages": cached_pages, "skipped": 0}
+        if (cached_pages is None or cached_pages.get("routing") != self.routing_version
+                or (cached_pages["skipped"] and not cached_pages.get("status_scanned"))):
+            # Re-extract: the template routing changed, or lazy extraction stopped before the
+            # later pages were checked for status markers (text cached before later_status_marker)
+            self.misses += counted
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE pages SET last_used = ? WHERE digest = ?", (time.time(), digest))
+
+        cached = self.conn.execute(
+            "SELECT unique_id, row FROM rows WHERE digest = ? AND file_name = ? AND parser_version = ?",
+            (digest, file_name, self.parser_version),
+        ).fetchone()
+        template = cached_pages.get("template")
+        if cached:
+            self.hits += counted
+            self.templates[template or GENERIC_TEMPLATE.name] += counted
+            return cached[0], json.loads(cached[1])
+
+        unique_id, row_data, complete = parse_text("\n".join(cached_pages["pages"]), file_name,
+                                                   cached_pages.get("grid"), template)
+        if cached_pages["skipped"] and not complete:
+            # Lazy extraction stopped early and the new parser needs more pages
+            self.misses += counted
+            return None
+        if self.backend != DEFAULT_BACKEND and not backend_text_usable(row_data):
+            # The new parser no longer accepts this backend's text: re-extract (and fall back)
+            self.misses += counted
+            return None
+        self.reparsed += counted
+        self.templates[template or GENERIC_TEMPLATE.name] += counted
+        with self.conn:
+            self._store_row(digest, file_name, unique_id, row_data)
+        return unique_id, row_data
+
+    def store(self, digest, file_name, extracted_pages, unique_id, row_data, pages_skipped=0, grid_words=None,
+              template=None):
+        digest = self._key(digest)
+        pages_json = json.dumps({"pages": extracted_pages, "skipped": pages_skipped, "grid": grid_words,
+                                 "template": template, "routing": self.routing_version, "status_scanned": True})
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (digest, pages, nbytes, last_used) VALUES (?, ?, ?, ?)",
+                (digest, pages_json, len(pages_json), time.time()),
+            )
+            self._store_row(digest, file_name, unique_id, row_data)
+            self._evict()
+
+    def _key(self, digest):
+        if self.backend == DEFAULT_BACKEND and not self.grid:
+            return digest
+        return f"{digest}:{self.backend}" + ("+grid" if self.grid else "")
+
+    def _store_row(self, digest, file_name, unique_id, row_data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO rows (digest, file_name, parser_version, unique_id, row) VALUES (?, ?, ?, ?, ?)",
+            (digest, file_name, self.parser_version, unique_id, json.dumps(row_data)),
+        )
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used documents until we are back under the limit
+        for digest, nbytes in self.conn.execute("SELECT digest, nbytes FROM pages ORDER BY last_used").fetchall():
+            self.conn.execute("DELETE FROM pages WHERE digest = ?", (digest,))
+            self.conn.execute("DELETE FROM rows WHERE digest = ?", (digest,))
+            total -= nbytes
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+# -----------------------------
+# Typed results frame
+# -----------------------------
+SCAN_STATUSES = ("✅ No Warnings", "⚠️ Warning", "⚠️ Not Usable", "⚠️ Parsing Failed", "⚠️ Failed to Read",
+                 "⚠️ Resource Limit")
+DATE_COLUMNS = ["Upload Date", "CT Scan Date", "Report Date"]
+FISSURE_COLUMNS = columns[8:14]  # percentages with decimals
+COUNT_COLUMNS = columns[14:]  # voxel densities (%) and inspiratory volumes (ml), whole numbers
+TEXT_COLUMNS = [c for c in columns[:8] if c not in DATE_COLUMNS and c != "Scan Status"]
+# "Sept. 5, 2023" -> "Sep 5, 2023", so every report date parses with one strptime format
+MONTH_NAME_RE = r"^\s*([A-Za-z]{3})[A-Za-z]*\.?"
+
+def parse_distinct(values, parse):
+    """
+    Apply a column parser to the distinct values only and spread the result back over the rows;
+    measurements and dates repeat a lot, so this is many times faster on large frames.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    return pd.api.extensions.take(parsed.array, codes, allow_fill=True)
+
+def parse_report_dates(values):
+    """
+    Report dates ("Jul. 02, 2024") as datetime64; anything else becomes NaT.
+    """
+    months = pd.Series(values, dtype="string").str.replace(MONTH_NAME_RE, r"\1", regex=True)
+    return pd.to_datetime(months, format="%b %d, %Y", errors="coerce")
+
+def typed_results_frame(data):
+    """
+    Results as a typed DataFrame: `data` is a list of rows in `columns` order, or a frame read
+    back from a results file (any subset of the columns). Fissure completeness is float64, voxel
+    densities and volumes Int64, the three dates datetime64, Scan Status (and Site, when present)
+    categorical, the rest strings. The parser's "None" placeholder and unparseable values become
+    missing; columns that are already datetime64 or numeric are only cast. Column-wise only.
+    """
+    df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data, columns=columns)
+    for c in TEXT_COLUMNS:
+        if c in df:
+            df[c] = df[c].astype("string").replace("None", pd.NA)
+    for c in DATE_COLUMNS:
+        if c in df and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = parse_distinct(df[c], parse_report_dates)
+    for dtype, numeric_columns in (("float64", FISSURE_COLUMNS), ("Int64", COUNT_COLUMNS)):
+        for c in numeric_columns:
+            if c in df and pd.api.types.is_numeric_dtype(df[c]):
+                df[c] = df[c].astype(dtype)
+            elif c in df:
+                df[c] = parse_distinct(df[c], lambda v: pd.to_numeric(v, errors="coerce").astype(dtype))
+    if "Scan Status" in df:
+        df["Scan Status"] = pd.Categorical(df["Scan Status"], categories=SCAN_STATUSES)
+    if "Site" in df:
+        df["Site"] = df["Site"].astype("category")
+    return df
+
+RESULTS_CHUNK_ROWS = 100_000
+
+def import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet files need pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+def iter_results(path, usecols=None, chunksize=RESULTS_CHUNK_ROWS, typed=True):
+    """
+    Yield a results file (semicolon CSV, or Parquet file/folder of parts) as typed frames of at
+    most `chunksize` rows (one per part for Parquet), reading only `usecols` (None: all columns;
+    names the file does not have are skipped). CSV is read as text first, so IDs such as "075611"
+    keep their leading zeros; `typed=False` yields those text frames as they are.
+    """
+    convert = typed_results_frame if typed else (lambda df: df)
+    wanted = None if usecols is None else set(usecols)
+    if os.path.isdir(path):
+        parts = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".parquet"))
+    else:
+        parts = [path] if path.lower().endswith(".parquet") else None
+    if parts is not None:
+        pq = import_pyarrow()[1]
+        for part in parts:
+            names = [c for c in pq.read_schema(part).names if wanted is None or c in wanted]
+            yield convert(pd.read_parquet(part, columns=names))
+        return
+    read_cols = None if wanted is None else (lambda c: c in wanted)
+    with pd.read_csv(path, sep=";", encoding="utf-8-sig", dtype=str, usecols=read_cols,
+                     chunksize=chunksize) as chunks:
+        for chunk in chunks:
+            yield convert(chunk)
+
+def read_results(path, usecols=None):
+    """
+    Read a whole results file into one typed frame (see iter_results).
+    """
+    return pd.concat(iter_results(path, usecols), ignore_index=True)
+
+# -----------------------------
+# Streaming output
+# -----------------------------
+OUTPUT_BATCH_SIZE = 100
+
+class CsvRowWriter:
+    """
+    Append rows to a semicolon CSV (utf-8-sig, as before) in batches of `batch_size`.
+    Each batch goes out as whole lines and is flushed, so a crash leaves a readable partial file.
+    """
+    extension = ".csv"
+
+    def __init__(self, path, batch_size=OUTPUT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.batch = []
+        self.rows_written = 0
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.file.write(pd.DataFrame(columns=columns).to_csv(index=False, sep=";"))
+        self.file.flush()
+
+    def write(self, row):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.file.write(pd.DataFrame(self.batch, columns=columns).to_csv(index=False, header=False, sep=";"))
+            self.rows_written += len(self.batch)
+            self.batch = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+class ParquetRowWriter(CsvRowWriter):
+    """
+    Write rows as a Parquet dataset: `path` is a folder with one part file per batch, typed as
+    in typed_results_frame (dates are timestamps, Scan Status is dictionary-encoded).
+    Parts are written under a temp name and renamed, so after a crash every finished part is
+    valid and pd.read_parquet(path) reads them all. Needs pyarrow.
+    """
+    extension = ".parquet"
+
+    def __init__(self, path, batch_size=OUTPUT_BATCH_SIZE):
+        self.pa, self.pq = import_pyarrow()
+        pa = self.pa
+        types = {c: pa.string() for c in TEXT_COLUMNS}
+        types.update({c: pa.timestamp("ns") for c in DATE_COLUMNS})
+        types["Scan Status"] = pa.dictionary(pa.int8(), pa.string())
+        types.update({c: pa.float64() for c in FISSURE_COLUMNS})
+        types.update({c: pa.int64() for c in COUNT_COLUMNS})
+        self.schema = pa.schema([(c, types[c]) for c in columns])
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.batch = []
+        self.rows_written = 0
+        self.parts = 0
+        os.makedirs(path, exist_ok=True)
+        # Parts left by an earlier attempt are rewritten from the start
+        for name in os.listdir(path):
+            if name.startswith("part-"):
+                os.remove(os.path.join(path, name))
+
+    def flush(self):
+        if not self.batch:
+            return
+        df = typed_results_frame(self.batch)
+        part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        self.pq.write_table(self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False), part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self.parts += 1
+        self.rows_written += len(self.batch)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+
+OUTPUT_WRITERS = {"csv": CsvRowWriter, "parquet": ParquetRowWriter}
+
+def open_row_writer(output_folder, stem, output_format="csv", batch_size=OUTPUT_BATCH_SIZE):
+    writer_class = OUTPUT_WRITERS[output_format]
+    return writer_class(os.path.join(output_folder, stem + writer_class.extension), batch_size)
+
+# -----------------------------
+# Historical store (cross-run dedup)
+# -----------------------------
+HISTORY_NAME = "StratX_History.sqlite"
+STORE_COLUMN_TYPES = {**{c: "TEXT" for c in columns[:8]}, **{c: "REAL" for c in FISSURE_COLUMNS},
+                      **{c: "INTEGER" for c in COUNT_COLUMNS}}
+STORE_COLUMNS = [*columns, "Site", "Source Path", "Updated"]
+STORE_INDEXES = {"patient": ["Patient ID"], "scan": ["Scan ID"], "site": ["Site", "Report Date"],
+                 "upload_date": ["Upload Date"], "ct_scan_date": ["CT Scan Date"], "report_date": ["Report Date"]}
+
+def site_of(rel_path):
+    """
+    Site of a PDF from its path relative to the main folder: the top-level site folder, or site
+    archive without its .zip extension. None for PDFs lying directly in the main folder.
+    """
+    parts = os.path.normpath(rel_path).split(os.sep)
+    if len(parts) < 2:
+        return None
+    return parts[0][:-4] if is_zip_name(parts[0]) else parts[0]
+
+def quote_column(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class ResultsStore:
+    """
+    Persistent SQLite store of parsed rows across runs, one per unique_id (PatientID_ScanID, or
+    the file name): a later run replaces the stored row, so the store holds the latest result of
+    every scan however many runs saw it. Rows are typed as in typed_results_frame (dates as ISO
+    text, so they sort and range-scan) with the report's Site, its source path and the time of
+    the run that wrote it. Patient ID, Scan ID, Site (+ Report Date) and each date are indexed.
+    Rows are upserted in batches of `batch_size`, one transaction each.
+    """
+    def __init__(self, path, batch_size=OUTPUT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.batch = []
+        self.upserts = 0
+        self.run_time = datetime.now().isoformat(timespec="seconds")
+        # With --pipeline rows arrive on the output stage's thread; use is still one thread at a time
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        column_defs = ", ".join(f"{quote_column(c)} {STORE_COLUMN_TYPES.get(c, 'TEXT')}" for c in STORE_COLUMNS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS results (unique_id TEXT PRIMARY KEY, {column_defs})")
+        for name, cols in STORE_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS results_{name} ON results "
+                              f"({', '.join(map(quote_column, cols))})")
+        self.conn.commit()
+        names = ", ".join(map(quote_column, STORE_COLUMNS))
+        updates = ", ".join(f"{quote_column(c)} = excluded.{quote_column(c)}" for c in STORE_COLUMNS)
+        placeholders = ", ".join("?" * (len(STORE_COLUMNS) + 1))
+        self.upsert_sql = (f"INSERT INTO results (unique_id, {names}) VALUES ({placeholders}) "
+                           f"ON CONFLICT (unique_id) DO UPDATE SET {updates}")
+
+    def add(self, rel_path, unique_id, row_data):
+        """
+        Queue a row of the PDF at `rel_path` (relative to the main folder, which gives its Site).
+        """
+        self.batch.append((unique_id, rel_path, row_data))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        df = typed_results_frame([row_data for _, _, row_data in self.batch])
+        for c in DATE_COLUMNS:
+            df[c] = df[c].dt.strftime("%Y-%m-%d")
+        values = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        records = [(unique_id, *(v.item() if hasattr(v, "item") else v for v in row), site_of(rel_path), rel_path,
+                    self.run_time) for (unique_id, rel_path, _), row in zip(self.batch, values)]
+        with self.conn:
+            self.conn.executemany(self.upsert_sql, records)
+        self.upserts += len(records)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _dicts(self, cursor):
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def get(self, unique_id):
+        """
+        The stored row (a dict by column name, plus unique_id) of one scan, or None.
+        """
+        rows = self._dicts(self.conn.execute("SELECT * FROM results WHERE unique_id = ?", (unique_id,)))
+        return rows[0] if rows else None
+
+    def latest(self, patient_id):
+        """
+        The patient's most recent report (by Report Date) as a dict, or None.
+        """
+        rows = self._dicts(self.conn.execute(
+            'SELECT * FROM results WHERE "Patient ID" = ? ORDER BY "Report Date" DESC LIMIT 1', (patient_id,)))
+        return rows[0] if rows else None
+
+    def extract(self, site=None, patient_id=None, scan_id=None, date_from=None, date_to=None,
+                date_column="Report Date"):
+        """
+        Stored rows matching every given filter, as a typed frame (see typed_results_frame) with
+        unique_id, Site, Source Path and Updated. Dates bound `date_column` inclusively and may be
+        anything pd.Timestamp accepts. Each filter is served by an index.
+        """
+        if date_column not in DATE_COLUMNS:
+            raise ValueError(f"date_column must be one of {DATE_COLUMNS}")
+        where, params = [], []
+        for column, value in (("Site", site), ("Patient ID", patient_id), ("Scan ID", scan_id)):
+            if value is not None:
+                where.append(f"{quote_column(column)} = ?")
+                params.append(value)
+        for op, value in ((">=", date_from), ("<=", date_to)):
+            if value is not None:
+                where.append(f"{quote_column(date_column)} {op} ?")
+                params.append(pd.Timestamp(value).strftime("%Y-%m-%d"))
+        sql = "SELECT * FROM results" + (" WHERE " + " AND ".join(where) if where else "")
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        for c in DATE_COLUMNS:
+            df[c] = pd.to_datetime(df[c], format="%Y-%m-%d", errors="coerce")
+        return typed_results_frame(df)
+
+# -----------------------------
+# Run metrics (stage timing report)
+# -----------------------------
+METRIC_STAGES = ("open", "extract_text", "normalize", "header", "results", "total")
+HISTOGRAM_BOUNDS_MS = (1, 3, 10, 30, 100, 300, 1000)
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+class RunMetrics:
+    """
+    Collects the per-document records of process_pdf_timed and reports per-stage totals,
+    percentiles and a wall-time histogram. Cached PDFs are counted but have no timings.
+    """
+    def __init__(self):
+        self.records = []
+        self.cached = 0
+
+    def add(self, record):
+        self.records.append(record)
+
+    def stage_times(self, stage, kind=0):
+        times = (r["total"] if stage == "total" else r["stages"].get(stage, (0.0, 0.0)) for r in self.records)
+        return sorted(t[kind] for t in times)
+
+    def summary(self):
+        summary = {"documents": len(self.records), "cached": self.cached,
+                   "pages": sum(r["pages"] for r in self.records),
+                   "text_chars": sum(r["text_chars"] for r in self.records), "stages": {}}
+        for stage in METRIC_STAGES:
+            wall = self.stage_times(stage)
+            if not wall:
+                continue
+            pick = lambda q: wall[min(len(wall) - 1, int(q * len(wall)))]
+            counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+            for t in wall:
+                counts[sum(t * 1000 >= b for b in HISTOGRAM_BOUNDS_MS)] += 1
+            summary["stages"][stage] = {
+                "wall_s": sum(wall), "cpu_s": sum(self.stage_times(stage, 1)),
+                "p50_ms": pick(0.50) * 1000, "p90_ms": pick(0.90) * 1000, "p99_ms": pick(0.99) * 1000,
+                "max_ms": wall[-1] * 1000, "histogram_ms": counts,
+            }
+        return summary
+
+    def print_report(self):
+        summary = self.summary()
+        print(f"\n⏱️ Stage timings: {summary['documents']} PDFs parsed, {summary['cached']} from cache, "
+              f"{summary['pages']} pages, {summary['text_chars']} characters")
+        print(f"{'stage':<13}{'wall s':>9}{'cpu s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for stage, st in summary["stages"].items():
+            print(f"{stage:<13}{st['wall_s']:>9.2f}{st['cpu_s']:>9.2f}{st['p50_ms']:>9.1f}"
+                  f"{st['p90_ms']:>9.1f}{st['p99_ms']:>9.1f}{st['max_ms']:>9.1f}")
+        labels = [f"<{HISTOGRAM_BOUNDS_MS[0]}"] + [f"{a}-{b}" for a, b in zip(HISTOGRAM_BOUNDS_MS, HISTOGRAM_BOUNDS_MS[1:])]
+        labels.append(f">={HISTOGRAM_BOUNDS_MS[-1]}")
+        print(f"\n📊 Wall time per PDF (ms)\n{'stage':<13}" + "".join(f"{label:>9}" for label in labels))
+        for stage, st in summary["stages"].items():
+            print(f"{stage:<13}" + "".join(f"{n:>9}" for n in st["histogram_ms"]))
+
+    def write(self, path):
+        """
+        Save metrics: .csv gets one row per document (wall/cpu ms per stage), anything else
+        gets JSON with the summary and every document record.
+        """
+        if path.lower().endswith(".csv"):
+            rows = []
+            for r in self.records:
+                row = {"file": r["file"], "pages": r["pages"], "pages_skipped": r["pages_skipped"],
+                       "text_chars": r["text_chars"], "fell_back": r["fell_back"], "template": r.get("template"),
+                       "early_reject": r.get("early_reject")}
+                for stage in METRIC_STAGES:
+                    wall, cpu = r["total"] if stage == "total" else r["stages"].get(stage, (0.0, 0.0))
+                    row[f"{stage}_wall_ms"], row[f"{stage}_cpu_ms"] = wall * 1000, cpu * 1000
+                rows.append(row)
+            pd.DataFrame(rows).to_csv(path, index=False, sep=";")
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"summary": self.summary(), "documents": self.records}, f, ensure_ascii=False, indent=1)
+        print(f"📈 Metrics saved to: {path}")
+
+# -----------------------------
+# Content duplicates (before parsing)
+# -----------------------------
+def text_fingerprint(pdf_path, data=None):
+    """
+    sha256 of a PDF's first-page text with case and whitespace normalized, or None if it has no
+    readable text. Read with PDFium's plain text when pypdfium2 is installed (a few ms), else
+    pdfplumber; either way only the first page.
+    """
+    source = io.BytesIO(data) if data is not None else open_pdf_source(pdf_path)
+    try:
+        try:
+            pypdfium2 = import_pypdfium2()
+        except RuntimeError:
+            with pdfplumber.open(source) as pdf:
+                text = pdf.pages[0].extract_text() if pdf.pages else ""
+        else:
+            pdf = pypdfium2.PdfDocument(source)
+            try:
+                textpage = pdf[0].get_textpage() if len(pdf) else None
+                text = textpage.get_text_range() if textpage else ""
+            finally:
+                pdf.close()
+    except Exception:
+        return None
+    words = normalize_text(text or "").lower().split()
+    return hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest() if words else None
+
+class ContentIndex:
+    """
+    Pre-parse duplicate detection for one run: a PDF with the same bytes (content hash) as an
+    earlier one or, with `text=True`, the same normalized first-page text (text_fingerprint), is
+    not extracted again. Its row is parsed from the original's text under its own file name, so
+    File Name and the unique_id dedup come out as if it had been read. `pairs` lists
+    (duplicate path, original path, "bytes" or "text").
+    """
+    def __init__(self, text=False):
+        self.text = text
+        self.originals = {}  # ("bytes", digest) / ("text", fingerprint) -> original path
+        # original path -> ("pages", pages, grid_words, template), ("cache", digest) or ("unread", row_data)
+        self.sources = {}
+        self.pairs = []
+
+    def known(self, digest):
+        return ("bytes", digest) in self.originals
+
+    def original_of(self, pdf_path, digest, fingerprint=None):
+        """
+        The earlier PDF with this content, or None, in which case `pdf_path` is registered as the
+        original for its keys.
+        """
+        keys = [("bytes", digest)] + ([("text", fingerprint)] if fingerprint else [])
+        for key in keys:
+            original = self.originals.get(key)
+            if original:
+                self.pairs.append((pdf_path, original, key[0]))
+                return original
+        for key in keys:
+            self.originals[key] = pdf_path
+        return None
+
+    def remember(self, pdf_path, processed=None, digest=None, cached=False):
+        """
+        Keep an original's text (from a process_pdf_with_pages result), or its row if it was not
+        read; with `cached=True` (or no result), keep the digest its text is cached under instead.
+        """
+        if processed is not None and not processed[2]:
+            self.sources[pdf_path] = ("unread", processed[1])
+        elif processed is not None and not cached:
+            extracted_pages, _, _, grid_words, template = processed[2:7]
+            self.sources[pdf_path] = ("pages", extracted_pages, grid_words, template)
+        else:
+            self.sources[pdf_path] = ("cache", digest)
+
+    def derive(self, pdf_path, original, cache=None):
+        """
+        (unique_id, row_data) of a duplicate from its original's text, or None if that text is
+        gone (then the duplicate is parsed after all).
+        """
+        file_name = os.path.basename(pdf_path)
+        source = self.sources.get(original)
+        if source is None:
+            return None
+        if source[0] == "cache":
+            return cache.lookup(source[1], file_name, counted=False) if cache else None
+        if source[0] == "unread":
+            return file_name, [file_name, *source[1][1:]]
+        _, extracted_pages, grid_words, template = source
+        return parse_pages(extracted_pages, file_name, grid_words, template)
+
+    def write_pairs(self, path, base):
+        """
+        Save the pairs as a semicolon CSV, paths relative to `base`.
+        """
+        rows = [(os.path.relpath(dup, base), os.path.relpath(orig, base), match) for dup, orig, match in self.pairs]
+        pd.DataFrame(rows, columns=["Duplicate", "Original", "Match"]).to_csv(path, index=False, sep=";",
+                                                                              encoding="utf-8-sig")
+
+def content_index(content_dedup, text_dedup, hashed):
+    """
+    The run's ContentIndex, or None. `content_dedup=None` looks for byte copies only when the run
+    hashes every PDF anyway (`hashed`: with the result cache, or the incremental manifest), so it
+    costs no extra read; True looks for them regardless, at one full-file hash per PDF.
+    """
+    if content_dedup is None:
+        content_dedup = hashed
+    return ContentIndex(text_dedup) if content_dedup or text_dedup else None
+
+# -----------------------------
+# Worker recycling
+# -----------------------------
+class RecyclingPool(Executor):
+    """
+    A process pool whose workers are replaced after about `recycle_after` documents each: after
+    recycle_after × workers submissions, a fresh pool takes new work while the old one finishes
+    its queue and exits, so memory a worker held on to is returned and long runs keep a stable
+    footprint. Without `recycle_after` it is a plain ProcessPoolExecutor. (The executor's own
+    max_tasks_per_child hangs on Python 3.11.) `initializer` runs in every new worker.
+    """
+    def __init__(self, workers, recycle_after=None, initializer=None):
+        self.workers = workers
+        self.per_pool = recycle_after * workers if recycle_after else None
+        self.initializer = initializer
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=initializer)
+        self.submitted = 0
+        self.recycled = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self.per_pool and self.submitted >= self.per_pool:
+            self.pool.shutdown(wait=False)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer)
+            self.submitted = 0
+            self.recycled += 1
+        self.submitted += 1
+        return self.pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+# -----------------------------
+# Async pipeline (discovery → prefetch → parse → output)
+# -----------------------------
+# For slow network shares: while the parse executor keeps the CPUs busy, reader threads are
+# already fetching the next files' bytes, and the directory walk runs ahead of both.
+PIPELINE_READERS = 4
+PIPELINE_QUEUE_SIZE = 32
+
+class PipelineInterrupted(Exception):
+    """
+    The sink raised KeyboardInterrupt. Raised out of an asyncio task, KeyboardInterrupt would stop
+    the event loop with the other stages still pending, so run_pipeline stops them and raises this.
+    """
+
+def prefetch_pdf(pdf_path, hash_data=False):
+    """
+    (bytes, sha256 hex digest or None) of a PDF; (None, None) if it cannot be read, in which
+    case the parse stage reports the failure.
+    """
+    try:
+        data = read_pdf_bytes(pdf_path)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None, None
+    return data, hashlib.sha256(data).hexdigest() if hash_data else None
+
+async def run_pipeline(pdf_paths, sink, workers=1, readers=PIPELINE_READERS, queue_size=PIPELINE_QUEUE_SIZE,
+                       cache=None, stats=None, lazy=True, metrics=None, backend=DEFAULT_BACKEND, grid=False,
+                       dedup=None, limits=DEFAULT_LIMITS, recycle_after=None):
+    """
+    Parse `pdf_paths` and call sink(pdf_path, unique_id, row_data) for each, in their order.
+
+    Stages, each with its own concurrency: discovery (one thread consuming `pdf_paths`, which
+    may be a lazy generator such as find_pdf_files), prefetch (`readers` threads reading file
+    bytes; cache lookups by content hash happen here), parsing (`workers` processes, or one
+    thread for workers=1) and output (`sink`, one thread). The stages are joined by queues of
+    `queue_size` items, and at most `queue_size` PDFs are between discovery and the sink, so a
+    slow stage holds back the ones before it instead of letting memory grow.
+    Counters, metrics, cache writes, `dedup`, `limits` and `recycle_after` are the same as with
+    iter_pdf_results, except that of two copies read at the same time, the first one read is
+    the original. Cache and dedup calls (SQLite, re-parsing) run on one bookkeeping thread, in
+    the order they are made, so they do not stall the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    task = partial(process_pdf_timed if metrics else process_pdf_with_pages, lazy=lazy, backend=backend, grid=grid,
+                   limits=limits)
+    originals = {}  # original path -> future of its result
+    duplicates = set()
+
+    # Run on the bookkeeping thread
+    def finish(pdf_path, digest, processed):
+        if dedup:
+            dedup.remember(pdf_path, processed[0] if metrics else processed, digest, cached=cache is not None)
+        return record_result(pdf_path, digest, processed, cache, stats, metrics, backend)
+
+    def cached_result(pdf_path, digest):
+        cached = cache.lookup(digest, os.path.basename(pdf_path))
+        if cached:
+            if metrics:
+                metrics.cached += 1
+            if dedup:
+                dedup.remember(pdf_path, digest=digest)
+        return cached
+
+    def derive(pdf_path, original):
+        derived = dedup.derive(pdf_path, original, cache)
+        if derived is not None and stats is not None:
+            stats["content_duplicates"] += 1
+        return derived
+
+    async def duplicate(pdf_path, digest, data, original, result):
+        await asyncio.wait([originals[original]])
+        derived = await loop.run_in_executor(bookkeeping, derive, pdf_path, original)
+        if derived is None:
+            await parse_queue.put((pdf_path, digest, data, result))
+            return
+        result.set_result(derived)
+    read_queue = asyncio.Queue(queue_size)
+    parse_queue = asyncio.Queue(queue_size)
+    output_queue = asyncio.Queue(queue_size)  # (pdf_path, future of its result), in discovery order
+    parse_pool = RecyclingPool(workers, recycle_after) if workers > 1 else ThreadPoolExecutor(1)
+    bookkeeping = ThreadPoolExecutor(1)
+
+    async def discover(walk_pool):
+        paths = iter(pdf_paths)
+        while True:
+            pdf_path = await loop.run_in_executor(walk_pool, next, paths, None)
+            if pdf_path is None:
+                break
+            result = loop.create_future()
+            await output_queue.put((pdf_path, result))
+            await read_queue.put((pdf_path, result))
+        await output_queue.put(None)
+        for _ in range(readers):
+            await read_queue.put(None)
+
+    async def prefetch(read_pool):
+        while True:
+            item = await read_queue.get()
+            if item is None:
+                break
+            pdf_path, result = item
+            data, digest = await loop.run_in_executor(read_pool, prefetch_pdf, pdf_path,
+                                                      cache is not None or dedup is not None)
+            original = None
+            if dedup and digest:
+                fingerprint = None
+                if dedup.text and not dedup.known(digest):
+                    fingerprint = await loop.run_in_executor(read_pool, text_fingerprint, pdf_path, data)
+                original = dedup.original_of(pdf_path, digest, fingerprint)
+                if original:
+                    # Resolved once the original is parsed, without holding up this reader
+                    duplicates.add(asyncio.ensure_future(duplicate(pdf_path, digest, data, original, result)))
+                    continue
+                originals[pdf_path] = result
+            cached = None
+            if cache and digest:
+                cached = await loop.run_in_executor(bookkeeping, cached_result, pdf_path, digest)
+            if cached:
+                result.set_result(cached)
+            else:
+                await parse_queue.put((pdf_path, digest, data, result))
+
+    async def prefetch_all(read_pool):
+        await asyncio.gather(*(prefetch(read_pool) for _ in range(readers)))
+        if duplicates:
+            await asyncio.gather(*duplicates)
+        for _ in range(workers):
+            await parse_queue.put(None)
+
+    async def parse():
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                break
+            pdf_path, digest, data, result = item
+            try:
+                processed = await loop.run_in_executor(parse_pool, partial(task, pdf_path, data=data))
+                result.set_result(await loop.run_in_executor(bookkeeping, finish, pdf_path, digest, processed))
+            except Exception as e:
+                result.set_exception(e)
+
+    async def output(sink_pool):
+        while True:
+            item = await output_queue.get()
+            if item is None:
+                break
+            pdf_path, result = item
+            try:
+                await loop.run_in_executor(sink_pool, sink, pdf_path, *await result)
+            except KeyboardInterrupt as e:
+                raise PipelineInterrupted() from e
+
+    print(f"⚙️ Pipeline: {readers} readers, {workers} parse workers, queues of {queue_size}")
+    with ThreadPoolExecutor(1) as walk_pool, ThreadPoolExecutor(readers) as read_pool, \
+            ThreadPoolExecutor(1) as sink_pool, bookkeeping, parse_pool:
+        tasks = [asyncio.ensure_future(c) for c in (discover(walk_pool), prefetch_all(read_pool),
+                                                    *(parse() for _ in range(workers)), output(sink_pool))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # A failing or interrupted stage stops the others rather than leaving them blocked on a
+            # full queue, and they are awaited so none is left pending when the loop closes
+            pending = [t for t in (*tasks, *duplicates) if not t.done()]
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+# -----------------------------
+# File discovery (parallel, cached)
+# -----------------------------
+DISCOVERY_THREADS = 16
+DEFAULT_EXCLUDES = ("StratX_Results",)  # earlier outputs under the main folder
+# A folder changed within this many seconds may change again without a new mtime (coarse NFS
+# timestamps), so its listing is not cached yet
+LISTING_SETTLE_SECONDS = 2
+
+class ListingCache:
+    """
+    Folder listings (and the PDFs inside zips) from earlier runs, in SQLite, keyed by path and
+    stamped with the folder's mtime (a zip's size and mtime): a folder whose mtime is unchanged
+    has the same entries, so it is not listed again. Loaded into memory when opened, so discovery
+    threads can share it; new listings are written on close.
+    """
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "stratx_listings.sqlite")
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS listings (path TEXT PRIMARY KEY, stamp TEXT NOT NULL, "
+                          "entries TEXT NOT NULL)")
+        self.listings = {path: (stamp, entries) for path, stamp, entries in self.conn.execute("SELECT * FROM listings")}
+        self.changed = {}
+        self.hits = self.misses = 0
+
+    def get(self, path, stamp):
+        cached = self.listings.get(path)
+        if cached and cached[0] == stamp:
+            self.hits += 1
+            return json.loads(cached[1])
+        self.misses += 1
+        return None
+
+    def put(self, path, stamp, entries):
+        self.changed[path] = (stamp, json.dumps(entries, ensure_ascii=False))
+
+    def close(self):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO listings (path, stamp, entries) VALUES (?, ?, ?)",
+                                  [(path, *listing) for path, listing in self.changed.items()])
+        self.conn.close()
+
+def list_folder(path, cache=None):
+    """
+    Entries of one folder in listing order as [name, is_folder] pairs, keeping only folders, PDFs
+    and zips (macOS '._' copies left out). Symlinked folders are left out too (os.walk does not
+    follow them). With a ListingCache, a folder with an unchanged mtime is not listed again.
+    """
+    stat = os.stat(path)
+    stamp = str(stat.st_mtime_ns)
+    entries = cache.get(path, stamp) if cache else None
+    if entries is None:
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        entries.append([name, True])
+                elif (name.lower().endswith(".pdf") and not name.startswith("._")) or is_zip_name(name):
+                    entries.append([name, False])
+        if cache and time.time() - stat.st_mtime > LISTING_SETTLE_SECONDS:
+            cache.put(path, stamp, entries)
+    return entries
+
+def zip_pdf_members(zip_path, cache=None):
+    """
+    Paths of the PDFs inside a zip (nested zips included), relative to the zip; cached by the
+    zip's size and mtime. An unreadable archive is reported and has none.
+    """
+    stat = os.stat(zip_path)
+    stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+    members = cache.get(zip_path, stamp) if cache else None
+    if members is None:
+        try:
+            with zipfile.ZipFile(zip_path) as zf:
+                members = [os.path.relpath(member, zip_path) for member in find_zip_pdfs(zf, zip_path)]
+        except zipfile.BadZipFile as e:
+            print(f"❌ Skipping unreadable archive: {zip_path} — {e}")
+            return []
+        if cache:
+            cache.put(zip_path, stamp, members)
+    return members
+
+def walk_pdf_files(root, cache=None, prune=None, threads=DISCOVERY_THREADS):
+    """
+    Yield every PDF under `root` in os.walk order (a folder's files, then its subfolders), zips
+    walked like folders. Folders are listed by `threads` threads that crawl ahead of the caller,
+    each starting on the subfolders of a folder as soon as it is listed, so PDFs stream out while
+    the rest of the tree is still being read. `prune(folder)` True skips a folder's subtree.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="stratx-discovery")
+
+    def expand(path):
+        try:
+            entries = list_folder(path, cache)
+        except OSError as e:
+            print(f"⚠️ Skipping unreadable folder: {path} — {e}")
+            return [], deque()
+        files, subfolders = [], deque()
+        for name, is_folder in entries:
+            full = os.path.join(path, name)
+            if is_folder:
+                if not (prune and prune(full)):
+                    subfolders.append(pool.submit(expand, full))
+            elif is_zip_name(name):
+                files.extend(os.path.join(full, member) for member in zip_pdf_members(full, cache))
+            else:
+                files.append(full)
+        return files, subfolders
+
+    def visit(future):
+        files, subfolders = future.result()
+        yield from files
+        while subfolders:
+            yield from visit(subfolders.popleft())
+
+    try:
+        yield from visit(pool.submit(expand, root))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def find_pdf_files(main_folder, cache=None, prune=None, threads=DISCOVERY_THREADS):
+    """
+    Yield every PDF under `main_folder` in os.walk order; .zip files are walked like folders.
+    This order is the canonical one: rows are merged (and deduplicated) in it.
+    See walk_pdf_files for `cache`, `prune` and `threads`.
+    """
+    return walk_pdf_files(main_folder, cache, prune, threads)
+
+def input_roots(main_folder):
+    """
+    (roots, base) of a main folder or a list of them. PDF paths are made relative to `base` (for
+    checkpoints, manifests and sites): the folder itself, or the common parent of several roots.
+    """
+    roots = [main_folder] if isinstance(main_folder, (str, os.PathLike)) else list(main_folder)
+    base = roots[0] if len(roots) == 1 else os.path.commonpath([os.path.abspath(r) for r in roots])
+    return roots, base
+
+def path_matches(rel_path, patterns):
+    """
+    True if a glob matches the relative path, one of its folders (by name or by path) or the file
+    name. Paths use / separators and * also crosses folders.
+    """
+    parts = rel_path.replace(os.sep, "/").split("/")
+    candidates = {*parts, *("/".join(parts[:i]) for i in range(2, len(parts) + 1))}
+    return any(fnmatch.fnmatch(c, p) for p in patterns for c in candidates)
+
+def path_selected(rel_path, include=None, exclude=None):
+    """
+    Whether a PDF passes the include/exclude globs (see path_matches).
+    """
+    return (not include or path_matches(rel_path, include)) and not (exclude and path_matches(rel_path, exclude))
+
+def find_input_pdfs(main_folder, include=None, exclude=None, cache=None, skip=(), threads=DISCOVERY_THREADS):
+    """
+    Yield (pdf_path, rel_path) for every PDF under `main_folder` (one root or a list) that passes
+    the include/exclude globs: root by root, each in find_pdf_files order. Folders named in
+    DEFAULT_EXCLUDES, folders `exclude` matches and the folders in `skip` (e.g. the output folder)
+    are not walked at all. `cache` is a ListingCache.
+    """
+    roots, base = input_roots(main_folder)
+    exclude = [*DEFAULT_EXCLUDES, *(exclude or ())]
+    skip = {os.path.abspath(folder) for folder in skip}
+
+    def prune(folder):
+        return os.path.abspath(folder) in skip or path_matches(os.path.relpath(folder, base), exclude)
+
+    for root in roots:
+        for pdf_path in find_pdf_files(root, cache, prune, threads):
+            rel_path = os.path.relpath(pdf_path, base)
+            if path_selected(rel_path, include, exclude):
+                yield pdf_path, rel_path
+
 # -----------------------------
 # Folder runner + summary
 # -----------------------------
-def process_main_folder(main_folder, output_folder):
-    data_dict = {}
+def record_result(pdf_path, digest, processed, cache=None, stats=None, metrics=None, backend=DEFAULT_BACKEND):
+    """
+    Book-keeping for a parsed PDF (a process_pdf_with_pages result, or process_pdf_timed's with
+    `metrics`): add its counters to `stats`, cache its text under `digest`. Returns (unique_id, row_data).
+    """
+    if metrics:
+        processed, record = processed
+        metrics.add(record)
+    unique_id, row_data, extracted_pages, pages_skipped, fell_back, grid_words, template, saved = processed
+    if stats is not None:
+        stats["pages_extracted"] += len(extracted_pages or ())
+        stats["pages_skipped"] += pages_skipped
+        if saved is not None:
+            stats["early_rejects"] += 1
+            stats["early_reject_pages"] += pages_skipped
+            stats["early_reject_seconds"] += saved
+        if fell_back:
+            stats[f"{backend}_fallbacks"] += 1
+        if extracted_pages:
+            stats[f"{DEFAULT_BACKEND if fell_back else backend}_hits"] += 1
+            stats[f"template:{template}"] += 1
+    if cache and extracted_pages and digest:
+        cache.store(digest, os.path.basename(pdf_path), extracted_pages, unique_id, row_data, pages_skipped,
+                    grid_words, template)
+    return unique_id, row_data
+
+def iter_pdf_results(pdf_paths, workers=1, cache=None, digests=None, stats=None, lazy=True, metrics=None,
+                     backend=DEFAULT_BACKEND, grid=False, dedup=None, limits=DEFAULT_LIMITS, recycle_after=None):
+    """
+    Yield (unique_id, row_data) for each of `pdf_paths`, in the same order, as soon as it is ready.
+    With a cache, PDFs whose content hash is known skip extraction; `digests` may supply
+    already-computed hashes (one per path). Page, backend ("<backend>_hits": PDFs whose text came
+    from that backend, "<backend>_fallbacks": re-read with pdfplumber) and report template
+    ("template:<name>") counters of the extracted PDFs are added to `stats` (a Counter).
+    `lazy=False` extracts every page even when the row is complete after the first ones.
+    Only a few PDFs per worker are in flight at once, so memory does not grow with the folder.
+    With `metrics` (a RunMetrics), every parsed PDF is timed per stage.
+    `grid=True` reads RESULTS values from word positions (parse_results_grid) where possible.
+    With `dedup` (a ContentIndex), content duplicates of earlier paths are not extracted; their
+    rows are parsed from the original's text once it is ready ("content_duplicates" in `stats`).
+    `limits` (ResourceLimits) bound each document; with `recycle_after`, worker processes are
+    replaced after about that many documents each (RecyclingPool).
+    """
+    task = partial(process_pdf_timed if metrics else process_pdf_with_pages, lazy=lazy, backend=backend, grid=grid,
+                   limits=limits)
+
+    def lookup(i, pdf_path):
+        """
+        (digest, original, cached): the PDF this one duplicates, else its cached result.
+        """
+        if not cache and not dedup:
+            return None, None, None
+        digest = digests[i] if digests else file_digest(pdf_path)
+        original = None
+        if dedup:
+            fingerprint = text_fingerprint(pdf_path) if dedup.text and not dedup.known(digest) else None
+            original = dedup.original_of(pdf_path, digest, fingerprint)
+        cached = cache.lookup(digest, os.path.basename(pdf_path)) if cache and not original else None
+        if cached:
+            if metrics:
+                metrics.cached += 1
+            if dedup:
+                dedup.remember(pdf_path, digest=digest)
+        return digest, original, cached
+
+    def finish(pdf_path, digest, processed):
+        if dedup:
+            # Cached text is looked up again for a duplicate rather than kept in memory
+            dedup.remember(pdf_path, processed[0] if metrics else processed, digest, cached=cache is not None)
+        return record_result(pdf_path, digest, processed, cache, stats, metrics, backend)
+
+    def duplicate(pdf_path, digest, original):
+        derived = dedup.derive(pdf_path, original, cache)
+        if derived is None:
+            return finish(pdf_path, digest, task(pdf_path))
+        if stats is not None:
+            stats["content_duplicates"] += 1
+        return derived
+
+    if workers <= 1:
+        for i, pdf_path in enumerate(pdf_paths):
+            digest, original, cached = lookup(i, pdf_path)
+            if original:
+                yield duplicate(pdf_path, digest, original)
+            else:
+                yield cached or finish(pdf_path, digest, task(pdf_path))
+        return
+
+    print(f"⚙️ Processing PDFs with {workers} workers")
+    # Bounded read-ahead: enough queued work to keep every worker busy, results released in order
+    window = workers * 4
+    pending = deque()
+
+    def result(pdf_path, digest, original, cached, future):
+        # A duplicate's original comes before it, so its text is ready by now
+        if original:
+            return duplicate(pdf_path, digest, original)
+        return cached or finish(pdf_path, digest, future.result())
+
+    with RecyclingPool(workers, recycle_after) as pool:
+        for i, pdf_path in enumerate(pdf_paths):
+            digest, original, cached = lookup(i, pdf_path)
+            future = None if cached or original else pool.submit(task, pdf_path)
+            pending.append((pdf_path, digest, original, cached, future))
+            while pending and (len(pending) > window or pending[0][4] is None or pending[0][4].done()):
+                yield result(*pending.popleft())
+        for entry in pending:
+            yield result(*entry)
+
+def process_pdf_paths(pdf_paths, workers=1, cache=None, digests=None, stats=None, lazy=True,
+                      backend=DEFAULT_BACKEND, grid=False, dedup=None, limits=DEFAULT_LIMITS, recycle_after=None):
+    """
+    Parse `pdf_paths` and return their (unique_id, row_data) results in the same order.
+    """
+    return list(iter_pdf_results(pdf_paths, workers, cache, digests, stats, lazy, backend=backend, grid=grid,
+                                 dedup=dedup, limits=limits, recycle_after=recycle_after))
+
+CHECKPOINT_NAME = "StratX_Checkpoint.jsonl"
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint journal: (header, entries), or None if there is none.
+    A torn last line (crash mid-write) is dropped; its PDF is simply parsed again.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            break
+    if not records:
+        return None
+    return records[0], records[1:]
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of a full run: a header line (output file, format, folder)
+    followed by one line per completed PDF, in merge order, with its unique_id and its row
+    (null for duplicates), plus its discovery position `seq` in sharded runs. Lines are flushed
+    to disk every `batch_size` PDFs.
+    """
+    def __init__(self, path, header, entries=(), batch_size=OUTPUT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.pending = 0
+        # Start from a clean copy so a torn line never ends up in the middle of the journal
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in (header, *entries):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, rel_path, unique_id, row_data, seq=None):
+        entry = {"path": rel_path, "unique_id": unique_id, "row": row_data}
+        if seq is not None:
+            entry["seq"] = seq
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def finish(self, keep_as=None, **header):
+        """
+        Close and remove the journal; with `keep_as`, keep it there instead, `header` added to its header.
+        """
+        self.close()
+        if keep_as:
+            first, entries = load_checkpoint(self.path)
+            CheckpointJournal(keep_as, {**first, **header}, entries).close()
+        os.remove(self.path)
+
+def process_main_folder(main_folder, output_folder, workers=1, cache_dir=None, cache_max_bytes=512 * 1024 * 1024,
+                        lazy=True, output_format="csv", batch_size=OUTPUT_BATCH_SIZE, resume=False, timings=False,
+                        metrics_path=None, backend=DEFAULT_BACKEND, grid=False, pipeline=False,
+                        readers=PIPELINE_READERS, queue_size=PIPELINE_QUEUE_SIZE, on_row=None, history_path=None,
+                        include=None, exclude=None, quiet=False, shard=None, discovery_threads=DISCOVERY_THREADS,
+                        content_dedup=None, text_dedup=False, limits=DEFAULT_LIMITS, recycle_after=None):
+    """
+    Parse every PDF under `main_folder` and stream the rows to a timestamped results file.
+    Rows are written in batches as they are merged, so a crash leaves every finished batch on disk.
+
+    `main_folder` may also be a list of roots, merged in order into one results file (paths are
+    then relative to their common parent, see input_roots). `include`/`exclude` are lists of
+    globs selecting PDFs (path_selected). `quiet=True` drops the per-PDF progress lines.
+
+    PDFs are discovered by `discovery_threads` threads while the first ones are already parsed
+    (find_input_pdfs); StratX_Results folders and `output_folder` are not walked. With a cache,
+    folder listings are cached too (ListingCache), so unchanged folders are not listed again.
+
+    `shard=(i, n)` parses only the PDFs shard_of assigns to shard i of n, into a results file
+    and a shard manifest (StratX_Shard_<i>of<n>.jsonl: the journal with each PDF's position in
+    the full discovery order) suffixed with the shard; merge_shards joins the n shards into the
+    rows of an unsharded run.
+
+    Progress is journaled in StratX_Checkpoint.jsonl. With `resume=True` an interrupted run
+    continues into its original results file: the journal is replayed (rows and first-seen
+    dedup) and only PDFs it does not list are parsed, so the output matches an uninterrupted run.
+
+    `timings=True` times every stage per PDF and prints the aggregate report at the end;
+    `metrics_path` (implies timings) also saves it as JSON or CSV.
+
+    `backend` selects the text extractor (EXTRACTION_BACKENDS); PDFs a fast backend cannot
+    read well enough are re-read with pdfplumber, and the summary counts both. `grid=True`
+    reads RESULTS values from the table's word positions, falling back to the text parsers.
+
+    `pipeline=True` runs discovery, file reads (`readers` threads), parsing (`workers`) and output
+    as concurrent stages joined by bounded queues (see run_pipeline); rows are the same.
+
+    `on_row(rel_path, unique_id, row_data)` is called for every row written to the results file
+    (including rows replayed from a checkpoint), with the PDF's path relative to `main_folder`;
+    the analytics stage (analytics.ResultsSummary) hooks in here.
+
+    With `history_path`, the same rows are upserted into the cross-run ResultsStore there.
+
+    `content_dedup` skips extracting PDFs with the same bytes as an earlier one (by default only
+    with a cache, which hashes every PDF anyway; see content_index), and `text_dedup=True` also
+    those with the same first-page text (see ContentIndex); their rows are parsed from the
+    original's text, so the unique_id dedup and the results are unchanged. The pairs are saved
+    next to the results file (<results>_Content_Duplicates.csv).
 
-    for root, _, files in os.walk(main_folder):
-        for file in files:
-            if file.lower().endswith(".pdf"):
-                pdf_path = os.path.join(root, file)
-                print(f"\n📂 Processing PDF: {file}")
-                unique_id, extracted_data = process_pdf(pdf_path)
-                if unique_id and unique_id not in data_dict:
-                    data_dict[unique_id] = extracted_data
-                elif unique_id in data_dict:
+    `limits` (ResourceLimits) cap the pages, text and time spent on each document; one over a
+    limit gets the "⚠️ Resource Limit" status instead of holding up the run. With
+    `recycle_after`, worker processes are replaced after about that many documents each.
+
+    Returns the run's outcome as a dict: results file, rows, status counts, duplicates, content
+    duplicates and whether it was interrupted (then also the checkpoint to --resume from).
+    """
+    roots, base = input_roots(main_folder)
+    folder_key = os.path.abspath(base) if len(roots) == 1 else [os.path.abspath(r) for r in roots]
+    seen_ids = set()
+    duplicates = merged = 0
+    status_counts = Counter()
+    stats = Counter()
+    metrics = RunMetrics() if timings or metrics_path else None
+
+    os.makedirs(output_folder, exist_ok=True)
+    suffix = f"_shard{shard[0]}of{shard[1]}" if shard else ""
+    checkpoint_path = os.path.join(output_folder, CHECKPOINT_NAME.replace(".jsonl", suffix + ".jsonl"))
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and checkpoint[0].get("main_folder") != folder_key:
+        print(f"⚠️ Checkpoint belongs to {checkpoint[0].get('main_folder')} — starting a new run")
+        checkpoint = None
+    if checkpoint:
+        header, done = checkpoint
+        writer = OUTPUT_WRITERS[header["format"]](header["output"], batch_size)
+        print(f"⏯️ Resuming {header['output']}: {len(done)} PDFs already done")
+    else:
+        if resume:
+            print("ℹ️ No checkpoint to resume — starting a new run")
+        done = []
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        writer = open_row_writer(output_folder, f"StratX_Parsed_Results_{timestamp}{suffix}", output_format,
+                                 batch_size)
+        header = {"main_folder": folder_key, "output": writer.path, "format": output_format}
+        if shard:
+            header["shard"] = list(shard)
+    journal = CheckpointJournal(checkpoint_path, header, done, batch_size)
+    store = ResultsStore(history_path, batch_size) if history_path else None
+
+    def keep(rel_path, unique_id, row_data):
+        writer.write(row_data)
+        status_counts[row_data[columns.index("Scan Status")]] += 1
+        if store:
+            store.add(rel_path, unique_id, row_data)
+        if on_row:
+            on_row(rel_path, unique_id, row_data)
+
+    for entry in done:
+        if entry["row"] is None and entry["unique_id"] in seen_ids:
+            duplicates += 1
+        seen_ids.add(entry["unique_id"])
+        if entry["row"] is not None:
+            keep(entry["path"], entry["unique_id"], entry["row"])
+    done_paths = {entry["path"] for entry in done}
+    # Position of each PDF in the full discovery order (every shard walks everything), for merge_shards
+    discovered = 0
+    seqs = {}
+
+    listings = ListingCache(cache_dir) if cache_dir else None
+
+    def select_pdfs():
+        nonlocal discovered
+        for pdf_path, rel in find_input_pdfs(main_folder, include, exclude, listings, [output_folder],
+                                             discovery_threads):
+            seq, discovered = discovered, discovered + 1
+            if rel in done_paths or (shard and shard_of(rel, shard[1]) != shard[0]):
+                continue
+            if shard:
+                seqs[pdf_path] = seq
+            yield pdf_path
+
+    pdf_paths = select_pdfs()
+
+    def merge(pdf_path, unique_id, extracted_data):
+        nonlocal duplicates, merged
+        merged += 1
+        if not quiet:
+            print(f"\n📂 Processed PDF: {os.path.basename(pdf_path)}")
+        rel_path = os.path.relpath(pdf_path, base)
+        # First-seen wins, in os.walk order (same rule for serial, parallel and pipelined runs)
+        if unique_id and unique_id not in seen_ids:
+            seen_ids.add(unique_id)
+            keep(rel_path, unique_id, extracted_data)
+            journal.record(rel_path, unique_id, extracted_data, seqs.pop(pdf_path, None))
+        else:
+            if unique_id in seen_ids:
+                duplicates += 1
+                if not quiet:
                     print(f"⚠️ Duplicate entry skipped: {unique_id}")
+            journal.record(rel_path, unique_id, None, seqs.pop(pdf_path, None))
+
+    cache = ResultCache(cache_dir, cache_max_bytes, backend, grid) if cache_dir else None
+    dedup = content_index(content_dedup, text_dedup, cache is not None)
+    interrupted = False
+    try:
+        if pipeline:
+            asyncio.run(run_pipeline(pdf_paths, merge, workers, readers, queue_size, cache, stats, lazy, metrics,
+                                     backend, grid, dedup, limits, recycle_after))
+        else:
+            # Paths handed to the parser and not merged yet: parsing starts while discovery goes on
+            in_flight = deque()
+
+            def feed():
+                for pdf_path in pdf_paths:
+                    in_flight.append(pdf_path)
+                    yield pdf_path
+
+            results = iter_pdf_results(feed(), workers, cache, stats=stats, lazy=lazy, metrics=metrics,
+                                       backend=backend, grid=grid, dedup=dedup, limits=limits,
+                                       recycle_after=recycle_after)
+            for unique_id, extracted_data in results:
+                merge(in_flight.popleft(), unique_id, extracted_data)
+    except (KeyboardInterrupt, PipelineInterrupted):
+        interrupted = True
+        print(f"\n🛑 Interrupted — progress saved to {checkpoint_path}. Run again with --resume to continue.")
+    finally:
+        writer.close()
+        journal.close()
+        if cache:
+            cache.close()
+        if listings:
+            listings.close()
+        if store:
+            store.close()
+    result = {"output": writer.path, "pdfs": len(done) + merged, "rows": writer.rows_written,
+              "status_counts": dict(status_counts), "duplicates": duplicates,
+              "content_duplicates": len(dedup.pairs) if dedup else 0, "interrupted": interrupted}
+    if dedup and dedup.pairs:
+        result["content_duplicates_file"] = os.path.splitext(writer.path)[0] + "_Content_Duplicates.csv"
+        dedup.write_pairs(result["content_duplicates_file"], base)
+    if interrupted:
+        result["checkpoint"] = checkpoint_path
+        return result
+    if shard:
+        result["manifest"] = os.path.join(output_folder, SHARD_MANIFEST_NAME.format(*shard))
+        journal.finish(keep_as=result["manifest"], discovered=discovered)
+        print(f"\n🧱 Shard {shard[0]}/{shard[1]}: {result['pdfs']} of {discovered} PDFs — manifest saved to "
+              f"{result['manifest']}")
+    else:
+        journal.finish()
+
+    print(f"\n📄 Pages: {stats['pages_extracted']} extracted, {stats['pages_skipped']} skipped (fields already complete)")
+    if stats["early_rejects"]:
+        print(f"⏩ Early reject: {stats['early_rejects']} rejected orders read from their first page, "
+              f"{stats['early_reject_pages']} pages skipped (est. {stats['early_reject_seconds']:.2f}s saved)")
+    for name in EXTRACTION_BACKENDS:
+        hits, fallbacks = stats[f"{name}_hits"], stats[f"{name}_fallbacks"]
+        if hits or fallbacks:
+            fell_back = f", {fallbacks} fell back to {DEFAULT_BACKEND}" if name != DEFAULT_BACKEND else ""
+            print(f"🧰 {name}: {hits} PDFs read{fell_back}")
+    templates = Counter({key.split(":", 1)[1]: n for key, n in stats.items() if key.startswith("template:")})
+    if cache:
+        templates.update(cache.templates)
+    if templates:
+        print("🧩 Templates: " + ", ".join(f"{name} {n}" for name, n in templates.most_common()))
+    if cache:
+        print(f"♻️ Cache: {cache.hits} hits, {cache.reparsed} re-parsed (parser changed), {cache.misses} extracted")
+    if dedup and dedup.pairs:
+        matches = Counter(match for _, _, match in dedup.pairs)
+        print(f"🪞 Content duplicates: {len(dedup.pairs)} PDFs not extracted ({matches['bytes']} same bytes, "
+              f"{matches['text']} same first-page text) — pairs saved to {result['content_duplicates_file']}")
+    if listings:
+        print(f"🗂️ Discovery: {listings.hits} folder listings reused, {listings.misses} read")
+    if store:
+        print(f"🗄️ History: {store.upserts} rows upserted into {store.path}")
+
+    print(f"\n✅ Extracted data saved to: {writer.path}")
+    print_summary(status_counts, writer.rows_written)
+    if metrics:
+        metrics.print_report()
+        if metrics_path:
+            metrics.write(metrics_path)
+    return result
+
+# -----------------------------
+# Sharded runs + merge
+# -----------------------------
+SHARD_MANIFEST_NAME = "StratX_Shard_{}of{}.jsonl"
+SHARD_MANIFEST_RE = re.compile(r"StratX_Shard_\d+of\d+\.jsonl")
+
+def parse_shard(text):
+    """
+    The --shard argument: "i/n" → (i, n), shards numbered 1 to n.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", text)
+    if not match or not 1 <= int(match[1]) <= int(match[2]):
+        raise argparse.ArgumentTypeError(f"expected i/N with 1 <= i <= N, got {text!r}")
+    return int(match[1]), int(match[2])
+
+def shard_of(rel_path, shards):
+    """
+    The shard (1 to `shards`) a PDF belongs to: a stable hash of its relative path, the same on
+    every machine and Python run.
+    """
+    digest = hashlib.blake2b(rel_path.replace(os.sep, "/").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards + 1
+
+def find_shard_manifests(paths):
+    """
+    Shard manifest files among `paths`: files as given, folders searched (not recursively).
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from (os.path.join(path, name) for name in sorted(os.listdir(path)) if SHARD_MANIFEST_RE.fullmatch(name))
+        else:
+            yield path
+
+def load_shard_headers(manifest_paths):
+    """
+    Headers of a complete set of shard manifests, in shard order, each with its "path".
+    Raises ValueError if shards are missing or repeated, or come from different runs.
+    """
+    headers = []
+    for path in manifest_paths:
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+        if "shard" not in header or "discovered" not in header:
+            raise ValueError(f"Not a finished shard manifest: {path}")
+        headers.append({**header, "path": path})
+    if not headers:
+        raise ValueError("No shard manifests found")
+    headers.sort(key=lambda h: h["shard"])
+    first = headers[0]
+    for header in headers:
+        for key in ("main_folder", "discovered"):
+            if header[key] != first[key]:
+                raise ValueError(f"Shards disagree on {key}: {first['path']} has {first[key]}, "
+                                 f"{header['path']} has {header[key]}")
+    shards = first["shard"][1]
+    found = [h["shard"] for h in headers]
+    if found != [[i, shards] for i in range(1, shards + 1)]:
+        missing = sorted({*range(1, shards + 1)} - {i for i, n in found if n == shards})
+        raise ValueError(f"Expected shards 1-{shards} once each; found {', '.join(f'{i}/{n}' for i, n in found)}"
+                         + (f" (missing {', '.join(map(str, missing))})" if missing else ""))
+    return headers
+
+def iter_shard_entries(path):
+    """
+    Stream the PDF entries of a shard manifest (the lines after its header).
+    """
+    with open(path, encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            yield json.loads(line)
+
+def merge_shards(paths, output_folder, output_format="csv", batch_size=OUTPUT_BATCH_SIZE, on_row=None,
+                 history_path=None):
+    """
+    Join the shard manifests in `paths` (files, or folders holding them) into one timestamped
+    results file with the rows of an unsharded run: entries are interleaved by discovery position
+    and the first-seen unique_id wins, as in process_main_folder. Manifests are streamed, so
+    memory does not grow with the number of rows. `on_row` and `history_path` work as in
+    process_main_folder. Returns the same result dict.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else paths
+    headers = load_shard_headers(find_shard_manifests(paths))
+    entries = heapq.merge(*(iter_shard_entries(h["path"]) for h in headers), key=lambda entry: entry["seq"])
 
-    df = pd.DataFrame(list(data_dict.values()), columns=columns)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_csv = os.path.join(output_folder, f"StratX_Parsed_Results_{timestamp}.csv")
     os.makedirs(output_folder, exist_ok=True)
-    # df.to_csv(output_csv, index=False, encoding='utf-8-sig')
-    df.to_csv(output_csv, index=False, encoding='utf-8-sig', sep=';')
-    print(f"\n✅ Extracted data saved to: {output_csv}")
-    print_summary_results(output_csv)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    writer = open_row_writer(output_folder, f"StratX_Parsed_Results_{timestamp}", output_format, batch_size)
+    store = ResultsStore(history_path, batch_size) if history_path else None
+    seen_ids = set()
+    status_counts = Counter()
+    pdfs = duplicates = 0
+    try:
+        for entry in entries:
+            pdfs += 1
+            unique_id, row_data = entry["unique_id"], entry["row"]
+            # A shard only drops duplicates of its own earlier rows, so these two checks are the whole rule
+            if unique_id in seen_ids:
+                duplicates += 1
+            elif row_data is not None:
+                seen_ids.add(unique_id)
+                writer.write(row_data)
+                status_counts[row_data[columns.index("Scan Status")]] += 1
+                if store:
+                    store.add(entry["path"], unique_id, row_data)
+                if on_row:
+                    on_row(entry["path"], unique_id, row_data)
+    finally:
+        writer.close()
+        if store:
+            store.close()
+
+    print(f"\n🧱 Merged {len(headers)} shards: {pdfs} of {headers[0]['discovered']} PDFs, "
+          f"{duplicates} duplicates skipped")
+    if pdfs != headers[0]["discovered"]:
+        print("⚠️ The shards do not cover every discovered PDF — did their folder listings differ?")
+    if store:
+        print(f"🗄️ History: {store.upserts} rows upserted into {store.path}")
+    print(f"\n✅ Extracted data saved to: {writer.path}")
+    print_summary(status_counts, writer.rows_written)
+    return {"output": writer.path, "pdfs": pdfs, "rows": writer.rows_written, "status_counts": dict(status_counts),
+            "duplicates": duplicates, "interrupted": False}
+
+# -----------------------------
+# Incremental runs + watch mode
+# -----------------------------
+MANIFEST_NAME = "StratX_Manifest.json"
+ROLLING_CSV_NAME = "StratX_Parsed_Results.csv"
 
-def print_summary_results(csv_path):
+def load_manifest(path):
     try:
-        df = pd.read_csv(csv_path)
-        total_rows = len(df)
-        status_counts = df["Scan Status"].value_counts().reindex([
-            "✅ No Warnings", "⚠️ Warning", "⚠️ Not Usable",
-            "⚠️ Parsing Failed", "⚠️ Failed to Read"
-        ], fill_value=0)
-        print("\n📊 Summary Report")
-        print(f"Total PDFs Processed: {total_rows}")
-        print(f"✅ Successfully Parsed: {status_counts['✅ No Warnings']}")
-        print(f"⚠️ Warnings (from PDF): {status_counts['⚠️ Warning']}")
-        print(f"⚠️ Not Usable (from PDF): {status_counts['⚠️ Not Usable']}")
-        print(f"⚠️ Parsing Failed (Script Error): {status_counts['⚠️ Parsing Failed']}")
-        print(f"❌ Failed to Read (Corrupt File?): {status_counts['⚠️ Failed to Read']}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
     except FileNotFoundError:
-        print(f"❌ Could not find output file to generate summary: {csv_path}")
+        return {"files": {}}
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def dedup_manifest_rows(manifest):
+    """
+    Rows of the rolling output: first-seen unique_id wins, in ingestion order.
+    """
+    data_dict = {}
+    for entry in manifest["files"].values():
+        data_dict.setdefault(entry["unique_id"], entry["row"])
+    return list(data_dict.values())
+
+def update_incremental(main_folder, output_folder, workers=1, cache_dir=None, cache_max_bytes=512 * 1024 * 1024,
+                       lazy=True, backend=DEFAULT_BACKEND, grid=False, history_path=None, include=None,
+                       exclude=None, quiet=False, discovery_threads=DISCOVERY_THREADS, content_dedup=None,
+                       text_dedup=False, limits=DEFAULT_LIMITS, recycle_after=None, status_counts=None):
+    """
+    Parse only PDFs that are new or changed since the last run and update one rolling CSV.
+
+    The manifest records path, size, mtime, content hash and parsed row of every ingested file.
+    Files whose size+mtime are unchanged are skipped without hashing; a touched file with the same
+    hash is skipped too. New files are appended to the rolling CSV; changes and deletions rewrite it.
+    With `history_path`, (re)parsed rows that made it into the rolling CSV are upserted into the
+    ResultsStore there (removed files stay in the history).
+    `main_folder`, `include`, `exclude`, `quiet`, `discovery_threads`, `content_dedup`,
+    `text_dedup`, `limits` and `recycle_after` work as in process_main_folder (folder listings
+    are cached with the results, content duplicates are looked for among the files parsed
+    together); files the globs leave out are dropped from the rolling CSV like deleted ones.
+    With `status_counts` (a Counter), the Scan Status of every file (re)parsed in this run is
+    counted into it. Returns the number of files that were (re)parsed or removed.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    output_csv = os.path.join(output_folder, ROLLING_CSV_NAME)
+    manifest = load_manifest(manifest_path)
+    files = manifest["files"]
+    previous_rows = dedup_manifest_rows(manifest)
+
+    seen = set()
+    changed_paths, changed_stats = [], []
+    listings = ListingCache(cache_dir) if cache_dir else None
+    try:
+        pdf_paths = list(find_input_pdfs(main_folder, include, exclude, listings, [output_folder], discovery_threads))
+    finally:
+        if listings:
+            listings.close()
+    for pdf_path, rel in pdf_paths:
+        seen.add(rel)
+        size, mtime = source_stat(pdf_path)
+        entry = files.get(rel)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            continue
+        digest = file_digest(pdf_path)
+        if entry and entry["digest"] == digest:
+            entry["size"], entry["mtime"] = size, mtime
+            continue
+        changed_paths.append(pdf_path)
+        changed_stats.append((rel, (size, mtime), digest, entry is not None))
+
+    removed = [rel for rel in files if rel not in seen]
+    for rel in removed:
+        del files[rel]
+
+    if changed_paths:
+        cache = ResultCache(cache_dir, cache_max_bytes, backend, grid) if cache_dir else None
+        dedup = content_index(content_dedup, text_dedup, True)
+        try:
+            results = process_pdf_paths(changed_paths, workers, cache, [d for _, _, d, _ in changed_stats], lazy=lazy,
+                                        backend=backend, grid=grid, dedup=dedup, limits=limits,
+                                        recycle_after=recycle_after)
+        finally:
+            if cache:
+                cache.close()
+        if dedup and dedup.pairs:
+            print(f"🪞 {len(dedup.pairs)} content duplicates not extracted")
+        for (rel, (size, mtime), digest, _), (unique_id, row_data) in zip(changed_stats, results):
+            if not quiet:
+                print(f"📂 Ingested PDF: {rel}")
+            # Updating an existing key keeps its ingestion position; new files go to the end
+            files[rel] = {"size": size, "mtime": mtime, "digest": digest,
+                          "unique_id": unique_id, "row": row_data}
+            if status_counts is not None:
+                status_counts[row_data[columns.index("Scan Status")]] += 1
+
+    rows = dedup_manifest_rows(manifest)
+    if history_path and changed_paths:
+        first_seen = {}
+        for rel, entry in files.items():
+            first_seen.setdefault(entry["unique_id"], rel)
+        store = ResultsStore(history_path)
+        try:
+            for rel, *_ in changed_stats:
+                entry = files[rel]
+                if first_seen[entry["unique_id"]] == rel:
+                    store.add(rel, entry["unique_id"], entry["row"])
+        finally:
+            store.close()
+    only_new = not removed and not any(existed for *_, existed in changed_stats)
+    if only_new and os.path.exists(output_csv):
+        if len(rows) > len(previous_rows):
+            pd.DataFrame(rows[len(previous_rows):], columns=columns).to_csv(
+                output_csv, mode="a", header=False, index=False, encoding="utf-8", sep=";")
+    elif changed_paths or removed or not os.path.exists(output_csv):
+        tmp = output_csv + ".tmp"
+        pd.DataFrame(rows, columns=columns).to_csv(tmp, index=False, encoding="utf-8-sig", sep=";")
+        os.replace(tmp, output_csv)
+    save_manifest(manifest_path, manifest)
+
+    if changed_paths or removed:
+        print(f"✅ {len(changed_paths)} PDFs ingested, {len(removed)} removed — {len(rows)} rows in {output_csv}")
+    return len(changed_paths) + len(removed)
+
+def watch_folder(main_folder, output_folder, interval=5.0, **kwargs):
+    """
+    Poll `main_folder` every `interval` seconds and keep the rolling CSV current. Stop with Ctrl-C.
+    """
+    print(f"👀 Watching {', '.join(input_roots(main_folder)[0])} every {interval:g}s (Ctrl-C to stop)")
+    try:
+        while True:
+            update_incremental(main_folder, output_folder, **kwargs)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n🛑 Watch stopped.")
+
+def print_summary(status_counts, total_rows):
+    status_counts = Counter(status_counts)
+    print("\n📊 Summary Report")
+    print(f"Total PDFs Processed: {total_rows}")
+    print(f"✅ Successfully Parsed: {status_counts['✅ No Warnings']}")
+    print(f"⚠️ Warnings (from PDF): {status_counts['⚠️ Warning']}")
+    print(f"⚠️ Not Usable (from PDF): {status_counts['⚠️ Not Usable']}")
+    print(f"⚠️ Parsing Failed (Script Error): {status_counts['⚠️ Parsing Failed']}")
+    print(f"❌ Failed to Read (Corrupt File?): {status_counts['⚠️ Failed to Read']}")
+    if status_counts["⚠️ Resource Limit"]:
+        print(f"⛔ Resource Limit (Not Parsed): {status_counts['⚠️ Resource Limit']}")
 
 # -----------------------------
 # CLI entrypoint
 # -----------------------------
-def main():
+# Exit codes, so schedulers and scripts can tell outcomes apart
+EXIT_OK = 0
+EXIT_ERROR = 1           # unexpected error
+EXIT_USAGE = 2           # bad arguments or input folder not found (as argparse)
+EXIT_FAILED_PDFS = 3     # run completed, but some PDFs could not be read or parsed, or hit a resource limit
+EXIT_INTERRUPTED = 130   # Ctrl-C; a full run continues with --resume
+
+def run_exit_code(result):
+    """
+    Exit code of a finished run (a process_main_folder result).
+    """
+    if result.get("interrupted"):
+        return EXIT_INTERRUPTED
+    counts = result["status_counts"]
+    if counts.get("⚠️ Parsing Failed") or counts.get("⚠️ Failed to Read") or counts.get("⚠️ Resource Limit"):
+        return EXIT_FAILED_PDFS
+    return EXIT_OK
+
+def write_run_report(result, path):
+    """
+    Save a run result as JSON at `path` ("-" for stdout), every status counted, with its exit code.
+    """
+    counts = result["status_counts"]
+    report = {**result, "status_counts": {status: int(counts.get(status, 0)) for status in SCAN_STATUSES},
+              "exit_code": run_exit_code(result)}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text, flush=True)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+def run_profiled(func, *args, top=30, dump_path=None, **kwargs):
+    """
+    Run func under cProfile and print the `top` functions by cumulative time.
+    Only this process is profiled: with --workers > 1, parsing happens in the workers.
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        print(f"\n🔬 Profile (top {top} by cumulative time)")
+        stats = pstats.Stats(profiler).sort_stats("cumulative")
+        stats.print_stats(top)
+        if dump_path:
+            stats.dump_stats(dump_path)
+            print(f"🔬 Profile data saved to: {dump_path}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="StratX PDF Processor",
+        epilog=f"Exit codes: {EXIT_OK} done, {EXIT_FAILED_PDFS} done but some PDFs failed to read or parse "
+               f"or hit a resource limit, "
+               f"{EXIT_USAGE} bad arguments or folder not found, {EXIT_INTERRUPTED} interrupted, "
+               f"{EXIT_ERROR} unexpected error.")
+    parser.add_argument("folders", nargs="*", metavar="FOLDER",
+                        help="main folder(s) to process; runs without prompts (without one, asks for a folder)")
+    parser.add_argument("-o", "--output", default=None, metavar="DIR",
+                        help="output folder (default: StratX_Results in the main folder, or in the folders' "
+                             "common parent)")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB",
+                        help="only process PDFs whose relative path, a folder on it or file name matches GLOB "
+                             "(repeatable)")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB",
+                        help="skip PDFs (and folders) matching GLOB like --include (repeatable); "
+                             f"{', '.join(DEFAULT_EXCLUDES)} folders are always skipped")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="no per-PDF progress lines; only errors and the final summary")
+    parser.add_argument("--json", default=None, metavar="PATH",
+                        help="save the run result (output file, status counts, exit code) as JSON to PATH; "
+                             "with -, print it to stdout and the rest of the output to stderr")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="parse only shard I of N (PDFs split by a stable hash of their path) and save a "
+                             "shard manifest for --merge; history is upserted when merging")
+    parser.add_argument("--merge", action="store_true",
+                        help="merge shard runs: FOLDERs are their output folders (or manifest files); "
+                             "rows and duplicates match an unsharded run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes for PDF parsing (default: 1, serial)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="result cache location (default: <output folder>/.cache)")
+    parser.add_argument("--cache-size-mb", type=int, default=512,
+                        help="cache size limit; least recently used entries are evicted (default: 512)")
+    parser.add_argument("--no-cache", action="store_true", help="re-extract every PDF")
+    parser.add_argument("--no-history", action="store_true",
+                        help=f"do not upsert rows into the cross-run history store ({HISTORY_NAME})")
+    parser.add_argument("--all-pages", action="store_true",
+                        help="extract every page instead of stopping once all fields are found")
+    parser.add_argument("--backend", choices=list(EXTRACTION_BACKENDS), default=DEFAULT_BACKEND,
+                        help="text extractor; PDFs pdfium cannot fully parse are re-read with pdfplumber "
+                             f"(default: {DEFAULT_BACKEND})")
+    parser.add_argument("--grid", action="store_true",
+                        help="read RESULTS values from the table's word positions (lobe columns, row labels) "
+                             "instead of text lines; falls back to text parsing")
+    parser.add_argument("--discovery-threads", type=int, default=DISCOVERY_THREADS,
+                        help=f"threads listing folders while PDFs are parsed (default: {DISCOVERY_THREADS})")
+    parser.add_argument("--max-pages", type=int, default=MAX_DOCUMENT_PAGES, metavar="N",
+                        help="give up on a PDF after reading more than N pages, status '⚠️ Resource Limit'; "
+                             "lazy extraction stops reading once the row is complete, --all-pages reads "
+                             f"every page (0: no limit; default: {MAX_DOCUMENT_PAGES})")
+    parser.add_argument("--max-chars", type=int, default=MAX_DOCUMENT_CHARS, metavar="N",
+                        help=f"same for N characters of extracted text (0: no limit; default: {MAX_DOCUMENT_CHARS})")
+    parser.add_argument("--max-seconds", type=float, default=MAX_DOCUMENT_SECONDS, metavar="S",
+                        help=f"same for S seconds spent on one PDF (0: no limit; default: {MAX_DOCUMENT_SECONDS})")
+    parser.add_argument("--recycle-after", type=int, default=None, metavar="N",
+                        help="with --workers, replace each worker process after about N PDFs to keep memory "
+                             "stable on long runs")
+    parser.add_argument("--content-dedup", action=argparse.BooleanOptionalAction, default=None,
+                        help="parse byte-identical copies of a PDF from the first copy's text instead of extracting "
+                             "them again (default: on with the cache, which hashes every PDF anyway; "
+                             "with --no-cache it costs a full-file hash per PDF)")
+    parser.add_argument("--text-dedup", action="store_true",
+                        help="also skip extracting PDFs whose first-page text matches one already parsed "
+                             "(re-exports of the same report)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap folder walking, file reads, parsing and output (for slow network shares)")
+    parser.add_argument("--readers", type=int, default=PIPELINE_READERS,
+                        help=f"threads reading PDF bytes ahead of parsing with --pipeline (default: {PIPELINE_READERS})")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="PDFs held between pipeline stages; bounds memory with --pipeline "
+                             f"(default: {PIPELINE_QUEUE_SIZE})")
+    parser.add_argument("--analytics", action="store_true",
+                        help="summarize the run per site and per column (see analytics.py) and save the "
+                             "reports to StratX_Results/StratX_Analytics")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only parse new/changed PDFs and update {ROLLING_CSV_NAME}")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", default=None,
+                        help="keep polling for new PDFs every SECONDS (implies --incremental)")
+    parser.add_argument("--format", dest="output_format", choices=sorted(OUTPUT_WRITERS), default="csv",
+                        help="results file format for full runs (parquet needs pyarrow; default: csv)")
+    parser.add_argument("--batch-size", type=int, default=OUTPUT_BATCH_SIZE,
+                        help=f"rows written per batch (default: {OUTPUT_BATCH_SIZE})")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted full run from its checkpoint instead of starting over")
+    parser.add_argument("--timings", action="store_true",
+                        help="time each stage per PDF and print aggregate timings and histograms")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="save per-stage metrics to PATH (.json or .csv; implies --timings)")
+    parser.add_argument("--profile", type=int, nargs="?", const=30, default=None, metavar="TOP",
+                        help="run under cProfile and print the TOP hottest functions (default: 30)")
+    args = parser.parse_args(argv)
+    if args.merge and not args.folders:
+        parser.error("--merge needs the shard output folders or manifests")
+    if (args.shard or args.merge) and (args.incremental or args.watch is not None):
+        parser.error("--shard and --merge work on full runs, not with --incremental or --watch")
+    return args
+
+def run_cli(args, main_folder, output_folder):
+    """
+    Run what the flags ask for over `main_folder` (one root or a list) into `output_folder`.
+    Returns the run result (see process_main_folder), or None after --watch.
+    """
+    check_backend(args.backend)
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(output_folder, ".cache"))
+    # Shards leave the history to the merge, which upserts first-seen rows only
+    history_path = None if args.no_history or args.shard else os.path.join(output_folder, HISTORY_NAME)
+    options = dict(workers=args.workers, cache_dir=cache_dir, cache_max_bytes=args.cache_size_mb * 1024 * 1024,
+                   lazy=not args.all_pages, backend=args.backend, grid=args.grid, history_path=history_path,
+                   include=args.include, exclude=args.exclude, quiet=args.quiet,
+                   discovery_threads=args.discovery_threads, content_dedup=args.content_dedup,
+                   text_dedup=args.text_dedup, limits=ResourceLimits(args.max_pages, args.max_chars, args.max_seconds),
+                   recycle_after=args.recycle_after)
+    if args.watch is not None:
+        watch_folder(main_folder, output_folder, interval=args.watch, **options)
+        return None
+    if args.incremental:
+        # The exit code reflects the PDFs parsed now, not failures already in the rolling CSV
+        status_counts = Counter()
+        changed = update_incremental(main_folder, output_folder, status_counts=status_counts, **options)
+        output = os.path.join(output_folder, ROLLING_CSV_NAME)
+        rows = len(read_results(output, usecols=["Scan Status"]))
+        result = {"output": output, "rows": rows, "status_counts": dict(status_counts), "changed": changed,
+                  "interrupted": False}
+    else:
+        summary = None
+        if args.analytics:
+            import analytics
+            summary = analytics.ResultsSummary()
+        if args.merge:
+            run = partial(merge_shards, main_folder, output_folder, output_format=args.output_format,
+                          batch_size=args.batch_size, on_row=summary and summary.add_row, history_path=history_path)
+        else:
+            run = partial(process_main_folder, main_folder, output_folder, output_format=args.output_format,
+                          batch_size=args.batch_size, resume=args.resume, timings=args.timings,
+                          metrics_path=args.metrics, pipeline=args.pipeline, readers=args.readers,
+                          queue_size=args.queue_size, on_row=summary and summary.add_row, shard=args.shard,
+                          **options)
+        if args.profile:
+            result = run_profiled(run, top=args.profile,
+                                  dump_path=os.path.join(output_folder, "StratX_Profile.pstats"))
+        else:
+            result = run()
+        if summary and not result["interrupted"]:
+            stats = summary.statistics()
+            analytics.print_report(stats)
+            analytics.save_reports(stats, os.path.join(output_folder, "StratX_Analytics"))
+    return result
+
+def finish_cli(args, result):
+    """
+    Save the --json report of a run and return its exit code.
+    """
+    if result is None:
+        return EXIT_OK
+    if args.json:
+        write_run_report(result, args.json)
+    return run_exit_code(result)
+
+def run_batch(args):
+    """
+    Non-interactive run over the FOLDER arguments: no prompts, result as an exit code.
+    """
+    missing = [folder for folder in args.folders if not (os.path.exists if args.merge else os.path.isdir)(folder)]
+    if missing:
+        print(f"❌ Folder not found: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        check_backend(args.backend)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.merge:
+        try:
+            load_shard_headers(find_shard_manifests(args.folders))
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return EXIT_USAGE
+        # Merged results go next to the shards' by default
+        folders = [f if os.path.isdir(f) else os.path.dirname(os.path.abspath(f)) for f in args.folders]
+        output_folder = args.output or input_roots(folders)[1]
+    else:
+        output_folder = args.output or os.path.join(input_roots(args.folders)[1], "StratX_Results")
+    main_folder = args.folders[0] if len(args.folders) == 1 else args.folders
+    try:
+        # With --json -, stdout carries only the JSON result
+        with redirect_stdout(sys.stderr) if args.json == "-" else ExitStack():
+            result = run_cli(args, main_folder, output_folder)
+        return finish_cli(args, result)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.folders:
+        return run_batch(args)
     print("🔍 StratX PDF Processor - FINAL (Universal Parser)")
     try:
         main_folder_input = input("📂 Drag and drop your main folder here and press Enter: ").strip()
         main_folder = main_folder_input.strip("'\"")
         if not os.path.isdir(main_folder):
             print(f"❌ Folder not found: {main_folder}")
-            return
-        default_output_folder = os.path.join(main_folder, "StratX_Results")
+            return EXIT_USAGE
+        default_output_folder = args.output or os.path.join(main_folder, "StratX_Results")
         confirm = input(f"\nResults will be saved to: {default_output_folder}. Proceed? (yes/no): ").strip().lower()
         if confirm != "yes":
             print("❌ Operation cancelled.")
-            return
-        process_main_folder(main_folder, default_output_folder)
+            return EXIT_OK
+        return finish_cli(args, run_cli(args, main_folder, default_output_folder))
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
+        return EXIT_ERROR
     finally:
         input("\nPress Enter to exit.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,214 @@
+import os
+import sys
+import argparse
+
+import pandas as pd
+
+import StratX_Parse_Script_Main as stratx
+
+# -----------------------------
+# One-pass summary
+# -----------------------------
+SUMMARY_BATCH_ROWS = 1000
+# Columns each metric needs, so history files are read selectively (Site is read when present)
+METRIC_COLUMNS = {
+    "status": ["Scan Status"],
+    "comments": ["Scan Comments"],
+    "completeness": [c for c in stratx.columns if c != "Scan Comments"],
+}
+COUNT_FIELDS = ["rows", "complete", *stratx.SCAN_STATUSES]
+
+class ResultsSummary:
+    """
+    Summary metrics of a set of results, accumulated batch by batch in one pass: row and status
+    counts, complete rows (every column but Scan Comments filled), rows with comments,
+    completeness per column and, with sites, completeness, errors (Not Usable) and warnings per
+    site. Each batch is a typed frame reduced with column-wise pandas operations; only running
+    counts are kept, so memory does not grow with the number of rows.
+    """
+    def __init__(self, batch_size=SUMMARY_BATCH_ROWS):
+        self.batch_size = max(1, batch_size)
+        self.batch = []
+        self.seen = set()
+        self.filled = pd.Series(dtype="int64")
+        self.comments = 0
+        self.by_site = pd.DataFrame(columns=COUNT_FIELDS, dtype="int64")
+
+    def add_row(self, rel_path, unique_id, row_data):
+        """
+        process_main_folder's on_row hook: the row's Site is its PDF's top-level folder (site_of).
+        """
+        self.batch.append([*row_data, stratx.site_of(rel_path)])
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.add(stratx.typed_results_frame(pd.DataFrame(self.batch, columns=[*stratx.columns, "Site"])))
+            self.batch = []
+
+    def add(self, df):
+        """
+        Fold a typed results frame in. It may hold only some of the columns (see METRIC_COLUMNS);
+        complete rows are only reported once every column they depend on has been seen.
+        """
+        self.seen.update(df.columns)
+        checked = [c for c in df.columns if c not in ("Scan Comments", "Site")]
+        filled = df[checked].notna()
+        self.filled = self.filled.add(filled.sum(), fill_value=0)
+        if "Scan Comments" in df:
+            self.comments += int(df["Scan Comments"].notna().sum())
+        counts = pd.DataFrame({"rows": 1, "complete": filled.all(axis=1)}, index=df.index)
+        if "Scan Status" in df:
+            counts = counts.join(pd.get_dummies(df["Scan Status"]))
+        site = df["Site"] if "Site" in df else pd.Series("", index=df.index)
+        self.by_site = self.by_site.add(counts.groupby(site, observed=True, dropna=False).sum(), fill_value=0)
+        return self
+
+    def statistics(self):
+        """
+        The metrics so far, as a dict (the same keys as results_statistics). Metrics whose
+        columns were never seen are left out.
+        """
+        self.flush()
+        by_site = self.by_site.reindex(columns=COUNT_FIELDS).fillna(0).astype("int64")
+        by_site.index.name = "Site"
+        totals = by_site.sum()
+        stats = {"total_rows": int(totals["rows"])}
+        if "Scan Status" in self.seen:
+            stats["status_counts"] = totals[list(stratx.SCAN_STATUSES)]
+        if self.seen.issuperset(METRIC_COLUMNS["completeness"]):
+            stats["complete_rows"] = int(totals["complete"])
+        if self.filled.size:
+            order = [c for c in stratx.columns if c in self.filled.index]
+            stats["column_completeness"] = self.filled[order] / max(1, stats["total_rows"]) * 100
+        if "Scan Comments" in self.seen:
+            stats["rows_with_comments"] = self.comments
+        if "Site" in self.seen:
+            if "complete_rows" in stats:
+                stats["completeness_per_site"] = by_site["complete"] / by_site["rows"] * 100
+            if "status_counts" in stats:
+                stats["errors_per_site"] = by_site["⚠️ Not Usable"]
+                stats["warnings_per_site"] = by_site["⚠️ Warning"]
+        return stats
+
+def results_statistics(df):
+    """
+    Summary metrics of one typed results frame (see ResultsSummary).
+    """
+    return ResultsSummary().add(df).statistics()
+
+def summarize_results(path, metrics=None, chunksize=stratx.RESULTS_CHUNK_ROWS):
+    """
+    Summarize a results or history file in one pass over chunks of `chunksize` rows, reading
+    only the columns `metrics` (names from METRIC_COLUMNS; None for all) need, plus Site.
+    """
+    usecols = None
+    if metrics is not None:
+        usecols = {"Site", *(c for m in metrics for c in METRIC_COLUMNS[m])}
+    summary = ResultsSummary()
+    for df in stratx.iter_results(path, usecols, chunksize):
+        summary.add(df)
+    return summary.statistics()
+
+def write_complete_rows(path, output_path, chunksize=stratx.RESULTS_CHUNK_ROWS):
+    """
+    Copy the complete rows (every column but Scan Comments filled) of a results file to a
+    semicolon CSV, chunk by chunk, keeping the values as written. Returns (rows kept, rows read).
+    """
+    kept = read = 0
+    with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        for i, chunk in enumerate(stratx.iter_results(path, chunksize=chunksize, typed=False)):
+            typed = stratx.typed_results_frame(chunk)
+            complete = typed[[c for c in typed.columns if c != "Scan Comments"]].notna().all(axis=1)
+            f.write(chunk[complete].to_csv(index=False, header=i == 0, sep=";"))
+            kept += int(complete.sum())
+            read += len(chunk)
+    return kept, read
+
+# -----------------------------
+# Reports
+# -----------------------------
+def print_report(stats):
+    print("\n📊 Summary of Extracted Data")
+    print("---------------------------------")
+    print(f"Total Rows: {stats['total_rows']}")
+    if "status_counts" in stats:
+        counts = stats["status_counts"]
+        print(f"Rows with No Warnings (✅ No Warnings): {counts['✅ No Warnings']}")
+        print(f"Rows with Warnings (⚠️ Warning): {counts['⚠️ Warning']}")
+        print(f"Rows with Errors (⚠️ Not Usable): {counts['⚠️ Not Usable']}")
+    if "complete_rows" in stats:
+        print(f"Complete Rows (No NaNs, Excluding `Scan Comments`): {stats['complete_rows']}")
+        incomplete = stats["total_rows"] - stats["complete_rows"]
+        print(f"Incomplete Rows (With NaNs, Excluding `Scan Comments`): {incomplete}")
+    if "rows_with_comments" in stats:
+        print(f"Total PDFs with Comments in `Scan Comments`: {stats['rows_with_comments']}")
+    for key, title in (("errors_per_site", "Errors Per Site"), ("warnings_per_site", "Warnings Per Site"),
+                       ("column_completeness", "Column Completeness (Excluding `Scan Comments`)"),
+                       ("completeness_per_site", "Completeness Per Site (% of Fully Populated Rows)")):
+        if key in stats:
+            print(f"\n🔍 {title}:")
+            print(stats[key].to_string())
+
+def save_reports(stats, output_folder):
+    """
+    Save the summary (Metric/Value) and every per-site/per-column table as CSVs in `output_folder`.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    summary = {"Total Rows": stats["total_rows"]}
+    if "status_counts" in stats:
+        summary.update({f"Rows with {status}": int(n) for status, n in stats["status_counts"].items()})
+    if "complete_rows" in stats:
+        summary["Complete Rows (No NaNs)"] = stats["complete_rows"]
+        summary["Incomplete Rows (With NaNs)"] = stats["total_rows"] - stats["complete_rows"]
+    if "rows_with_comments" in stats:
+        summary["Total PDFs with Comments in `Scan Comments`"] = stats["rows_with_comments"]
+    paths = [os.path.join(output_folder, "extracted_data_summary.csv")]
+    pd.DataFrame({"Metric": list(summary), "Value": list(summary.values())}).to_csv(paths[0], index=False)
+    for key in ("errors_per_site", "warnings_per_site", "column_completeness", "completeness_per_site"):
+        if key in stats:
+            paths.append(os.path.join(output_folder, f"{key}.csv"))
+            stats[key].to_csv(paths[-1])
+    print("\n✅ Reports Saved:")
+    for path in paths:
+        print(f"  - {path}")
+
+# -----------------------------
+# CLI entrypoint
+# -----------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StratX results analytics")
+    parser.add_argument("results", help="results file: semicolon CSV, or Parquet file/folder")
+    parser.add_argument("--metrics", default=None,
+                        help=f"comma-separated metrics to compute, reading only their columns "
+                             f"(default: all of {', '.join(METRIC_COLUMNS)})")
+    parser.add_argument("--output", default=None,
+                        help="folder for the report CSVs (default: StratX_Analytics next to the results)")
+    parser.add_argument("--clean", default=None, metavar="PATH",
+                        help="also write the complete rows (excluding Scan Comments) to PATH")
+    parser.add_argument("--chunk-rows", type=int, default=stratx.RESULTS_CHUNK_ROWS,
+                        help=f"rows read per chunk (default: {stratx.RESULTS_CHUNK_ROWS})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics = None
+    if args.metrics:
+        metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+        unknown = [m for m in metrics if m not in METRIC_COLUMNS]
+        if unknown:
+            sys.exit(f"❌ Unknown metric(s): {', '.join(unknown)}")
+    if not os.path.exists(args.results):
+        sys.exit(f"❌ Could not find results file: {args.results}")
+
+    stats = summarize_results(args.results, metrics, args.chunk_rows)
+    print_report(stats)
+    save_reports(stats, args.output or os.path.join(os.path.dirname(os.path.abspath(args.results)), "StratX_Analytics"))
+    if args.clean:
+        kept, read = write_complete_rows(args.results, args.clean, args.chunk_rows)
+        print(f"\n✅ Removed {read - kept} incomplete rows (excluding `Scan Comments`).")
+        print(f"✅ Cleaned dataset saved to: {args.clean}")
+
+if __name__ == "__main__":
+    main()
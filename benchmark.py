@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is reported as null
+    resource = None
+
+import StratX_Parse_Script_Main as stratx
+import synthetic_reports
+
+# -----------------------------
+# Synthetic StratX / LungQ reports
+# -----------------------------
+REPORT_KINDS = {"labeled": 70, "attention": 10, "unlabeled": 10, "rejected": 10}  # share of the corpus, %
+
+def synthetic_corpus(n_docs, seed=0):
+    """
+    Yield (relative_path, kind, pages) for `n_docs` reports spread over a few sites.
+    """
+    rng = random.Random(seed)
+    kinds = list(REPORT_KINDS)
+    weights = list(REPORT_KINDS.values())
+    for i in range(n_docs):
+        kind = rng.choices(kinds, weights)[0]
+        patient_id, scan_id = 100 + i, rng.randint(100000, 999999)
+        site = f"Site_{i % 5:02d}"
+        batch = f"StratX_{i // 250:04d}"
+        rel = os.path.join(site, batch, f"StratX_{patient_id}_{scan_id}_{i % 5:04d}.pdf")
+        yield rel, kind, synthetic_reports.synthetic_report(rng, kind, patient_id, scan_id)
+
+def build_fixtures(workdir, n_docs, seed=0):
+    """
+    Generate the PDF folder and the matching text fixture (JSON lines) for `n_docs` reports.
+    Returns (pdf_folder, texts_path); existing fixtures for the same size and seed are reused.
+    """
+    root = os.path.join(workdir, f"corpus_{n_docs}_{seed}")
+    pdf_folder = os.path.join(root, "pdfs")
+    texts_path = os.path.join(root, "texts.jsonl")
+    if os.path.exists(texts_path):
+        return pdf_folder, texts_path
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root)
+    with open(texts_path + ".tmp", "w", encoding="utf-8") as f:
+        for rel, kind, pages in synthetic_corpus(n_docs, seed):
+            path = os.path.join(pdf_folder, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            synthetic_reports.write_pdf(path, pages)
+            f.write(json.dumps({"file_name": os.path.basename(rel), "kind": kind, "pages": pages}) + "\n")
+    os.replace(texts_path + ".tmp", texts_path)
+    return pdf_folder, texts_path
+
+# -----------------------------
+# Stages
+# -----------------------------
+def load_texts(texts_path):
+    with open(texts_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def bench_header(pdf_folder, texts_path):
+    docs = [(d["file_name"], "\n".join(d["pages"])) for d in load_texts(texts_path)]
+    return [timed(stratx.extract_header_info, text, name) for name, text in docs]
+
+def bench_results(pdf_folder, texts_path):
+    docs = ["\n".join(d["pages"]) for d in load_texts(texts_path)]
+    return [timed(stratx.parse_results_universal, text) for text in docs]
+
+def bench_process_pdf(pdf_folder, texts_path):
+    return [timed(stratx.process_pdf, path) for path in stratx.find_pdf_files(pdf_folder)]
+
+def bench_process_pdf_pdfium(pdf_folder, texts_path):
+    return [timed(stratx.process_pdf, path, "pdfium") for path in stratx.find_pdf_files(pdf_folder)]
+
+def bench_main_folder(pdf_folder, texts_path):
+    with tempfile.TemporaryDirectory() as output_folder:
+        return [timed(stratx.process_main_folder, pdf_folder, output_folder)]
+
+def bench_main_folder_pipeline(pdf_folder, texts_path):
+    with tempfile.TemporaryDirectory() as output_folder:
+        return [timed(partial(stratx.process_main_folder, pipeline=True), pdf_folder, output_folder)]
+
+STAGES = {
+    "extract_header_info": bench_header,
+    "parse_results_universal": bench_results,
+    "process_pdf": bench_process_pdf,
+    "process_pdf_pdfium": bench_process_pdf_pdfium,
+    "process_main_folder": bench_main_folder,
+    "process_main_folder_pipeline": bench_main_folder_pipeline,
+}
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_stage(stage, pdf_folder, texts_path):
+    """
+    Run one stage in the current (fresh) process and return (per-call latencies, peak RSS in MB).
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        latencies = STAGES[stage](pdf_folder, texts_path)
+    return latencies, peak_rss_mb()
+
+def summarize(stage, n_docs, latencies, peak_rss):
+    total = sum(latencies)
+    per_doc = sorted(latencies) if len(latencies) > 1 else []
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        "stage": stage,
+        "docs": n_docs,
+        "seconds": round(total, 4),
+        "docs_per_sec": round(n_docs / total, 1) if total else None,
+        # Whole-folder runs are one measurement, so they have no per-document percentiles
+        "p50_ms": ms(stratx.percentile(per_doc, 50)),
+        "p99_ms": ms(stratx.percentile(per_doc, 99)),
+        "peak_rss_mb": peak_rss,
+    }
+
+# -----------------------------
+# CLI
+# -----------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StratX parser benchmark on a synthetic corpus")
+    parser.add_argument("--sizes", default="100,1000,10000",
+                        help="comma-separated corpus sizes (default: 100,1000,10000)")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated stages to time (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed (default: 0)")
+    parser.add_argument("--workdir", default=None,
+                        help="keep generated fixtures here and reuse them across runs (default: temp folder)")
+    parser.add_argument("--output", default=None,
+                        help="results JSON path (default: benchmark_results_<timestamp>.json)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        sys.exit(f"❌ Unknown stage(s): {', '.join(unknown)}")
+    output = args.output or f"benchmark_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    results = []
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="stratx_bench_"))
+        for n_docs in sizes:
+            print(f"🧪 Generating {n_docs} synthetic reports")
+            pdf_folder, texts_path = build_fixtures(workdir, n_docs, args.seed)
+            for stage in stages:
+                # A fresh process per measurement, so peak RSS belongs to this stage and size alone
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    latencies, peak_rss = pool.submit(run_stage, stage, pdf_folder, texts_path).result()
+                row = summarize(stage, n_docs, latencies, peak_rss)
+                results.append(row)
+                print(f"⏱️ {stage:<24} {n_docs:>6} docs  {row['docs_per_sec'] or 0:>10.1f} docs/s  "
+                      f"p50 {row['p50_ms'] if row['p50_ms'] is not None else '-':>8} ms  "
+                      f"p99 {row['p99_ms'] if row['p99_ms'] is not None else '-':>8} ms  "
+                      f"peak RSS {row['peak_rss_mb']} MB")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "report_kinds": REPORT_KINDS,
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark results saved to: {output}")
+
+if __name__ == "__main__":
+    main()
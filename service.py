@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import queue
+import random
+import signal
+import hashlib
+import logging
+import argparse
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import Future, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import StratX_Parse_Script_Main as stratx
+import synthetic_reports
+
+# -----------------------------
+# Parsing service
+# -----------------------------
+DEFAULT_PORT = 8765
+BATCH_SIZE = 8  # most reports one worker task takes from the queue at once
+MAX_UPLOAD_MB = 100
+REQUEST_TIMEOUT = 600  # seconds a request waits for its row before 504
+LATENCY_WINDOW = 10000  # requests kept for the latency percentiles
+
+log = logging.getLogger("stratx.service")
+
+def ignore_interrupts():
+    # Ctrl-C reaches the whole process group; the service shuts its workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def parse_batch(items, lazy=True, backend=stratx.DEFAULT_BACKEND, grid=False, limits=stratx.DEFAULT_LIMITS):
+    """
+    Worker task: parse a batch of uploads, each (PDF bytes, [file names it was sent under]).
+    Bytes sent under several names are extracted once and parsed per name (ContentIndex).
+    Returns, per upload, ([(unique_id, row_data) per name], template name).
+    """
+    results = []
+    for data, names in items:
+        processed = stratx.process_pdf_with_pages(names[0], lazy, backend, grid, data, limits)
+        copies = stratx.ContentIndex()
+        copies.remember(names[0], processed)
+        rows = [processed[:2]] + [copies.derive(name, names[0]) for name in names[1:]]
+        results.append((rows, processed[6]))
+    return results
+
+class ParseService:
+    """
+    Parses uploaded reports on a pool of `workers` pre-warmed processes (forked from this one, so
+    the imports are already done, and each has parsed a synthetic report before the first
+    request). One dispatcher thread hands the queued uploads to the workers: it takes from the
+    queue only when a worker is free, so a request arriving at an idle service goes straight to a
+    worker, and under load everything that queued in the meantime (up to `batch_size`) goes to
+    the next free worker as one task. With `recycle_after`, workers are replaced after about that
+    many tasks each (RecyclingPool).
+    """
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, lazy=True, backend=stratx.DEFAULT_BACKEND, grid=False,
+                 limits=stratx.DEFAULT_LIMITS, recycle_after=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.batch_size = max(1, batch_size)
+        self.recycle_after = recycle_after
+        self.options = dict(lazy=lazy, backend=backend, grid=grid, limits=limits)
+        self.jobs = queue.Queue()
+        self.free = threading.Semaphore(self.workers)
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = self.batches = self.errors = self.restarts = 0
+        self.pool = stratx.RecyclingPool(self.workers, recycle_after, ignore_interrupts)
+        self.dispatcher = threading.Thread(target=self.dispatch, name="stratx-dispatch", daemon=True)
+
+    def start(self):
+        self.warm_up()
+        self.dispatcher.start()
+        return self
+
+    def warm_up(self):
+        """
+        Start every worker and run a synthetic report through each, so the first requests do not
+        pay for process start-up or first-use setup in pdfplumber and the parsers.
+        """
+        report = synthetic_reports.synthetic_report(random.Random(0), "labeled", "0", "0")
+        data = synthetic_reports.synthetic_pdf(report)
+        futures = [self.pool.submit(parse_batch, [(data, ["warm_up.pdf"])], **self.options)
+                   for _ in range(self.workers)]
+        # restart_pool warms up on the dispatcher thread: a stuck worker must not hold up the queue
+        done, pending = wait(futures, REQUEST_TIMEOUT)
+        if pending:
+            log.warning("%d of %d workers did not finish warming up within %d s",
+                        len(pending), len(futures), REQUEST_TIMEOUT)
+        for future in done:
+            future.result()
+
+    def parse(self, file_name, data, timeout=REQUEST_TIMEOUT):
+        """
+        (unique_id, row_data, template) of one uploaded report; blocks until a worker parsed it.
+        """
+        future = Future()
+        self.jobs.put((file_name, data, future))
+        return future.result(timeout)
+
+    def dispatch(self):
+        while True:
+            self.free.acquire()
+            batch = [self.jobs.get()]
+            if batch[0] is None:
+                break
+            while len(batch) < self.batch_size:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                batch.append(job)
+            self.submit(batch)
+
+    def submit(self, batch):
+        uploads = {}  # sha256 -> (data, [(file_name, future), ...]), identical uploads parsed once
+        for file_name, data, future in batch:
+            uploads.setdefault(hashlib.sha256(data).hexdigest(), (data, []))[1].append((file_name, future))
+        items = [(data, [name for name, _ in jobs]) for data, jobs in uploads.values()]
+        try:
+            try:
+                task = self.pool.submit(parse_batch, items, **self.options)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory): start a fresh pool rather than fail every request
+                self.restart_pool()
+                task = self.pool.submit(parse_batch, items, **self.options)
+        except Exception as e:
+            # Not even a fresh pool takes the batch: fail its requests now, keep dispatching
+            log.exception("Could not submit a batch of %d reports", len(batch))
+            self.free.release()
+            self.fail(list(uploads.values()), e)
+            return
+        with self.lock:
+            self.batches += 1
+        task.add_done_callback(lambda t: self.resolve(t, list(uploads.values())))
+
+    def restart_pool(self):
+        log.warning("Worker pool broken: restarting it")
+        broken, self.pool = self.pool, stratx.RecyclingPool(self.workers, self.recycle_after, ignore_interrupts)
+        broken.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            self.restarts += 1
+        self.warm_up()  # requests queue meanwhile, and then find warm workers
+
+    def resolve(self, task, uploads):
+        self.free.release()
+        try:
+            results = task.result()
+        except Exception as e:
+            self.fail(uploads, e)
+            return
+        for (_, jobs), (rows, template) in zip(uploads, results):
+            for (_, future), (unique_id, row_data) in zip(jobs, rows):
+                future.set_result((unique_id, row_data, template))
+
+    @staticmethod
+    def fail(uploads, error):
+        for _, jobs in uploads:
+            for _, future in jobs:
+                future.set_exception(error)
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            self.requests += 1
+            self.errors += not ok
+            if ok:
+                self.latencies.append(seconds)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {"workers": self.workers, "queued": self.jobs.qsize(), "requests": self.requests,
+                     "errors": self.errors, "batches": self.batches, "restarts": self.restarts}
+        ms = lambda v: None if v is None else round(v * 1000, 1)
+        stats["latency_ms"] = {f"p{q}": ms(stratx.percentile(latencies, q)) for q in (50, 90, 99)}
+        return stats
+
+    def close(self):
+        self.jobs.put(None)
+        self.dispatcher.join(timeout=5)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# -----------------------------
+# HTTP front end
+# -----------------------------
+class ParseHandler(BaseHTTPRequestHandler):
+    """
+    POST /parse with the PDF as the request body (?name=<file name> or an X-File-Name header;
+    the file name feeds File Name and the Patient ID fallback) returns
+    {"file_name", "unique_id", "template", "row": {column: value, ...}}.
+    GET /health returns the service counters and latency percentiles.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse a connection
+    service = None
+    verbose = False
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self.reply(404, {"error": "not found"})
+        self.reply(200, {"status": "ok", **self.service.stats()})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/parse":
+            return self.reply(404, {"error": "not found"})
+        length = self.headers.get("Content-Length")
+        if length is None:
+            return self.reply(411, {"error": "Content-Length required"})
+        length = length.strip()
+        if not (length.isascii() and length.isdigit()):  # int() would also take "-5", "+5" and "1_000"
+            # The body's end is unknown, so the connection cannot be reused
+            self.close_connection = True
+            return self.reply(400, {"error": "Content-Length must be a non-negative integer"})
+        length = int(length)
+        if length > MAX_UPLOAD_MB * 1024 * 1024:
+            self.close_connection = True
+            return self.reply(413, {"error": f"PDF larger than {MAX_UPLOAD_MB} MB"})
+        data = self.rfile.read(length)
+        if not data:
+            return self.reply(400, {"error": "empty body: send the PDF bytes"})
+        name = parse_qs(url.query).get("name", [None])[0] or self.headers.get("X-File-Name") or "upload.pdf"
+        file_name = os.path.basename(name.replace("\\", "/")) or "upload.pdf"
+
+        start = time.perf_counter()
+        try:
+            unique_id, row_data, template = self.service.parse(file_name, data)
+        except TimeoutError:
+            self.service.record(time.perf_counter() - start, ok=False)
+            return self.reply(504, {"error": f"no result within {REQUEST_TIMEOUT}s"})
+        except Exception as e:
+            self.service.record(time.perf_counter() - start, ok=False)
+            return self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+        self.service.record(time.perf_counter() - start)
+        self.reply(200, {"file_name": file_name, "unique_id": unique_id, "template": template,
+                         "row": dict(zip(stratx.columns, row_data))})
+
+    def reply(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """
+    HTTP server for `service` on host:port, or on the Unix socket `socket_path` instead.
+    """
+    handler = type("Handler", (ParseHandler,), {"service": service, "verbose": verbose})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # left over from a previous run
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+# -----------------------------
+# CLI entrypoint
+# -----------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="StratX parsing service: POST a PDF to /parse, get its row as JSON")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", default=None, metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="pre-warmed worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"most queued reports a worker takes at once under load (default: {BATCH_SIZE})")
+    parser.add_argument("--backend", choices=list(stratx.EXTRACTION_BACKENDS), default=stratx.DEFAULT_BACKEND,
+                        help=f"text extractor (default: {stratx.DEFAULT_BACKEND})")
+    parser.add_argument("--grid", action="store_true", help="read RESULTS values from word positions")
+    parser.add_argument("--all-pages", action="store_true", help="extract every page, not just until the row is complete")
+    parser.add_argument("--max-pages", type=int, default=stratx.MAX_DOCUMENT_PAGES, metavar="N",
+                        help=f"per-report page limit (0: none; default: {stratx.MAX_DOCUMENT_PAGES})")
+    parser.add_argument("--max-chars", type=int, default=stratx.MAX_DOCUMENT_CHARS, metavar="N",
+                        help=f"per-report text limit (0: none; default: {stratx.MAX_DOCUMENT_CHARS})")
+    parser.add_argument("--max-seconds", type=float, default=stratx.MAX_DOCUMENT_SECONDS, metavar="S",
+                        help=f"per-report time limit (0: none; default: {stratx.MAX_DOCUMENT_SECONDS})")
+    parser.add_argument("--recycle-after", type=int, default=None, metavar="N",
+                        help="replace each worker process after about N batches")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s", level=logging.INFO)
+    stratx.check_backend(args.backend)
+    limits = stratx.ResourceLimits(args.max_pages, args.max_chars, args.max_seconds)
+    service = ParseService(args.workers, args.batch_size, not args.all_pages, args.backend, args.grid, limits,
+                           args.recycle_after)
+    print(f"🔥 Warming up {service.workers} workers")
+    service.start()
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    print(f"🛰️ StratX service on {where} — POST /parse, GET /health (batches of up to {service.batch_size})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping")
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
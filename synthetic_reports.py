@@ -0,0 +1,124 @@
+import StratX_Parse_Script_Main as stratx
+
+# -----------------------------
+# Synthetic StratX / LungQ reports (benchmark, service warm-up, tests)
+# -----------------------------
+SYNTHETIC_MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SYNTHETIC_DISCLAIMER = ("The information contained in this analysis is to assist with Zephyr Valve Treatment lobe "
+                        "selection purposes only. Powered by MedQIA")
+
+def synthetic_date(rng):
+    return f"{rng.choice(SYNTHETIC_MONTHS)}. {rng.randint(1, 28):02d}, {rng.randint(2021, 2025)}"
+
+def six_numbers(rng, low, high):
+    return " ".join(str(rng.randint(low, high)) for _ in range(6))
+
+def synthetic_report(rng, kind, patient_id, scan_id):
+    """
+    Page texts of one synthetic report. `kind` is labeled (StratX layout), attention (labeled +
+    ATTENTION warning), unlabeled (LungQ-style bare number rows, decimal fissure values) or
+    rejected (Not usable, no RESULTS).
+    """
+    title = "Thirona LungQ Report" if kind == "unlabeled" else "StratX Lung Report"
+    header = [
+        title,
+        f"Patient ID {patient_id} Upload Date {synthetic_date(rng)}",
+        f"Scan ID {scan_id} Report Date {synthetic_date(rng)}",
+        f"CT Scan Date {synthetic_date(rng)} Scan Comments None",
+    ]
+    if kind == "rejected":
+        return ["\n".join(header + [
+            "The following patient order has been rejected because of the following reasons:",
+            "Not usable. No TLC images with > 120 images present.",
+            SYNTHETIC_DISCLAIMER,
+        ])]
+    if kind == "attention":
+        header.append("ATTENTION:Scan acquired outside the acceptable parameters, which can reduce "
+                      "destruction scores and affect fissure evaluation.")
+    lobes = " ".join(stratx.LOBES)
+    if kind == "unlabeled":
+        fissure = " ".join(f"{rng.uniform(40, 100):.1f}" for _ in range(6))
+        results = ["RESULTS", lobes, fissure, six_numbers(rng, 51, 80), six_numbers(rng, 10, 50), six_numbers(rng, 400, 3000)]
+    else:
+        results = [
+            "RESULTS", "RIGHT LUNG LEFT LUNG", lobes,
+            "% Fissure", six_numbers(rng, 40, 100), "Completeness",
+            "% Voxel Density", six_numbers(rng, 51, 80), "Less Than -910 HU",
+            "% Voxel Density", six_numbers(rng, 10, 50), "Less Than -950 HU",
+            "Inspiratory", six_numbers(rng, 400, 3000), "Volume (ml)",
+        ]
+    page1 = "\n".join(header + ["SUMMARY", "KEY", ">= 95% Fissure Completeness"] + results + [SYNTHETIC_DISCLAIMER])
+    return [page1, "Methods\n" + SYNTHETIC_DISCLAIMER]
+
+def pdf_escape(line):
+    line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return line.encode("cp1252", "replace")
+
+def synthetic_grid_report(rng, patient_id, scan_id):
+    """
+    Pages of a labeled report whose first page is laid out like a StratX page (placements for
+    synthetic_pdf): header lines on top, then the RESULTS table with its labels in a left column
+    and one value per lobe column, so parse_results_grid can read it.
+    """
+    lines = [
+        "StratX Lung Report",
+        f"Patient ID {patient_id} Upload Date {synthetic_date(rng)}",
+        f"Scan ID {scan_id} Report Date {synthetic_date(rng)}",
+        f"CT Scan Date {synthetic_date(rng)} Scan Comments None",
+        "SUMMARY", "RESULTS",
+    ]
+    page = [(40, 800 - 11 * i, line) for i, line in enumerate(lines)]
+    y = 800 - 11 * len(lines) - 10
+    page += [(200 + 60 * j, y, lobe) for j, lobe in enumerate(stratx.LOBES)]
+    for label, low, high, label_below in (("% Fissure", 40, 100, "Completeness"),
+                                          ("% Voxel Density", 51, 80, "Less Than -910 HU"),
+                                          ("% Voxel Density", 10, 50, "Less Than -950 HU"),
+                                          ("Inspiratory", 400, 3000, "Volume (ml)")):
+        # The two label lines overlap the value row vertically, as in the real layout
+        y -= 30
+        page += [(40, y + 6, label), (40, y - 6, label_below)]
+        page += [(200 + 60 * j, y, str(rng.randint(low, high))) for j in range(len(stratx.LOBES))]
+    page.append((40, y - 40, SYNTHETIC_DISCLAIMER))
+    return [page, "Methods\n" + SYNTHETIC_DISCLAIMER]
+
+def synthetic_pdf(pages, producer=None):
+    """
+    Bytes of a minimal text-only PDF (Helvetica) that pdfplumber can read. A page is its text, one
+    line per text row, or a list of (x, y, text) placements in points (tables laid out in columns).
+    With `producer`, the document info names it (see layout_fingerprint).
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page in pages:
+        if isinstance(page, str):
+            stream = b"BT /F1 9 Tf 11 TL 40 800 Td\n"
+            stream += b"".join(b"(" + pdf_escape(line) + b") Tj T*\n" for line in page.split("\n"))
+            stream += b"ET"
+        else:
+            stream = b"\n".join(b"BT /F1 9 Tf %d %d Td (%s) Tj ET" % (x, y, pdf_escape(text)) for x, y, text in page)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    info = b""
+    if producer:
+        objects.append(b"<< /Producer (%s) >>" % pdf_escape(producer))
+        info = b" /Info %d 0 R" % len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R%s >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, info, xref)
+    return bytes(out)
+
+def write_pdf(path, pages, producer=None):
+    with open(path, "wb") as f:
+        f.write(synthetic_pdf(pages, producer))
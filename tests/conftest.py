@@ -0,0 +1,46 @@
+import os
+import sys
+import random
+
+import pytest
+
+# The modules live at the top of the repository, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+# Page text of a labeled StratX report
+REPORT_PAGES = ["\n".join([
+    "StratX Lung Report",
+    "Patient ID 1001 Upload Date Jan. 05, 2024",
+    "Scan ID 123456 Report Date Jan. 09, 2024",
+    "CT Scan Date Jan. 02, 2024 Scan Comments None",
+    "SUMMARY", "KEY", ">= 95% Fissure Completeness",
+    "RESULTS", "RIGHT LUNG LEFT LUNG", "RUL RUL+RML RML RLL LUL LLL",
+    "% Fissure", "90 95 80 100 70 99", "Completeness",
+    "% Voxel Density", "60 61 62 63 64 65", "Less Than -910 HU",
+    "% Voxel Density", "20 21 22 23 24 25", "Less Than -950 HU",
+    "Inspiratory", "1500 2000 900 1800 1700 1600", "Volume (ml)",
+])]
+
+
+CORPUS_KINDS = ("labeled", "labeled", "attention", "unlabeled", "rejected", "labeled")
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """
+    A folder of synthetic reports over two sites, with one byte copy and one repeated Patient ID.
+    """
+    root = tmp_path_factory.mktemp("corpus")
+    rng = random.Random(0)
+    for i in range(12):
+        kind = CORPUS_KINDS[i % len(CORPUS_KINDS)]
+        folder = root / f"Site_{i % 2}" / f"StratX_{i // 6:04d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        patient_id = 100 + (i if i != 7 else 3)
+        write_pdf(folder / f"StratX_{patient_id}_{i:04d}.pdf",
+                         synthetic_report(rng, kind, patient_id, rng.randint(100000, 999999)))
+    (root / "Site_1" / "StratX_0001" / "copy_of_0000.pdf").write_bytes(
+        (root / "Site_0" / "StratX_0000" / "StratX_100_0000.pdf").read_bytes())
+    return str(root)
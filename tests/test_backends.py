@@ -0,0 +1,40 @@
+import sys
+import random
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+@pytest.fixture
+def report(tmp_path):
+    path = tmp_path / "StratX_600.pdf"
+    write_pdf(path, synthetic_report(random.Random(6), "attention", 600, 700600))
+    return str(path)
+
+@pytest.fixture
+def without_pypdfium2(monkeypatch):
+    # A None entry makes `import pypdfium2` raise ImportError
+    monkeypatch.setitem(sys.modules, "pypdfium2", None)
+    monkeypatch.setattr(stratx, "_pdfium_missing_warned", False)
+
+def test_pdfium_rows_match_pdfplumber(report):
+    pdfium = stratx.process_pdf_with_pages(report, backend="pdfium")
+    pdfplumber = stratx.process_pdf_with_pages(report)
+    assert pdfium[:2] == pdfplumber[:2]
+    assert not pdfium[4]  # not fallen back
+
+def test_pdfium_failure_falls_back_to_pdfplumber(report, without_pypdfium2):
+    processed = stratx.process_pdf_with_pages(report, backend="pdfium")
+    assert processed[4]  # fell back
+    assert processed[:2] == stratx.process_pdf_with_pages(report)[:2]
+
+def test_text_fingerprint_falls_back_to_pdfplumber(report, monkeypatch):
+    fingerprint = stratx.text_fingerprint(report)
+    monkeypatch.setitem(sys.modules, "pypdfium2", None)
+    assert fingerprint and stratx.text_fingerprint(report) == fingerprint
+
+def test_pdfium_backend_without_pypdfium2_is_a_usage_error(tmp_path, report, without_pypdfium2, capsys):
+    code = stratx.main([str(tmp_path), "-o", str(tmp_path / "out"), "--backend", "pdfium", "-q"])
+    assert code == stratx.EXIT_USAGE
+    assert "needs pypdfium2" in capsys.readouterr().err
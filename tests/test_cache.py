@@ -0,0 +1,64 @@
+import re
+
+import StratX_Parse_Script_Main as stratx
+from conftest import REPORT_PAGES
+
+def cached_lookup(cache_dir):
+    cache = stratx.ResultCache(cache_dir)
+    try:
+        row = cache.lookup("digest", "1001.pdf")
+        return row, cache.hits, cache.reparsed
+    finally:
+        cache.close()
+
+def fill_cache(cache_dir):
+    unique_id, row_data, _ = stratx.parse_text("\n".join(REPORT_PAGES), "1001.pdf")
+    cache = stratx.ResultCache(cache_dir)
+    cache.store("digest", "1001.pdf", REPORT_PAGES, unique_id, row_data)
+    cache.close()
+    return row_data
+
+def test_unchanged_parser_hits_cached_row(tmp_path):
+    row_data = fill_cache(tmp_path)
+    row, hits, reparsed = cached_lookup(tmp_path)
+    assert (row[1], hits, reparsed) == (row_data, 1, 0)
+
+def test_header_pattern_change_misses_cached_row(tmp_path, monkeypatch):
+    fill_cache(tmp_path)
+    version = stratx.parser_version()
+    fields = dict(stratx.HEADER_FIELDS)
+    fields["scan id"] = ("Scan ID", re.compile(r"Scan ID\s+(\d{3})", re.IGNORECASE))
+    monkeypatch.setattr(stratx, "HEADER_FIELDS", fields)
+    assert stratx.parser_version() != version
+    row, hits, reparsed = cached_lookup(tmp_path)
+    assert (hits, reparsed) == (0, 1)
+    assert row[1][stratx.columns.index("Scan ID")] == "123"
+
+def test_results_label_change_misses_cached_row(tmp_path, monkeypatch):
+    fill_cache(tmp_path)
+    version = stratx.parser_version()
+    patterns = {**stratx.RESULTS_LABEL_PATTERNS, "inspiratory": r"inspiratory[^\S\n]*volume"}
+    monkeypatch.setattr(stratx, "RESULTS_LABEL_PATTERNS", patterns)
+    assert stratx.parser_version() != version
+    assert cached_lookup(tmp_path)[1:] == (0, 1)
+
+def test_grid_table_change_changes_parser_version(monkeypatch):
+    version = stratx.parser_version()
+    monkeypatch.setattr(stratx, "GRID_ROW_LABELS", {**stratx.GRID_ROW_LABELS, "Inspiratory Volume (ml)": ("volume",)})
+    assert stratx.parser_version() != version
+    monkeypatch.undo()
+    monkeypatch.setattr(stratx, "Y_TOLERANCE", stratx.Y_TOLERANCE + 1)
+    assert stratx.parser_version() != version
+
+def test_fingerprint_label_change_changes_parser_version(monkeypatch):
+    version = stratx.parser_version()
+    monkeypatch.setattr(stratx, "FINGERPRINT_LABELS", stratx.FINGERPRINT_LABELS + ("stratx",))
+    assert stratx.parser_version() != version
+
+def test_fingerprint_label_change_rematches_cached_text(tmp_path, monkeypatch):
+    fill_cache(tmp_path)
+    version = stratx.routing_version()
+    monkeypatch.setattr(stratx, "FINGERPRINT_LABELS", stratx.FINGERPRINT_LABELS + ("stratx",))
+    assert stratx.routing_version() != version
+    row, hits, reparsed = cached_lookup(tmp_path)
+    assert (row, hits, reparsed) == (None, 0, 0)
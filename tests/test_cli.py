@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import random
+import subprocess
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+def run(*argv):
+    return stratx.main([*map(str, argv), "-q"])
+
+def test_incremental_exit_code_covers_only_this_run(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    rng = random.Random(3)
+    for i in range(2):
+        write_pdf(folder / f"StratX_{300 + i}.pdf", synthetic_report(rng, "labeled", 300 + i, 4000 + i))
+    (folder / "StratX_broken.pdf").write_bytes(b"%PDF-1.4 not really")
+    out, report = tmp_path / "out", tmp_path / "run.json"
+
+    assert run(folder, "-o", out, "--incremental", "--json", report) == stratx.EXIT_FAILED_PDFS
+    assert json.loads(report.read_text())["status_counts"]["⚠️ Failed to Read"] == 1
+
+    # Nothing changed: the failed row is still in the rolling CSV, but this run parsed nothing
+    assert run(folder, "-o", out, "--incremental", "--json", report) == stratx.EXIT_OK
+    second = json.loads(report.read_text())
+    assert second["rows"] == 3 and second["changed"] == 0
+    assert sum(second["status_counts"].values()) == 0
+
+    write_pdf(folder / "StratX_302.pdf", synthetic_report(rng, "labeled", 302, 4002))
+    assert run(folder, "-o", out, "--incremental", "--json", report) == stratx.EXIT_OK
+    assert json.loads(report.read_text())["status_counts"]["✅ No Warnings"] == 1
+
+def test_json_stdout_stays_clean_with_spawned_workers(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    write_pdf(folder / "StratX_400.pdf", synthetic_report(random.Random(4), "labeled", 400, 5000))
+    (folder / "StratX_broken.pdf").write_bytes(b"%PDF-1.4 not really")
+    # spawn (the macOS and Windows default): workers do not inherit the parent's stdout redirect
+    script = ("import sys, multiprocessing; multiprocessing.set_start_method('spawn'); "
+              "import StratX_Parse_Script_Main as stratx; sys.exit(stratx.main(sys.argv[1:]))")
+    repo = os.path.dirname(os.path.abspath(stratx.__file__))
+    completed = subprocess.run(
+        [sys.executable, "-c", script, str(folder), "-o", str(tmp_path / "out"), "--workers", "2", "--json", "-"],
+        cwd=repo, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == stratx.EXIT_FAILED_PDFS
+    assert json.loads(completed.stdout)["status_counts"]["⚠️ Failed to Read"] == 1
+    assert "Failed to read or extract text from PDF: StratX_broken.pdf" in completed.stderr
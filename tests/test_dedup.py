@@ -0,0 +1,45 @@
+import os
+import json
+import random
+
+import pandas as pd
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+def run_folder(corpus, out, *options):
+    report = out / "run.json"
+    stratx.main([corpus, "-o", str(out), "--no-history", "-q", "--json", str(report), *options])
+    return json.loads(report.read_text())
+
+def test_content_dedup_costs_no_hash_without_the_cache(corpus, tmp_path, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(stratx, "file_digest", lambda path: hashed.append(path) or path)
+    assert run_folder(corpus, tmp_path / "plain", "--no-cache")["content_duplicates"] == 0
+    assert not hashed
+    monkeypatch.undo()
+    assert run_folder(corpus, tmp_path / "opt_in", "--no-cache", "--content-dedup")["content_duplicates"] == 1
+    assert run_folder(corpus, tmp_path / "cached")["content_duplicates"] == 1
+    assert run_folder(corpus, tmp_path / "off", "--no-content-dedup")["content_duplicates"] == 0
+
+def test_duplicate_pairs_are_reported(tmp_path):
+    folder = tmp_path / "in"
+    pages = synthetic_report(random.Random(8), "labeled", 900, 990900)
+    for rel, producer in (("StratX_0027-2/StratX_900.pdf", None), ("StratX_0027-3/StratX_900_copy.pdf", None),
+                          ("StratX_0027-4/StratX_900_reexport.pdf", "Qt 5.15.2")):
+        (folder / rel).parent.mkdir(parents=True, exist_ok=True)
+        write_pdf(folder / rel, pages, producer)
+    result = run_folder(str(folder), tmp_path / "dedup", "--no-cache", "--content-dedup", "--text-dedup")
+    assert result["content_duplicates"] == 2
+    pairs = pd.read_csv(result["content_duplicates_file"], sep=";", encoding="utf-8-sig")
+    # Pairs come in discovery order, which follows the folder listing
+    assert sorted(pairs.values.tolist()) == [
+        [os.path.join("StratX_0027-3", "StratX_900_copy.pdf"), os.path.join("StratX_0027-2", "StratX_900.pdf"), "bytes"],
+        [os.path.join("StratX_0027-4", "StratX_900_reexport.pdf"), os.path.join("StratX_0027-2", "StratX_900.pdf"),
+         "text"],
+    ]
+    # Rows as if every copy had been read: the duplicate Patient ID/Scan ID rows are still dropped
+    plain = run_folder(str(folder), tmp_path / "plain", "--no-cache", "--no-content-dedup")
+    with open(result["output"], "rb") as deduped, open(plain["output"], "rb") as read_all:
+        assert deduped.read() == read_all.read()
+    assert result["duplicates"] == plain["duplicates"] == 2
@@ -0,0 +1,92 @@
+import os
+import io
+import zipfile
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+
+FILES = [
+    "Chicago/StratX_0027-2/a.pdf",
+    "Chicago/StratX_0027-2/a_draft.pdf",
+    "Chicago/StratX_0027-3/b.PDF",
+    "Boston/c.pdf",
+    "Boston/.DS_Store",
+    "Boston/._c.pdf",
+    "Boston/notes.txt",
+    "StratX_Results/StratX_Parsed_Results.pdf",
+]
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in FILES:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%PDF-")
+    return tmp_path
+
+def discover(root, include=None, exclude=None, cache=None):
+    return sorted(rel.replace(os.sep, "/") for _, rel in stratx.find_input_pdfs(str(root), include, exclude, cache))
+
+def test_default_discovery_skips_junk_and_results(tree):
+    assert discover(tree) == ["Boston/c.pdf", "Chicago/StratX_0027-2/a.pdf", "Chicago/StratX_0027-2/a_draft.pdf",
+                              "Chicago/StratX_0027-3/b.PDF"]
+
+@pytest.mark.parametrize("include, exclude, expected", [
+    (["Chicago"], None, ["Chicago/StratX_0027-2/a.pdf", "Chicago/StratX_0027-2/a_draft.pdf",
+                         "Chicago/StratX_0027-3/b.PDF"]),
+    (None, ["*_draft.pdf"], ["Boston/c.pdf", "Chicago/StratX_0027-2/a.pdf", "Chicago/StratX_0027-3/b.PDF"]),
+    (None, ["Chicago/StratX_0027-2"], ["Boston/c.pdf", "Chicago/StratX_0027-3/b.PDF"]),
+    (["Chicago/*"], ["*-3"], ["Chicago/StratX_0027-2/a.pdf", "Chicago/StratX_0027-2/a_draft.pdf"]),
+], ids=["include-site", "exclude-file-glob", "exclude-folder-path", "include-and-exclude"])
+def test_include_exclude_globs(tree, include, exclude, expected):
+    assert discover(tree, include, exclude) == expected
+
+def test_excluded_folders_are_not_listed(tree, monkeypatch):
+    listed = []
+    list_folder = stratx.list_folder
+    monkeypatch.setattr(stratx, "list_folder", lambda path, cache=None: listed.append(path) or list_folder(path, cache))
+    discover(tree, exclude=["Chicago"])
+    assert not [path for path in listed if "Chicago" in path or "StratX_Results" in path]
+
+def set_mtime(path, seconds):
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+def test_listing_cache_is_refreshed_when_a_folder_or_zip_changes(tree, tmp_path_factory, monkeypatch):
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    boston = tree / "Boston"
+    with zipfile.ZipFile(boston / "bundle.zip", "w") as zf:
+        zf.writestr("d.pdf", b"%PDF-")
+    for path in (boston / "bundle.zip", *(p for p in tree.rglob("*") if p.is_dir()), tree):
+        set_mtime(path, 1_700_000_000)
+
+    def run():
+        cache = stratx.ListingCache(cache_dir)
+        try:
+            return discover(tree, include=["Boston"], cache=cache), (cache.hits, cache.misses)
+        finally:
+            cache.close()
+
+    first, _ = run()
+    assert first == ["Boston/bundle.zip/d.pdf", "Boston/c.pdf"]
+    assert run() == (first, (6, 0))  # every folder walked (5) and the zip come from the cache
+
+    # A new file changes the folder's mtime, a rewritten zip its size and mtime
+    (boston / "e.pdf").write_bytes(b"%PDF-")
+    set_mtime(boston, 1_700_000_100)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("d.pdf", b"%PDF-")
+        zf.writestr("f.pdf", b"%PDF-")
+    (boston / "bundle.zip").write_bytes(buffer.getvalue())
+    set_mtime(boston / "bundle.zip", 1_700_000_100)
+    assert run() == (["Boston/bundle.zip/d.pdf", "Boston/bundle.zip/f.pdf", "Boston/c.pdf", "Boston/e.pdf"], (4, 2))
+
+def test_recently_changed_folders_are_not_cached(tree, tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    for _ in range(2):
+        cache = stratx.ListingCache(cache_dir)
+        discover(tree, cache=cache)
+        cache.close()
+    # Just written, so within LISTING_SETTLE_SECONDS: listed again rather than trusted
+    assert cache.hits == 0
@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+def write(tmp_path, name, pages):
+    path = tmp_path / name
+    write_pdf(path, pages)
+    return str(path)
+
+def full_parse(pdf_path, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(stratx, "early_reject", lambda text: False)
+        return stratx.process_pdf_with_pages(pdf_path, lazy=False)
+
+def test_rejected_order_stops_after_first_page(tmp_path, monkeypatch):
+    pages = synthetic_report(random.Random(5), "rejected", 700, 800700)
+    pdf_path = write(tmp_path, "StratX_700.pdf", pages + [f"Image review page {i}" for i in range(3)])
+    expected = full_parse(pdf_path, monkeypatch)
+
+    def unexpected(*args):
+        raise AssertionError("RESULTS parsed for a rejected order")
+    monkeypatch.setattr(stratx, "index_results_text", unexpected)
+    stats = Counter()
+    processed = stratx.process_pdf_with_pages(pdf_path)
+    # Scan Comments runs to the end of the text read, here the first page's rejection text
+    comments = stratx.columns.index("Scan Comments")
+    assert processed[1][comments] == stratx.parse_pages(pages[:1], "StratX_700.pdf")[1][comments]
+    assert processed[1][:comments] + processed[1][comments + 1:] == expected[1][:comments] + expected[1][comments + 1:]
+    assert processed[1][7] == "⚠️ Not Usable" and processed[1][8:] == [None] * 24
+    assert processed[3] == 3  # pages skipped
+    assert processed[7] is not None  # seconds saved
+    list(stratx.iter_pdf_results([pdf_path], stats=stats))
+    assert stats["early_rejects"] == 1 and stats["early_reject_pages"] == 3
+
+@pytest.mark.parametrize("first_page, status", [
+    # A non-report PDF that mentions a marker: no RESULTS block, so the same header-only row
+    ("Scanner log\nThe CT scanner was not usable on Monday.", "⚠️ Not Usable"),
+    # No marker: not rejected, read in full
+    ("Scanner log\nAll scans completed.", "⚠️ Parsing Failed"),
+])
+def test_non_report_pdfs_get_the_full_parse_row(tmp_path, monkeypatch, first_page, status):
+    pdf_path = write(tmp_path, "notes.pdf", [first_page, "Second page"])
+    processed = stratx.process_pdf_with_pages(pdf_path)
+    assert processed[:2] == full_parse(pdf_path, monkeypatch)[:2]
+    assert processed[1][7] == status
+    assert (processed[7] is not None) == (status == "⚠️ Not Usable")
+
+def test_not_usable_report_with_results_is_parsed(tmp_path):
+    pages = synthetic_report(random.Random(6), "labeled", 701, 800701)
+    pages[0] = pages[0].replace("SUMMARY", "Not usable. Slice thickness > 1.5 mm.\nSUMMARY")
+    processed = stratx.process_pdf_with_pages(write(tmp_path, "StratX_701.pdf", pages))
+    assert not stratx.early_reject(pages[0])
+    assert processed[1][7] == "⚠️ Not Usable"
+    assert None not in processed[1][8:]
+    assert processed[7] is None
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+
+def run_folder(corpus, out, *options):
+    report = out / "run.json"
+    code = stratx.main([corpus, "-o", str(out), "--no-cache", "--no-history", "-q", "--json", str(report), *options])
+    result = json.loads(report.read_text())
+    with open(result["output"], "rb") as f:
+        return code, f.read()
+
+@pytest.fixture(scope="module")
+def serial(corpus, tmp_path_factory):
+    return run_folder(corpus, tmp_path_factory.mktemp("serial"))
+
+@pytest.mark.parametrize("options", [
+    ("--workers", "2"),
+    ("--workers", "2", "--recycle-after", "2"),
+    ("--pipeline",),
+    ("--pipeline", "--workers", "2"),
+], ids=" ".join)
+def test_parallel_run_matches_serial(corpus, tmp_path, serial, options):
+    assert run_folder(corpus, tmp_path, *options) == serial
@@ -0,0 +1,128 @@
+import re
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+
+RESULTS_BLOCK = [
+    "RESULTS", "RIGHT LUNG LEFT LUNG", "RUL RUL+RML RML RLL LUL LLL",
+    "% Fissure", "90 95 80 100 70 99", "Completeness",
+    "% Voxel Density", "20 21 22 23 24 25", "Less Than -950 HU",
+    "% Voxel Density", "60 61 62 63 64 65", "Less Than -910 HU",
+    "Inspiratory", "1500 2000 900 1800 1700 1600", "Volume (ml)",
+]
+RESULTS_VALUES = {
+    "Fissure Completeness": ["90", "95", "80", "100", "70", "99"],
+    # The larger rows are -910 HU, whichever order the report lists them in
+    "Voxel Density -910 HU": ["60", "61", "62", "63", "64", "65"],
+    "Voxel Density -950 HU": ["20", "21", "22", "23", "24", "25"],
+    "Inspiratory Volume (ml)": ["1500", "2000", "900", "1800", "1700", "1600"],
+}
+ATTENTION = "ATTENTION:Scan acquired outside the acceptable parameters."
+
+def labeled_text(powered_by, comments=()):
+    return "\n".join([
+        "StratX Lung Report",
+        "Patient ID 1001 Upload Date Jan. 05, 2024",
+        "Scan ID 123456 Report Date Jan. 09, 2024",
+        "CT Scan Date Jan. 02, 2024 Scan Comments None",
+        *comments,
+        "SUMMARY", "KEY", ">= 95% Fissure Completeness",
+        *RESULTS_BLOCK,
+        f"Powered by {powered_by}",
+    ])
+
+LABELED_HEADER = {
+    "Patient ID": "1001", "Upload Date": "Jan. 05, 2024", "Scan ID": "123456",
+    "Report Date": "Jan. 09, 2024", "CT Scan Date": "Jan. 02, 2024",
+}
+
+def expected_row(file_name, header, results, comments="None", status="✅ No Warnings"):
+    row = [file_name, header.get("Patient ID"), header.get("Upload Date"), header.get("Scan ID"),
+           header.get("Report Date"), header.get("CT Scan Date"), comments, status]
+    for key in stratx.RESULT_KEYS:
+        row.extend(results.get(key, [None] * 6))
+    return row
+
+CASES = {
+    "voiant": (
+        labeled_text("Voiant"), "StratX_1001.pdf", ["stratx-voiant", "generic"],
+        expected_row("StratX_1001.pdf", LABELED_HEADER, RESULTS_VALUES), True,
+    ),
+    "medqia-attention": (
+        labeled_text("MedQIA", [ATTENTION]), "StratX_1001.pdf", ["stratx-medqia", "generic"],
+        expected_row("StratX_1001.pdf", LABELED_HEADER, RESULTS_VALUES, f"None {ATTENTION}", "⚠️ Warning"), True,
+    ),
+    "patient-id-on-next-line": (
+        labeled_text("MedQIA").replace("Patient ID 1001", "Patient ID\n1001"), "report.pdf",
+        ["stratx-medqia", "generic"], expected_row("report.pdf", LABELED_HEADER, RESULTS_VALUES), True,
+    ),
+    "unlabeled": (
+        "\n".join(["Thirona LungQ Report", "5706.1", "Jan. 05, 2024", "Jan. 02, 2024", "Jan. 09, 2024",
+                   "90.5 95.0 80.2 100.0 70.1 99.9", "60 61 62 63 64 65", "20 21 22 23 24 25",
+                   "1500 2000 900 1800 1700 1600"]),
+        "LungQ_4242_5706.pdf", ["lungq-unlabeled", "generic"],
+        expected_row("LungQ_4242_5706.pdf",
+                     {"Patient ID": "4242", "Upload Date": "Jan. 05, 2024", "Scan ID": "5706.1",
+                      "Report Date": "Jan. 09, 2024", "CT Scan Date": "Jan. 02, 2024"},
+                     {**RESULTS_VALUES, "Fissure Completeness": ["90.5", "95.0", "80.2", "100.0", "70.1", "99.9"]}),
+        False,
+    ),
+    "missing-fields": (
+        # No Scan ID or Report Date label, and only the fissure row in RESULTS
+        "\n".join(["StratX Lung Report", "Patient ID 1001 Upload Date Jan. 05, 2024",
+                   "CT Scan Date Jan. 02, 2024 Scan Comments None", "SUMMARY", *RESULTS_BLOCK[:6],
+                   "Powered by Voiant"]),
+        "StratX_1001.pdf", ["stratx-voiant", "generic"],
+        expected_row("StratX_1001.pdf",
+                     {"Patient ID": "1001", "Upload Date": "Jan. 05, 2024", "Scan ID": "1001",
+                      "CT Scan Date": "Jan. 02, 2024"},
+                     {"Fissure Completeness": RESULTS_VALUES["Fissure Completeness"]},
+                     status="⚠️ Parsing Failed"),
+        False,
+    ),
+}
+
+@pytest.mark.parametrize("case", CASES)
+def test_fields_match_known_values(case):
+    text, file_name, templates, row, complete = CASES[case]
+    for template in templates:
+        unique_id, row_data, is_complete = stratx.parse_text(text, file_name, template=template)
+        assert row_data == row, template
+        assert unique_id == f"{row[1]}_{row[3]}"
+        assert is_complete == complete
+
+# The header patterns as separate IGNORECASE searches, the way the header was read before find_header_labels
+REFERENCE_PATTERNS = {
+    "Patient ID": r"Patient ID\s+([\w_.-]+)",
+    "Scan ID": r"Scan ID\s+([\d.]+)",
+    "Upload Date": r"Upload Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
+    "Report Date": r"Report Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
+    "CT Scan Date": r"(?:CT\s)?Scan Date\s+([A-Za-z]+\.\s+\d{1,2},\s+\d{4})",
+    "Scan Comments": r"Scan Comments\s*([\s\S]*?)(?=SUMMARY|RESULTS|KEY|Fissure Completeness|$)",
+}
+
+@pytest.mark.parametrize("text", [
+    *(case[0] for case in CASES.values()),
+    "PATIENT ID 7 scan id 8 Scan Date Feb. 01, 2023 upload date Mar. 02, 2023 Scan Comments x RESULTS",
+    "Scan IDİ 1 Patient ID 9 Scan Comments İstanbul KEY",  # lowercasing changes the length
+    "Patient ID   Scan ID 5.5 Report Date Jan. 1, 2020",
+])
+def test_single_pass_labels_match_separate_searches(text):
+    text = stratx.normalize_text(text)
+    found = {key: raw for key, (raw, _) in stratx.find_header_labels(text).items()}
+    reference = {}
+    for key, pattern in REFERENCE_PATTERNS.items():
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            reference[key] = m.group(1)
+    assert found == reference
+
+def test_results_index_matches_line_scan():
+    text = stratx.normalize_text("\n".join(["Scan Comments None", "RESULTS % Fissure 1 2 3 4 5 6", *RESULTS_BLOCK[1:]]))
+    _, labeled_lines = stratx.index_results_text(text)
+    # Reference: the lines after RESULTS, each searched for its labels
+    lines = [ln.strip() for ln in text[text.index("RESULTS") + len("RESULTS"):].split("\n") if ln.strip()]
+    assert labeled_lines.lines == lines
+    for name, pattern in stratx.RESULTS_LABEL_PATTERNS.items():
+        assert labeled_lines.labels[name] == [i for i, ln in enumerate(lines) if re.search(pattern, ln, re.IGNORECASE)]
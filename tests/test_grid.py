@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_grid_report, write_pdf
+
+@pytest.mark.parametrize("backend", ["pdfplumber", "pdfium"])
+@pytest.mark.parametrize("seed", range(3))
+def test_grid_matches_text_parser(tmp_path, backend, seed):
+    path = tmp_path / f"StratX_{seed}.pdf"
+    write_pdf(path, synthetic_grid_report(random.Random(seed), 800 + seed, 900000 + seed))
+    grid = stratx.process_pdf_with_pages(str(path), backend=backend, grid=True)
+    # The grid words were read, and the table fully parsed from them
+    assert len(stratx.parse_results_grid(grid[5])) == len(stratx.RESULT_KEYS)
+    assert grid[:2] == stratx.process_pdf_with_pages(str(path), backend=backend)[:2]
+
+def word(text, x0, top):
+    return text, x0, x0 + 6 * len(text), top, top + 9
+
+def table(rows):
+    """
+    Word boxes of a RESULTS table: the lobe header, then (label above, values, label below) per row.
+    """
+    words = [word("RESULTS", 40, 0)] + [word(lobe, 200 + 60 * j, 20) for j, lobe in enumerate(stratx.LOBES)]
+    for i, (label, values, label_below) in enumerate(rows):
+        top = 50 + 30 * i
+        words += [word(w, 40 + 40 * k, top - 6) for k, w in enumerate(label.split())]
+        words += [word(v, 200 + 60 * j, top) for j, v in enumerate(values)]
+        words += [word(w, 40 + 40 * k, top + 6) for k, w in enumerate(label_below.split())]
+    return words
+
+def test_grid_names_voxel_rows_by_label():
+    low, high = [str(v) for v in range(10, 16)], [str(v) for v in range(60, 66)]
+    # -950 HU listed first; the labels, not the row sums or order, say which row is which
+    parsed = stratx.parse_results_grid(table([
+        ("% Voxel Density", low, "Less Than -950 HU"),
+        ("% Voxel Density", high, "Less Than -910 HU"),
+    ]))
+    assert parsed == {"Voxel Density -950 HU": low, "Voxel Density -910 HU": high}
+
+def test_grid_without_lobe_header_reads_nothing():
+    words = [w for w in table([("% Fissure", list("123456"), "Completeness")]) if w[0] not in stratx.LOBES]
+    assert stratx.parse_results_grid(words) == {}
+
+def test_incomplete_grid_falls_back_to_text_parser():
+    words = table([("% Fissure", list("123456"), "Completeness")])
+    text = "\n".join(["RESULTS", "% Fissure", "90 95 80 100 70 99", "Completeness"])
+    row = stratx.parse_text(text, "a.pdf", grid_words=words)[1]
+    assert row[8:14] == ["90", "95", "80", "100", "70", "99"]
@@ -0,0 +1,81 @@
+import random
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_report, write_pdf
+
+def long_report(tmp_path, extra_pages):
+    pages = synthetic_report(random.Random(1), "labeled", "2001", "654321")
+    path = tmp_path / "StratX_2001.pdf"
+    write_pdf(path, pages + [f"Appendix page {i}" for i in range(extra_pages)])
+    return str(path)
+
+def scan_status(processed):
+    return processed[1][stratx.columns.index("Scan Status")]
+
+def test_max_pages_counts_only_pages_read(tmp_path):
+    pdf_path = long_report(tmp_path, 4)
+    limits = stratx.ResourceLimits(pages=3)
+    lazy = stratx.process_pdf_with_pages(pdf_path, lazy=True, limits=limits)
+    assert scan_status(lazy) == "✅ No Warnings"
+    # --all-pages reads every page, so a complete row does not exempt a long document
+    every_page = stratx.process_pdf_with_pages(pdf_path, lazy=False, limits=limits)
+    assert scan_status(every_page) == "⚠️ Resource Limit"
+    assert every_page[1][stratx.columns.index("Scan Comments")] == "Resource limit: more than 3 pages"
+    assert scan_status(stratx.process_pdf_with_pages(pdf_path, lazy=False)) == "✅ No Warnings"
+
+def report_with_later_page(tmp_path, later_page, kind="labeled"):
+    pages = synthetic_report(random.Random(2), kind, "2002", "123123")
+    path = tmp_path / "StratX_2002.pdf"
+    write_pdf(path, pages + ["Appendix", later_page])
+    return str(path)
+
+def test_lazy_extraction_still_reads_status_markers_on_later_pages(tmp_path):
+    for later_page, kind, status in (
+        ("ATTENTION: reconstruction kernel outside the protocol", "labeled", "⚠️ Warning"),
+        ("Not usable. Slice thickness > 1.5 mm.", "attention", "⚠️ Not Usable"),
+    ):
+        pdf_path = report_with_later_page(tmp_path, later_page, kind)
+        lazy = stratx.process_pdf_with_pages(pdf_path, lazy=True)
+        assert scan_status(lazy) == status
+        assert lazy[:2] == stratx.process_pdf_with_pages(pdf_path, lazy=False)[:2]
+
+def test_lazy_extraction_skips_later_pages_without_markers(tmp_path):
+    pdf_path = report_with_later_page(tmp_path, "Methods and references")
+    lazy = stratx.process_pdf_with_pages(pdf_path, lazy=True)
+    assert lazy[3] == 3  # pages skipped
+    assert lazy[:2] == stratx.process_pdf_with_pages(pdf_path, lazy=False)[:2]
+
+def test_one_page_reports_skip_the_later_page_scan(tmp_path, monkeypatch):
+    pages = synthetic_report(random.Random(3), "labeled", "2003", "321321")[:1]
+    path = tmp_path / "StratX_2003.pdf"
+    write_pdf(path, pages)
+    def unexpected(*args):
+        raise AssertionError("scanned past the last page")
+    monkeypatch.setattr(stratx, "later_status_marker", unexpected)
+    assert scan_status(stratx.process_pdf_with_pages(str(path), lazy=True)) == "✅ No Warnings"
+
+def test_missing_pypdfium2_reads_every_page_and_warns_once(tmp_path, monkeypatch, capsys):
+    def missing():
+        raise RuntimeError("The pdfium backend needs pypdfium2 (pip install pypdfium2)")
+    monkeypatch.setattr(stratx, "import_pypdfium2", missing)
+    monkeypatch.setattr(stratx, "_pdfium_missing_warned", False)
+    pdf_path = report_with_later_page(tmp_path, "Methods and references")
+    for _ in range(2):
+        lazy = stratx.process_pdf_with_pages(pdf_path, lazy=True)
+        assert lazy[3] == 0  # pages skipped
+        assert scan_status(lazy) == "✅ No Warnings"
+    assert capsys.readouterr().err.count("needs pypdfium2") == 1
+
+class StalledPdfium:
+    class PdfiumError(RuntimeError):
+        pass
+
+    def PdfDocument(self, source):
+        raise stratx.ResourceLimitExceeded("more than 1s")
+
+def test_time_limit_during_the_later_page_scan_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(stratx, "import_pypdfium2", StalledPdfium)
+    pdf_path = report_with_later_page(tmp_path, "Methods and references")
+    processed = stratx.process_pdf_with_pages(pdf_path, lazy=True)
+    assert scan_status(processed) == "⚠️ Resource Limit"
+    assert processed[1][stratx.columns.index("Scan Comments")] == "Resource limit: more than 1s"
@@ -0,0 +1,38 @@
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+
+def pipeline_rows(corpus, tmp_path, **options):
+    rows = []
+    cache = stratx.ResultCache(str(tmp_path / "cache"))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(stratx.run_pipeline(stratx.find_pdf_files(corpus), lambda *row: rows.append(row),
+                                            cache=cache, dedup=stratx.ContentIndex(), **options))
+    finally:
+        cache.close()
+    return rows
+
+def test_cached_pipeline_run_matches_the_first(corpus, tmp_path):
+    first = pipeline_rows(corpus, tmp_path)
+    assert len(first) == 13
+    assert pipeline_rows(corpus, tmp_path) == first
+
+def test_interrupted_sink_leaves_no_pending_tasks(corpus, capfd):
+    calls = 0
+
+    def sink(pdf_path, unique_id, row_data):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(stratx.PipelineInterrupted):
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(stratx.run_pipeline(stratx.find_pdf_files(corpus), sink, readers=2, queue_size=2))
+    assert calls == 2
+    assert capfd.readouterr().err == ""
@@ -0,0 +1,94 @@
+import json
+import threading
+import http.client
+
+import pytest
+
+import service
+
+class StubService:
+    """
+    Stands in for ParseService: echoes the upload size instead of parsing it.
+    """
+    def parse(self, file_name, data):
+        return file_name, [file_name, str(len(data))], None
+
+    def record(self, seconds, ok=True):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = service.make_server(StubService(), port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+def post(address, headers, body=b""):
+    conn = http.client.HTTPConnection(*address, timeout=10)
+    conn.putrequest("POST", "/parse?name=a.pdf")
+    for name, value in headers.items():
+        conn.putheader(name, value)
+    conn.endheaders()
+    conn.send(body)
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read())
+    conn.close()
+    return result
+
+@pytest.mark.parametrize("length", ["abc", "-5", "+5", "1_0", "12x"])
+def test_malformed_content_length_is_rejected(server, length):
+    status, body = post(server, {"Content-Length": length}, b"%PDF-")
+    assert status == 400
+    assert "Content-Length" in body["error"]
+
+def test_valid_upload_is_parsed(server):
+    status, body = post(server, {"Content-Length": "5"}, b"%PDF-")
+    assert status == 200
+    assert body["row"]["File Name"] == "a.pdf"
+
+class BrokenPool:
+    def submit(self, fn, /, *args, **kwargs):
+        raise service.BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        pass
+
+def test_failed_resubmit_fails_the_batch_and_keeps_dispatching(monkeypatch):
+    monkeypatch.setattr(service.stratx, "RecyclingPool", lambda *args: BrokenPool())
+    parse_service = service.ParseService(workers=1)
+    parse_service.dispatcher.start()
+    try:
+        # With one worker slot, a leaked slot would leave the second request waiting for the timeout
+        for _ in range(2):
+            with pytest.raises(service.BrokenProcessPool):
+                parse_service.parse("a.pdf", b"%PDF-", timeout=10)
+        assert parse_service.stats()["restarts"] == 2
+    finally:
+        parse_service.close()
+
+class StuckWarmUpPool:
+    """
+    A fresh pool whose warm-up tasks never finish but which parses real batches.
+    """
+    def submit(self, fn, items, **options):
+        future = service.Future()
+        if items[0][1] != ["warm_up.pdf"]:
+            future.set_result([([(name, [name]) for name in names], None) for _, names in items])
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        pass
+
+def test_stuck_warm_up_after_a_restart_does_not_block_the_queue(monkeypatch):
+    pools = iter([BrokenPool(), StuckWarmUpPool()])
+    monkeypatch.setattr(service.stratx, "RecyclingPool", lambda *args: next(pools))
+    monkeypatch.setattr(service, "REQUEST_TIMEOUT", 0.2)
+    parse_service = service.ParseService(workers=1)
+    parse_service.dispatcher.start()
+    try:
+        assert parse_service.parse("a.pdf", b"%PDF-", timeout=10)[0] == "a.pdf"
+        assert parse_service.stats()["restarts"] == 1
+    finally:
+        parse_service.close()
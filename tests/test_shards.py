@@ -0,0 +1,50 @@
+import json
+
+import StratX_Parse_Script_Main as stratx
+
+def run(*argv):
+    """
+    (exit code, run result) of a CLI run.
+    """
+    report = f"{argv[argv.index('-o') + 1]}.json"
+    code = stratx.main([*map(str, argv), "--no-cache", "--no-history", "-q", "--json", report])
+    with open(report, encoding="utf-8") as f:
+        return code, json.load(f)
+
+def results_bytes(result):
+    with open(result["output"], "rb") as f:
+        return f.read()
+
+def test_sharded_runs_merge_into_the_serial_results(corpus, tmp_path):
+    code, serial = run(corpus, "-o", tmp_path / "serial")
+    shards = [tmp_path / f"shard_{i}" for i in (1, 2, 3)]
+    for i, out in enumerate(shards, 1):
+        shard_code, shard = run(corpus, "-o", out, "--shard", f"{i}/3")
+        assert shard_code == code and 0 < shard["pdfs"] < serial["pdfs"]
+    merge_code, merged = run(*shards, "-o", tmp_path / "merged", "--merge")
+    assert merge_code == code
+    assert results_bytes(merged) == results_bytes(serial)
+    assert (merged["rows"], merged["duplicates"]) == (serial["rows"], serial["duplicates"])
+
+def test_resumed_run_matches_an_uninterrupted_one(corpus, tmp_path, monkeypatch):
+    code, serial = run(corpus, "-o", tmp_path / "serial")
+    process = stratx.process_pdf_with_pages
+    calls = 0
+
+    def interrupt_fifth(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 5:
+            raise KeyboardInterrupt
+        return process(*args, **kwargs)
+
+    monkeypatch.setattr(stratx, "process_pdf_with_pages", interrupt_fifth)
+    out = tmp_path / "resumed"
+    interrupted_code, interrupted = run(corpus, "-o", out)
+    assert interrupted_code == stratx.EXIT_INTERRUPTED
+    assert interrupted["rows"] < serial["rows"]
+
+    monkeypatch.undo()
+    resumed_code, resumed = run(corpus, "-o", out, "--resume")
+    assert resumed_code == code
+    assert results_bytes(resumed) == results_bytes(serial)
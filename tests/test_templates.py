@@ -0,0 +1,46 @@
+import pytest
+
+import StratX_Parse_Script_Main as stratx
+from conftest import REPORT_PAGES
+from synthetic_reports import write_pdf
+
+LABELED = REPORT_PAGES[0]
+UNLABELED = "\n".join(["Thirona LungQ Report", "5706.1", "Jan. 05, 2024", "Jan. 02, 2024", "Jan. 09, 2024",
+                       "90.5 95.0 80.2 100.0 70.1 99.9", "60 61 62 63 64 65", "20 21 22 23 24 25",
+                       "1500 2000 900 1800 1700 1600"])
+REJECTED = "\n".join([LABELED.split("\nSUMMARY")[0],
+                      "The following patient order has been rejected because of the following reasons:",
+                      "Not usable. No TLC images with > 120 images present.", "Powered by MedQIA"])
+
+CASES = [
+    (LABELED + "\nPowered by Voiant", "Qt 4.8.7", "stratx-voiant"),
+    (LABELED + "\nPowered by MedQIA", "Qt 5.15.2", "stratx-medqia"),
+    (LABELED + "\nThirona", "WeasyPrint 52.5", "lungq-labeled"),
+    (UNLABELED, "WeasyPrint 52.5", "lungq-unlabeled"),
+    # Right labels, other producer; no producer at all; no RESULTS block
+    (LABELED + "\nPowered by Voiant", "Microsoft Word", "generic"),
+    (LABELED + "\nPowered by Voiant", None, "generic"),
+    (REJECTED, "Qt 5.15.2", "generic"),
+]
+
+@pytest.mark.parametrize("text, producer, name", CASES, ids=[f"{name}-{i}" for i, (_, _, name) in enumerate(CASES)])
+def test_fingerprint_selects_template(text, producer, name):
+    fingerprint = stratx.layout_fingerprint(text, {"Producer": producer} if producer else {}, 2)
+    assert stratx.match_template(fingerprint).name == name
+
+@pytest.mark.parametrize("text, producer, name", CASES, ids=[f"{name}-{i}" for i, (_, _, name) in enumerate(CASES)])
+def test_pdf_is_parsed_with_its_template(tmp_path, text, producer, name):
+    path = tmp_path / "StratX_4242_5706.pdf"
+    write_pdf(path, [text, "Methods"], producer)
+    processed = stratx.process_pdf_with_pages(str(path), lazy=False)
+    assert processed[6] == name
+    # A template reads these layouts directly, to the same row as the generic parsers
+    assert processed[:2] == stratx.parse_pages(processed[2], path.name, template="generic")
+
+def test_first_registered_match_wins():
+    fingerprint = stratx.layout_fingerprint(LABELED + "\nVoiant MedQIA Thirona", {"Producer": "Qt 5"}, 1)
+    assert stratx.match_template(fingerprint).name == "stratx-voiant"
+    assert [t.name for t in stratx.REPORT_TEMPLATES][:2] == ["stratx-voiant", "stratx-medqia"]
+
+def test_unknown_template_name_parses_generically():
+    assert stratx.template_named("no-such-template") is stratx.GENERIC_TEMPLATE
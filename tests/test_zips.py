@@ -0,0 +1,63 @@
+import io
+import json
+import random
+import zipfile
+
+import StratX_Parse_Script_Main as stratx
+from synthetic_reports import synthetic_pdf, synthetic_report
+
+def report_bytes(seed):
+    return synthetic_pdf(synthetic_report(random.Random(seed), "labeled", 500 + seed, 600000 + seed))
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+INNER = {
+    "StratX_502.pdf": report_bytes(2),
+    "__MACOSX/._StratX_502.pdf": b"\0\5\26\7 resource fork",
+}
+BUNDLE = {
+    "StratX_0027-2/StratX_500.pdf": report_bytes(0),
+    "StratX_0027-2/._StratX_500.pdf": b"\0\5\26\7 resource fork",
+    "StratX_0027-2/inner.zip": zip_bytes(INNER),
+    "StratX_0027-3/StratX_501.pdf": report_bytes(1),
+    "__MACOSX/StratX_0027-2/._StratX_500.pdf": b"\0\5\26\7 resource fork",
+    "__MACOSX/StratX_0027-2/._inner.zip": b"\0\5\26\7 resource fork",
+}
+
+def run_folder(folder, out):
+    report = out / "run.json"
+    stratx.main([str(folder), "-o", str(out), "--no-cache", "--no-history", "-q", "--json", str(report)])
+    with open(json.loads(report.read_text())["output"], "rb") as f:
+        return f.read()
+
+def test_nested_zips_read_like_extracted_folders(tmp_path):
+    zipped = tmp_path / "zipped" / "Chicago"
+    zipped.mkdir(parents=True)
+    (zipped / "bundle.zip").write_bytes(zip_bytes(BUNDLE))
+
+    found = list(stratx.find_pdf_files(str(tmp_path / "zipped")))
+    bundle = zipped / "bundle.zip"
+    assert found == [str(bundle / "StratX_0027-2" / "StratX_500.pdf"),
+                     str(bundle / "StratX_0027-2" / "inner.zip" / "StratX_502.pdf"),
+                     str(bundle / "StratX_0027-3" / "StratX_501.pdf")]
+    assert stratx.read_pdf_bytes(found[1]) == INNER["StratX_502.pdf"]
+
+    # The same reports extracted to disk give the same results file
+    extracted = tmp_path / "extracted" / "Chicago" / "bundle.zip"
+    for name, data in {**BUNDLE, **{f"StratX_0027-2/inner.zip/{k}": v for k, v in INNER.items()}}.items():
+        if "__MACOSX/" in name or "/._" in name or name.endswith(".zip"):
+            continue
+        (extracted / name).parent.mkdir(parents=True, exist_ok=True)
+        (extracted / name).write_bytes(data)
+    assert run_folder(tmp_path / "zipped", tmp_path / "out_zipped") == run_folder(tmp_path / "extracted",
+                                                                                  tmp_path / "out_extracted")
+
+def test_unreadable_nested_zip_is_skipped(tmp_path, capsys):
+    (tmp_path / "bundle.zip").write_bytes(zip_bytes({"a/StratX_500.pdf": report_bytes(0), "a/broken.zip": b"PK not a zip"}))
+    assert list(stratx.find_pdf_files(str(tmp_path))) == [str(tmp_path / "bundle.zip" / "a" / "StratX_500.pdf")]
+    assert "Skipping unreadable archive" in capsys.readouterr().out